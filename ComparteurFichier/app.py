@@ -1,215 +1,128 @@
-from flask import Flask, render_template, request
+import hmac
+import os
+from functools import partial
+
+from flask import Flask, render_template, stream_template, request, jsonify, Response
 import pandas as pd
 
 # Import des utilitaires depuis le module utils
-from utils import get_conn, format_iwu_column, df_to_html, parse_multiple_names, normalize_id
+from utils import get_conn, format_iwu_column, df_to_html, iter_table_html, normalize_id, normalize_ids
+from utils import snapshot_cache, get_frame, get_sap_nom, get_concession_names, search_users, get_comparison, compute_dealer_stats
+from utils.database import pool as db_pool
+from utils.queries import fetch_records, query_stats
+from utils.parallel import fetch_parallel
+from utils.profiling import instrument_app, phase, timed_iter, render_metrics
+from utils.users import list_users, page_size
+from utils.user_index import lookup_user
+from utils.duplicates import duplicate_report_state, read_duplicate_page, iter_stored_groups, iter_duplicate_csv
+from utils.duplicates import DUPLICATES_PAGE_SIZE
+from utils.comparison import compare_dealers, batch_user_rows, parse_sap_list, BATCH_MAX_SAPS
+
+
+# Séparateur interne pour la recherche dans les noms (absent des saisies)
+NAME_SEPARATOR = "\x1f"
 
+# Jeton exigé par POST /cache/invalidate (sans jeton : appels locaux uniquement)
+ADMIN_TOKEN = os.environ.get("DEALERVIEW_ADMIN_TOKEN")
+LOCAL_ADDRESSES = {"127.0.0.1", "::1"}
 
-def parse_nom_with_source(sap_nom_string):
+
+def build_dealer_list(sap_princs, names, counts, other_ids, source, search="", show_matches=""):
     """
-    Parse la chaine de noms comme: "IDOCS: SPL SECLIN; WELCOME: SPL HAUT DE FRANCE"
-    Retourne une liste de noms formates avec leur source: W:, I:, ou W + I:
+    Construit la liste des concessions d'une source pour la page d'accueil.
+
+    Les noms viennent de l'index con_nom déjà découpé (voir utils/names.py) ;
+    la recherche et le filtre show_matches sont des masques de colonnes. Le
+    coût est linéaire en nombre de concessions.
+
+    Args:
+        sap_princs (pd.Series): sap_princ distincts de la source
+        names (ConcessionNameIndex): Index des noms de concessions
+        counts (pd.Series): Nombre d'utilisateurs indexé par sap_princ
+        other_ids (set): sap_princ présents dans l'autre source
+        source (str): "WELCOME" ou "IDOCS"
+        search (str): Filtre texte sur le code SAP ou les noms
+        show_matches (str): Si renseigné, ne garde que les concessions communes
+
+    Returns:
+        list: Dicts {sap_princ, names_info, count_users, in_both} triés par sap_princ
     """
-    if not sap_nom_string or pd.isna(sap_nom_string):
-        return []
-    
-    # Separer par point-virgule
-    names = [n.strip() for n in str(sap_nom_string).split(';')]
-    
-    welcome_names = set()
-    idocs_names = set()
-    
-    for name in names:
-        if ':' in name:
-            prefix, content = name.split(':', 1)
-            prefix = prefix.strip().upper()
-            content = content.strip()
-            
-            if prefix == "WELCOME" and content:
-                welcome_names.add(content)
-            elif prefix == "IDOCS" and content:
-                idocs_names.add(content)
-    
-    # Trouver les noms communs
-    common_names = welcome_names & idocs_names
-    only_welcome = welcome_names - common_names
-    only_idocs = idocs_names - common_names
-    
-    result = []
-    for name in sorted(common_names):
-        result.append(f"W + I: {name}")
-    for name in sorted(only_welcome):
-        result.append(f"W: {name}")
-    for name in sorted(only_idocs):
-        result.append(f"I: {name}")
-    
-    return result
+    df = pd.DataFrame({"sap_princ": sap_princs.to_numpy()})
+    df["all_names"] = names.names_series(df["sap_princ"], source)
+    df["in_both"] = df["sap_princ"].isin(other_ids)
+
+    # Ne pas afficher les dealers sans nom valide pour la source
+    mask = df["all_names"].notna()
+    if show_matches:
+        mask &= df["in_both"]
+    if search:
+        search_lower = search.lower()
+        in_sap = df["sap_princ"].astype(str).str.lower().str.contains(search_lower, regex=False)
+        in_names = (
+            df["all_names"].str.join(NAME_SEPARATOR).str.lower()
+            .str.contains(search_lower, regex=False)
+            .fillna(False)
+            .astype(bool)
+        )
+        mask &= in_sap | in_names
+
+    df = df[mask]
+    df = df.assign(count_users=df["sap_princ"].map(counts).fillna(0).astype(int))
+    df = df.sort_values("sap_princ", key=lambda c: c.astype(str), kind="stable")
+
+    return [
+        {
+            "sap_princ": sap_princ,
+            "names_info": {
+                "all_names": all_names,
+                "display_name": all_names[0],  # Premier nom
+                "count": len(all_names)
+            },
+            "count_users": count_users,
+            "in_both": bool(in_both)
+        }
+        for sap_princ, all_names, count_users, in_both in zip(
+            df["sap_princ"], df["all_names"], df["count_users"], df["in_both"]
+        )
+    ]
+
 
 # ===============================
 # APP
 # ===============================
 app = Flask(__name__)
+# Phases db/transform/html/template, Server-Timing, /metrics et ?profile=1 (utils/profiling.py)
+instrument_app(app)
 
 @app.route('/', methods=['GET'])
 def home():
     search = request.args.get("search", "")
     show_matches = request.args.get("show_matches", "")  # Nouveau paramètre pour le filtre
 
-    conn = get_conn()
-    
-    # Récupération des sap_princ distincts depuis les tables sso et idocs_user
-    df_sso_princ = pd.read_sql("SELECT DISTINCT sap_princ FROM sso WHERE sap_princ IS NOT NULL", conn)
-    df_idocs_princ = pd.read_sql("SELECT DISTINCT sap_princ FROM idocs_user WHERE sap_princ IS NOT NULL", conn)
-    
-    # Récupération des noms depuis la table con_nom
-    df_con_nom = pd.read_sql("SELECT sap_princ, sap_nom FROM con_nom WHERE sap_princ IS NOT NULL", conn)
-    
-    # Récupération des utilisateurs pour comptage
-    df_welcome_users = pd.read_sql("SELECT DISTINCT sap_princ, id_cree FROM sso WHERE sap_princ IS NOT NULL", conn)
-    df_idocs_users = pd.read_sql("SELECT DISTINCT sap_princ, id_cree FROM idocs_user WHERE sap_princ IS NOT NULL", conn)
-    
-    conn.close()
+    # Comptes par concession (COUNT DISTINCT côté MySQL) et noms, depuis le cache mémoire
+    counts = snapshot_cache.get("dealer_counts")
+    names = get_concession_names()
+
+    welcome_grp = counts["welcome"]
+    idocs_grp = counts["idocs"]
 
-    # Aggregation des comptes par sap_princ
-    welcome_grp = df_welcome_users.groupby("sap_princ")["id_cree"].apply(lambda x: len(set(x)))
-    idocs_grp = df_idocs_users.groupby("sap_princ")["id_cree"].apply(lambda x: len(set(x)))
-    
-    # Helper function pour parser les noms multiples avec filtrage par source
-    def parse_names(sap_nom_string, source="WELCOME"):
-        """
-        Parse la chaîne de noms comme: "IDOCS: SPL SECLIN; WELCOME: SPL HAUT DE FRANCE; WELCOME: SPL LITTORAL"
-        Filtre uniquement les noms correspondant à la source (WELCOME ou IDOCS)
-        Retourne un dict avec toutes les infos et les noms formatés
-        """
-        if not sap_nom_string or pd.isna(sap_nom_string):
-            return {"all_names": [], "display_name": "", "count": 0}
-        
-        # Séparer par point-virgule
-        names = [n.strip() for n in str(sap_nom_string).split(';')]
-        
-        if len(names) == 0:
-            return {"all_names": [], "display_name": "", "count": 0}
-        
-        # Filtrer et nettoyer les noms selon la source
-        clean_names = []
-        for name in names:
-            # Vérifier si le nom contient le préfixe de la source
-            if ':' in name:
-                prefix, content = name.split(':', 1)
-                prefix = prefix.strip().upper()
-                content = content.strip()
-                
-                # Filtrer selon la source demandée
-                if source == "WELCOME" and prefix == "WELCOME":
-                    if content:
-                        clean_names.append(content)
-                elif source == "IDOCS" and prefix == "IDOCS":
-                    if content:
-                        clean_names.append(content)
-            # Si pas de préfixe, on ignore le nom (on ne garde que les noms avec le bon préfixe)
-        
-        if len(clean_names) == 0:
-            return {"all_names": [], "display_name": "", "count": 0}
-        
-        return {
-            "all_names": clean_names,
-            "display_name": clean_names[0],  # Premier nom
-            "count": len(clean_names)
-        }
-    
     # Ensemble des IDs présents dans les deux
-    sso_ids = set(df_sso_princ["sap_princ"])
-    idocs_ids = set(df_idocs_princ["sap_princ"])
-    
-    # Construction de la liste SSO
-    sso_dealers = []
-    for _, row in df_sso_princ.iterrows():
-        sap_princ = row["sap_princ"]
-        
-        # Vérifier si on doit filtrer uniquement les correspondances
-        in_both = sap_princ in idocs_ids
-        if show_matches and not in_both:
-            continue
-        
-        # Récupération des noms depuis con_nom - filtrer par WELCOME
-        name_row = df_con_nom[df_con_nom['sap_princ'] == sap_princ]
-        sap_nom = name_row['sap_nom'].iloc[0] if len(name_row) > 0 else ""
-        names_info = parse_names(sap_nom, source="WELCOME")
-        
-        # Ne pas afficher les dealers sans nom WELCOME valide
-        if names_info["count"] == 0:
-            continue
-        
-        # Filtrage par recherche
-        if search:
-            search_lower = search.lower()
-            match = (search_lower in str(sap_princ).lower() or 
-                    any(search_lower in name.lower() for name in names_info["all_names"]))
-            if not match:
-                continue
-        
-        sso_dealers.append({
-            "sap_princ": sap_princ,
-            "names_info": names_info,
-            "count_users": welcome_grp.get(sap_princ, 0),
-            "in_both": in_both
-        })
-    
-    # Construction de la liste IDOCS
-    idocs_dealers = []
-    for _, row in df_idocs_princ.iterrows():
-        sap_princ = row["sap_princ"]
-        
-        # Vérifier si on doit filtrer uniquement les correspondances
-        in_both = sap_princ in sso_ids
-        if show_matches and not in_both:
-            continue
-        
-        # Récupération des noms depuis con_nom - filtrer par IDOCS
-        name_row = df_con_nom[df_con_nom['sap_princ'] == sap_princ]
-        sap_nom = name_row['sap_nom'].iloc[0] if len(name_row) > 0 else ""
-        names_info = parse_names(sap_nom, source="IDOCS")
-        
-        # Ne pas afficher les dealers sans nom IDOCS valide
-        if names_info["count"] == 0:
-            continue
-        
-        # Filtrage par recherche
-        if search:
-            search_lower = search.lower()
-            match = (search_lower in str(sap_princ).lower() or 
-                    any(search_lower in name.lower() for name in names_info["all_names"]))
-            if not match:
-                continue
-        
-        idocs_dealers.append({
-            "sap_princ": sap_princ,
-            "names_info": names_info,
-            "count_users": idocs_grp.get(sap_princ, 0),
-            "in_both": in_both
-        })
-    
-    # Tri par sap_princ
-    sso_dealers = sorted(sso_dealers, key=lambda x: str(x['sap_princ']))
-    idocs_dealers = sorted(idocs_dealers, key=lambda x: str(x['sap_princ']))
-    
-    # Calcul des statistiques pour le dashboard
-    total_users_welcome = df_welcome_users['id_cree'].nunique()
-    total_users_idocs = df_idocs_users['id_cree'].nunique()
-    total_concessions_welcome = len(df_sso_princ)
-    total_concessions_idocs = len(df_idocs_princ)
-    total_concessions_both = len(sso_ids & idocs_ids)
-    
-    stats = {
-        'total_users_welcome': total_users_welcome,
-        'total_users_idocs': total_users_idocs,
-        'total_concessions_welcome': total_concessions_welcome,
-        'total_concessions_idocs': total_concessions_idocs,
-        'total_concessions_both': total_concessions_both,
-        'only_welcome': total_concessions_welcome - total_concessions_both,
-        'only_idocs': total_concessions_idocs - total_concessions_both,
-        'both': total_concessions_both
-    }
+    sso_ids = set(welcome_grp.index)
+    idocs_ids = set(idocs_grp.index)
+
+    # Construction des listes SSO et IDOCS (jointure vectorisée, une passe par source)
+    with phase("transform"):
+        sso_dealers = build_dealer_list(
+            welcome_grp.index.to_series(), names, welcome_grp, idocs_ids,
+            source="WELCOME", search=search, show_matches=show_matches
+        )
+        idocs_dealers = build_dealer_list(
+            idocs_grp.index.to_series(), names, idocs_grp, sso_ids,
+            source="IDOCS", search=search, show_matches=show_matches
+        )
+
+    # Statistiques pour le dashboard (calculées par la même requête)
+    stats = counts["stats"]
 
     return render_template(
         "home.html",
@@ -225,38 +138,20 @@ def home():
 # ===============================
 @app.route('/dealers/<sap_princ>', methods=['GET'])
 def dealers(sap_princ):
-    conn = get_conn()
-    
     # ============================
     # Récupération des noms depuis con_nom pour la concession principale
     # ============================
-    df_con_nom = pd.read_sql(f"""
-        SELECT sap_princ, sap_nom 
-        FROM con_nom 
-        WHERE sap_princ = '{sap_princ}'
-    """, conn)
-    
-    # Parser les noms pour WELCOME et IDOCS
-    welcome_names = []
-    idocs_names = []
-    
-    if len(df_con_nom) > 0:
-        sap_nom_string = df_con_nom['sap_nom'].iloc[0]
-        welcome_names = parse_multiple_names(sap_nom_string, source="WELCOME")
-        idocs_names = parse_multiple_names(sap_nom_string, source="IDOCS")
-    
+    # Noms WELCOME et IDOCS déjà découpés (index en cache)
+    names = get_concession_names().get(sap_princ)
+    welcome_names = list(names.welcome)
+    idocs_names = list(names.idocs)
+
     # ============================
     # Récupération des noms des sous-concessions
     # ============================
     # On suppose que idocs_con contient: sap_dealer = Principal, sap_princ = Sub-Dealer
-    df_names = pd.read_sql(f"""
-        SELECT DISTINCT sap_princ, sap_nom
-        FROM idocs_con
-        WHERE sap_dealer = '{sap_princ}'
-    """, conn)
-    
-    # Nom de la concession principale (Fallback sur le premier nom trouvé ou l'ID)
-    sap_nom_princ = df_names['sap_nom'].iloc[0] if len(df_names) > 0 else sap_princ
+    # Lue en parallèle de la comparaison (voir plus bas), sur une autre connexion du pool
+    fetch_names = partial(fetch_records, name="dealers.sub_names", params=[sap_princ])
 
     # ============================
     # Plus de sous-concessions (sap_dealer supprimé des tables users)
@@ -267,89 +162,29 @@ def dealers(sap_princ):
 
 
     # ============================
-    # CHARGEMENT DES UTILISATEURS (DETAILS)
+    # COMPARAISON DES UTILISATEURS (table matérialisée, voir utils/comparison.py)
     # ============================
-    df_sso = pd.read_sql(f"""
-        SELECT s.id_cree, s.nom, s.prenom, s.sap_princ,
-               d.iwu_id
-        FROM sso s
-        LEFT JOIN sso_user_detail d ON s.id_cree = d.id_cree
-        WHERE s.sap_princ = '{sap_princ}'
-    """, conn)
-
-    df_idocs = pd.read_sql(f"""
-        SELECT s.id_cree, s.nom, s.prenom, s.sap_princ,
-               d.iwu_id
-        FROM idocs_user s
-        LEFT JOIN idocs_user_detail d ON s.id_cree = d.id_cree
-        WHERE s.sap_princ = '{sap_princ}'
-    """, conn)
-    
-    conn.close()
+    with get_conn() as conn, phase("transform"):
+        (df_sso, df_idocs), sub_names = fetch_parallel(conn, partial(get_comparison, sap_princ=sap_princ), fetch_names)
 
-    # ============================
-    # GROUPEMENT DES IWU_ID
-    # ============================
-    def aggregate_iwu(df):
-        grp = df.groupby(
-            ["id_cree", "nom", "prenom"],
-            dropna=False
-        )["iwu_id"].apply(
-            lambda x: ";".join(sorted({str(v) for v in x if v and v != "NONE"})) or "NONE"
-        ).reset_index()
-        return grp
-
-    df_sso = aggregate_iwu(df_sso)
-    df_idocs = aggregate_iwu(df_idocs)
-
-    # ============================
-    # NORMALISATION POUR COMPARAISON
-    # ============================
-    df_sso["id_norm"] = df_sso["id_cree"].apply(normalize_id)
-    df_idocs["id_norm"] = df_idocs["id_cree"].apply(normalize_id)
-
-    sso_ids = set(df_sso["id_norm"])
-    idocs_ids = set(df_idocs["id_norm"])
-
-    # Déterminer le status : "both" si existe dans les deux fichiers
-    df_sso["status"] = df_sso["id_norm"].apply(lambda x: "both" if x in idocs_ids else "")
-    df_idocs["status"] = df_idocs["id_norm"].apply(lambda x: "both" if x in sso_ids else "")
+    # Nom de la concession principale (Fallback sur le premier nom trouvé ou l'ID)
+    sap_nom_princ = sub_names[0].sap_nom if sub_names else sap_princ
 
     # ============================
     # HTML GENERATION
     # ============================
-    # df_to_html est importé depuis utils.formatters
+    # Tableaux générés par morceaux pendant le rendu (réponse streamée)
     return_url = f"/dealers/{sap_princ}"
-    html_sso = df_to_html(df_sso, sap=None, return_url=return_url)
-    html_idocs = df_to_html(df_idocs, sap=None, return_url=return_url)
+    html_sso = timed_iter(iter_table_html(df_sso, sap=None, return_url=return_url), "html")
+    html_idocs = timed_iter(iter_table_html(df_idocs, sap=None, return_url=return_url), "html")
     
     # ============================
     # STATISTIQUES GLOBALES
     # ============================
-    # Tous les IDs normalisés
-    all_sso_ids = set(df_sso["id_norm"])
-    all_idocs_ids = set(df_idocs["id_norm"])
+    with phase("transform"):
+        dealer_stats = compute_dealer_stats(df_sso, df_idocs)
     
-    # Stats de croisement
-    only_sso = all_sso_ids - all_idocs_ids
-    only_idocs = all_idocs_ids - all_sso_ids
-    in_both = all_sso_ids & all_idocs_ids
-    
-    # Users sans IWU_ID
-    sso_no_iwu = df_sso[df_sso["iwu_id"] == "NONE"]["id_norm"].nunique()
-    idocs_no_iwu = df_idocs[df_idocs["iwu_id"] == "NONE"]["id_norm"].nunique()
-    
-    dealer_stats = {
-        "total_sso": len(all_sso_ids),
-        "total_idocs": len(all_idocs_ids),
-        "only_sso": len(only_sso),
-        "only_idocs": len(only_idocs),
-        "in_both": len(in_both),
-        "sso_no_iwu": sso_no_iwu,
-        "idocs_no_iwu": idocs_no_iwu
-    }
-    
-    return render_template(
+    return stream_template(
         "dealers.html",
         sap_princ=sap_princ,
         sap_nom_princ=sap_nom_princ,
@@ -364,32 +199,20 @@ def dealers(sap_princ):
     )
 
 
-# ============================================================
-# FONCTION : Construction du tableau user + aggregation IWU_ID
-# ============================================================
-def build_user_table(df):
-    possible_cols = ["iwu_id", "IWU_ID", "iwu", "iwu id", "Iveco Welcome User Id"]
-    true_col = None
-
-    for c in possible_cols:
-        if c in df.columns:
-            true_col = c
-            break
-
-    if true_col is None:
-        df["iwu_id"] = "NONE"
-    else:
-        df["iwu_id"] = df[true_col].replace("", "NONE").fillna("NONE").astype(str)
+def distinct_dicts(rows, fields):
+    """
+    Valeurs distinctes de quelques champs d'enregistrements, dans l'ordre d'apparition.
 
-    group_cols = ["id_cree", "nom", "prenom"]
+    Args:
+        rows (list): Enregistrements (tuples nommés, voir utils/queries.fetch_records)
+        fields (tuple): Champs à garder
 
-    agg = (
-        df.groupby(group_cols, dropna=False)["iwu_id"]
-        .apply(lambda s: ";".join(sorted({v for v in s if v != "NONE"})) or "NONE")
-        .reset_index(name="iwu_id")
-    )
+    Returns:
+        list: Dicts {champ: valeur}, sans doublon
+    """
+    seen = dict.fromkeys(tuple(getattr(row, field) for field in fields) for row in rows)
+    return [dict(zip(fields, values)) for values in seen]
 
-    return agg
 
 # ===============================
 # PAGE COMPARAISON CONCESSION
@@ -402,83 +225,28 @@ def compare():
     else:
         sap_code = request.args.get("sap_princ")
 
-    conn = get_conn()
-
     # ============================
     # Nom de la concession
     # ============================
-    df_conc = pd.read_sql(f"""
-        SELECT DISTINCT sap_nom, sap_princ
-        FROM con_nom
-        WHERE sap_princ = '{sap_code}'
-    """, conn)
-    sap_nom = df_conc["sap_nom"].iloc[0] if len(df_conc) > 0 else sap_code
+    sap_nom = get_sap_nom(sap_code) or sap_code
     sap_princ = sap_code
 
     # ============================
-    # CHARGEMENT DES TABLES BRUTES
+    # COMPARAISON DES UTILISATEURS
     # ============================
-    df_sso = pd.read_sql(f"""
-        SELECT s.id_cree, s.nom, s.prenom, s.sap_princ,
-               d.iwu_id
-        FROM sso s
-        LEFT JOIN sso_user_detail d ON s.id_cree = d.id_cree
-        WHERE s.sap_princ = '{sap_code}'
-    """, conn)
-
-    df_idocs = pd.read_sql(f"""
-        SELECT s.id_cree, s.nom, s.prenom, s.sap_princ,
-               d.iwu_id
-        FROM idocs_user s
-        LEFT JOIN idocs_user_detail d ON s.id_cree = d.id_cree
-        WHERE s.sap_princ = '{sap_code}'
-    """, conn)
-
-    df_all_saps = pd.read_sql("""
-        SELECT DISTINCT sap_princ
-        FROM con_nom
-        ORDER BY sap_princ
-    """, conn)
-
-    conn.close()
-
-    # ============================
-    # GROUPEMENT DES IWU_ID
-    # ============================
-    def aggregate_iwu(df):
-        grp = df.groupby(
-            ["id_cree", "nom", "prenom"],
-            dropna=False
-        )["iwu_id"].apply(
-            lambda x: ";".join(sorted({str(v) for v in x if v and v != "NONE"})) or "NONE"
-        ).reset_index()
-        return grp
-
-    df_sso = aggregate_iwu(df_sso)
-    df_idocs = aggregate_iwu(df_idocs)
-
-    # ============================
-    # NORMALISATION POUR COMPARAISON
-    # ============================
-    df_sso["id_norm"] = df_sso["id_cree"].apply(normalize_id)
-    df_idocs["id_norm"] = df_idocs["id_cree"].apply(normalize_id)
-
-    sso_ids = set(df_sso["id_norm"])
-    idocs_ids = set(df_idocs["id_norm"])
-
-    df_sso["status"] = df_sso["id_norm"].apply(lambda x: "both" if x in idocs_ids else "")
-    df_idocs["status"] = df_idocs["id_norm"].apply(lambda x: "both" if x in sso_ids else "")
+    with get_conn() as conn, phase("transform"):
+        df_sso, df_idocs = get_comparison(conn, sap_code)
 
     # ============================
     # HTML
     # ============================
-    # df_to_html est importé depuis utils.formatters
-    html_sso = df_to_html(df_sso, sap_code)
-    html_idocs = df_to_html(df_idocs, sap_code)
+    # Tableaux générés par morceaux pendant le rendu (réponse streamée)
+    html_sso = timed_iter(iter_table_html(df_sso, sap_code), "html")
+    html_idocs = timed_iter(iter_table_html(df_idocs, sap_code), "html")
 
-    all_saps = df_all_saps["sap_princ"].tolist()
+    all_saps = get_frame("all_saps")["sap_princ"].tolist()
 
-    return render_template(
+    return stream_template(
         "compare.html",
         sap=sap_code,
         sap_nom=sap_nom,
@@ -491,27 +259,79 @@ def compare():
     )
 
 
+# ===============================
+# API COMPARAISON BATCH
+# ===============================
+@app.route('/api/compare', methods=['GET', 'POST'])
+def api_compare():
+    # sap_princ répété ou séparé par virgules (query string, formulaire ou JSON)
+    body = request.get_json(silent=True) or {}
+    values = request.values.getlist("sap_princ")
+    if isinstance(body.get("sap_princ"), list):
+        values += body["sap_princ"]
+    sap_list = parse_sap_list(values)
+
+    if not sap_list:
+        return jsonify({"error": "sap_princ requis"}), 400
+    if len(sap_list) > BATCH_MAX_SAPS:
+        return jsonify({"error": f"{BATCH_MAX_SAPS} concessions maximum par appel"}), 400
+
+    with get_conn() as conn, phase("transform"):
+        stats, df_sso, df_idocs = compare_dealers(conn, sap_list)
+
+    with_users = request.values.get("users") == "1" or body.get("users") is True
+    users = batch_user_rows(df_sso, df_idocs) if with_users else None
+
+    if (request.values.get("format") or body.get("format")) == "csv":
+        df = users if with_users else stats
+        filename = "comparaison_users.csv" if with_users else "comparaison_dealers.csv"
+        return Response(
+            df.to_csv(index=False),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+
+    result = {"dealers": stats.to_dict(orient="records")}
+    if with_users:
+        result["users"] = users.astype(object).where(users.notna(), None).to_dict(orient="records")
+    return jsonify(result)
+
+
 # ===============================
 # PAGE LISTE UTILISATEURS
 # ===============================
 @app.route('/user', methods=['GET'])
 def home_user():
-    conn = get_conn()
-    df = pd.read_sql("""
-        SELECT DISTINCT id_cree, nom, prenom
-        FROM idocs_user_detail
-        UNION
-        SELECT DISTINCT id_cree, nom, prenom
-        FROM sso_user_detail
-        ORDER BY nom ASC
-    """, conn)
-    conn.close()
+    prefix = request.args.get("q", "").strip()
+    limit = page_size(request.args.get("limit"))
+
+    with get_conn() as conn:
+        users, next_cursor = list_users(
+            conn, prefix=prefix, cursor=request.args.get("cursor"), limit=limit
+        )
 
     return render_template(
         "home_user.html",
-        users=df.to_dict(orient="records")
+        users=users,
+        q=prefix,
+        limit=limit,
+        next_cursor=next_cursor
     )
 
+
+@app.route('/api/users', methods=['GET'])
+def api_users():
+    # Variante JSON de /user (mêmes paramètres q, cursor, limit)
+    prefix = request.args.get("q", "").strip()
+    limit = page_size(request.args.get("limit"))
+
+    with get_conn() as conn:
+        users, next_cursor = list_users(
+            conn, prefix=prefix, cursor=request.args.get("cursor"), limit=limit
+        )
+
+    return jsonify({"users": users, "next_cursor": next_cursor, "limit": limit})
+
 # ===============================
 # PAGE COMPARAISON UTILISATEUR
 # ===============================
@@ -520,125 +340,41 @@ def compare_user():
     id_cree = request.args.get("id")
     sap = request.args.get("sap")
 
-    id_norm = normalize_id(id_cree)
+    # Détails, concessions et doublons IWU en deux requêtes indexées (voir utils/user_index.py)
+    with get_conn() as conn, phase("transform"):
+        user = lookup_user(conn, id_cree)
 
-    conn = get_conn()
-    
-    # OPTIMISATION: Requêtes ciblées avec WHERE au lieu de SELECT * entier
-    # Récupérer uniquement les données de cet utilisateur
-    df_sso = pd.read_sql(f"""
-        SELECT * FROM sso_user_detail 
-        WHERE id_cree = %s OR LOWER(REPLACE(id_cree, ' ', '')) = %s
-    """, conn, params=[id_cree, id_norm])
-    
-    df_idocs = pd.read_sql(f"""
-        SELECT * FROM idocs_user_detail 
-        WHERE id_cree = %s OR LOWER(REPLACE(id_cree, ' ', '')) = %s
-    """, conn, params=[id_cree, id_norm])
-    
-    # Tables users pour recuperer les sap_princ (requête ciblée)
-    df_sso_users = pd.read_sql(f"""
-        SELECT DISTINCT id_cree, sap_princ FROM sso 
-        WHERE id_cree = %s OR LOWER(REPLACE(id_cree, ' ', '')) = %s
-    """, conn, params=[id_cree, id_norm])
-    
-    df_idocs_users = pd.read_sql(f"""
-        SELECT DISTINCT id_cree, sap_princ FROM idocs_user 
-        WHERE id_cree = %s OR LOWER(REPLACE(id_cree, ' ', '')) = %s
-    """, conn, params=[id_cree, id_norm])
-    
-    # Table des noms de concessions (petite table, OK de tout charger)
-    df_con_nom = pd.read_sql("SELECT sap_princ, sap_nom FROM con_nom", conn)
+    # Quelques lignes par utilisateur : enregistrements, sans DataFrame
+    sso_rows = user["SSO"]
+    idocs_rows = user["IDOCS"]
+    dealer_rows = user["dealers"]
+    duplicates = user["duplicates"]
+
+    # Index des noms de concessions (cache mémoire partagé)
+    names = get_concession_names()
 
-    sso_identite = df_sso[["nom", "prenom"]].drop_duplicates().to_dict(orient="records")
-    idocs_identite = df_idocs[["nom", "prenom"]].drop_duplicates().to_dict(orient="records")
+    sso_identite = distinct_dicts(sso_rows, ("nom", "prenom"))
+    idocs_identite = distinct_dicts(idocs_rows, ("nom", "prenom"))
 
-    sso_iwu = df_sso[["iwu_id"]].drop_duplicates().to_dict(orient="records") if "iwu_id" in df_sso.columns else []
-    idocs_iwu = df_idocs[["iwu_id"]].drop_duplicates().to_dict(orient="records") if "iwu_id" in df_idocs.columns else []
+    sso_iwu = distinct_dicts(sso_rows, ("iwu_id",))
+    idocs_iwu = distinct_dicts(idocs_rows, ("iwu_id",))
 
     # Recuperer les societes via sap_princ
     # Pour SSO : trouver tous les sap_princ de cet utilisateur
-    sso_user_princs = df_sso_users[df_sso_users["id_cree"].apply(normalize_id) == id_norm]["sap_princ"].unique()
+    sso_user_princs = dict.fromkeys(row.sap_princ for row in dealer_rows if row.source == "SSO")
     sso_societe = []
     for princ in sso_user_princs:
-        nom_row = df_con_nom[df_con_nom["sap_princ"] == princ]
-        raw_nom = nom_row["sap_nom"].iloc[0] if len(nom_row) > 0 else ""
-        noms_formates = parse_nom_with_source(raw_nom)
-        sso_societe.append({"sap_princ": princ, "sap_noms": noms_formates})
+        sso_societe.append({"sap_princ": princ, "sap_noms": list(names.get(princ).labels)})
     
     # Pour IDOCS : trouver tous les sap_princ de cet utilisateur
-    idocs_user_princs = df_idocs_users[df_idocs_users["id_cree"].apply(normalize_id) == id_norm]["sap_princ"].unique()
+    idocs_user_princs = dict.fromkeys(row.sap_princ for row in dealer_rows if row.source == "IDOCS")
     idocs_societe = []
     for princ in idocs_user_princs:
-        nom_row = df_con_nom[df_con_nom["sap_princ"] == princ]
-        raw_nom = nom_row["sap_nom"].iloc[0] if len(nom_row) > 0 else ""
-        noms_formates = parse_nom_with_source(raw_nom)
-        idocs_societe.append({"sap_princ": princ, "sap_noms": noms_formates})
+        idocs_societe.append({"sap_princ": princ, "sap_noms": list(names.get(princ).labels)})
 
-    idocs_metier = df_idocs[["marque", "typeprofil"]].drop_duplicates().to_dict(orient="records") \
-        if "marque" in df_idocs.columns else []
-
-    # ============================
-    # DETECTION DOUBLONS IWU (OPTIMISE)
-    # ============================
-    duplicates = []
-    current_iwu_ids = set()
-    
-    # Collecter tous les IWU IDs de l'utilisateur actuel
-    for u in sso_iwu:
-        if u.get("iwu_id") and u["iwu_id"] != "NONE":
-            current_iwu_ids.add(u["iwu_id"])
-    for u in idocs_iwu:
-        if u.get("iwu_id") and u["iwu_id"] != "NONE":
-            current_iwu_ids.add(u["iwu_id"])
-    
-    # Chercher d'autres utilisateurs avec les memes IWU IDs (requêtes SQL ciblées)
-    if current_iwu_ids:
-        iwu_list = list(current_iwu_ids)
-        placeholders = ','.join(['%s'] * len(iwu_list))
-        
-        # SSO: chercher doublons
-        df_sso_dups = pd.read_sql(f"""
-            SELECT DISTINCT id_cree, nom, prenom, iwu_id 
-            FROM sso_user_detail 
-            WHERE iwu_id IN ({placeholders})
-            AND id_cree != %s
-            AND LOWER(REPLACE(id_cree, ' ', '')) != %s
-        """, conn, params=iwu_list + [id_cree, id_norm])
-        
-        for _, row in df_sso_dups.iterrows():
-            dup_id = row["id_cree"]
-            if not any(d["id_cree"] == dup_id for d in duplicates):
-                duplicates.append({
-                    "id_cree": dup_id,
-                    "nom": row.get("nom", ""),
-                    "prenom": row.get("prenom", ""),
-                    "iwu_id": row["iwu_id"],
-                    "source": "SSO"
-                })
-        
-        # IDOCS: chercher doublons
-        df_idocs_dups = pd.read_sql(f"""
-            SELECT DISTINCT id_cree, nom, prenom, iwu_id 
-            FROM idocs_user_detail 
-            WHERE iwu_id IN ({placeholders})
-            AND id_cree != %s
-            AND LOWER(REPLACE(id_cree, ' ', '')) != %s
-        """, conn, params=iwu_list + [id_cree, id_norm])
-        
-        for _, row in df_idocs_dups.iterrows():
-            dup_id = row["id_cree"]
-            if not any(d["id_cree"] == dup_id for d in duplicates):
-                duplicates.append({
-                    "id_cree": dup_id,
-                    "nom": row.get("nom", ""),
-                    "prenom": row.get("prenom", ""),
-                    "iwu_id": row["iwu_id"],
-                    "source": "IDOCS"
-                })
-    
-    # Fermer connexion après toutes les requêtes
-    conn.close()
+    # Colonnes absentes de certains exports IDOCS (voir utils/tables.OPTIONAL_DETAIL_COLUMNS)
+    idocs_metier = distinct_dicts(idocs_rows, ("marque", "typeprofil")) \
+        if idocs_rows and "marque" in idocs_rows[0]._fields else []
 
     # ============================
     # STATISTIQUES UTILISATEUR
@@ -688,48 +424,8 @@ def search_user():
         search_term = request.form.get("search", "").strip()
         
         if search_term and len(search_term) >= 2:
-            conn = get_conn()
-            
-            # Recherche unifiée dans SSO et IDOCS
-            search_pattern = f"%{search_term}%"
-            
-            query = """
-                SELECT DISTINCT id_cree, nom, prenom, iwu_id, 'SSO' as source
-                FROM sso_user_detail 
-                WHERE nom LIKE %s OR prenom LIKE %s OR iwu_id LIKE %s
-                UNION
-                SELECT DISTINCT id_cree, nom, prenom, iwu_id, 'IDOCS' as source
-                FROM idocs_user_detail 
-                WHERE nom LIKE %s OR prenom LIKE %s OR iwu_id LIKE %s
-                LIMIT 100
-            """
-            
-            df_results = pd.read_sql(query, conn, params=[
-                search_pattern, search_pattern, search_pattern,
-                search_pattern, search_pattern, search_pattern
-            ])
-            
-            conn.close()
-            
-            # Grouper par id_cree pour éviter les doublons
-            grouped = {}
-            for _, row in df_results.iterrows():
-                id_cree = row["id_cree"]
-                if id_cree not in grouped:
-                    grouped[id_cree] = {
-                        "id_cree": id_cree,
-                        "nom": row["nom"],
-                        "prenom": row["prenom"],
-                        "iwu_id": row["iwu_id"] if row["iwu_id"] and row["iwu_id"] != "NONE" else "",
-                        "sources": set()
-                    }
-                grouped[id_cree]["sources"].add(row["source"])
-            
-            # Convertir en liste avec source formatée
-            for id_cree, data in grouped.items():
-                data["source"] = " + ".join(sorted(data["sources"]))
-                del data["sources"]
-                results.append(data)
+            # Index en mémoire (rafraîchi par TTL ou POST /cache/invalidate)
+            results = search_users(search_term)
     
     return render_template(
         "search_user.html",
@@ -738,6 +434,104 @@ def search_user():
     )
 
 
+# ===============================
+# RAPPORT DOUBLONS IWU
+# ===============================
+@app.route('/duplicates', methods=['GET'])
+def duplicates_report():
+    # Rapport matérialisé par backup_and_clean.py (table iwu_duplicates), lu page par page
+    with get_conn() as conn:
+        state = duplicate_report_state(conn)
+        total = state.nb_groups if state is not None else 0
+        nb_pages = max(1, -(-total // DUPLICATES_PAGE_SIZE))
+        try:
+            page = min(max(1, int(request.args.get("page", 1))), nb_pages)
+        except ValueError:
+            page = 1
+        groups = read_duplicate_page(conn, page) if state is not None else []
+
+    return render_template(
+        "duplicates.html",
+        groups=groups,
+        total=total,
+        page=page,
+        nb_pages=nb_pages,
+        built_at=state.built_at if state is not None else None
+    )
+
+
+@app.route('/duplicates.csv', methods=['GET'])
+def duplicates_csv():
+    with get_conn() as conn:
+        if duplicate_report_state(conn) is None:
+            return Response("Rapport non construit (scripts/duplicate_iwu_report.py --store)\n",
+                            status=404, mimetype="text/plain")
+
+    def generate():
+        with get_conn() as conn:
+            yield from iter_duplicate_csv(iter_stored_groups(conn))
+
+    return Response(
+        generate(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=doublons_iwu.csv"}
+    )
+
+
+# ===============================
+# CACHE DES TABLES DE REFERENCE
+# ===============================
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(snapshot_cache.stats())
+
+
+def is_admin_request():
+    """
+    Vérifie qu'un appel d'administration est autorisé.
+
+    Avec DEALERVIEW_ADMIN_TOKEN : en-tête X-Admin-Token égal au jeton.
+    Sans jeton configuré : seuls les appels depuis la machine locale passent.
+
+    Returns:
+        bool: True si l'appel est autorisé
+    """
+    if ADMIN_TOKEN:
+        token = request.headers.get("X-Admin-Token", "")
+        return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+    return request.remote_addr in LOCAL_ADDRESSES
+
+
+@app.route('/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    # A appeler après backup_and_clean.py ou la régénération de con_nom
+    if not is_admin_request():
+        return jsonify({"error": "Accès refusé"}), 403
+    key = request.values.get("key") or None
+    removed = snapshot_cache.invalidate(key)
+    return jsonify({"invalidated": removed, **snapshot_cache.stats()})
+
+
+@app.route('/db/pool', methods=['GET'])
+def db_pool_stats():
+    # Etat du pool de connexions (saturation : exhausted / timeouts)
+    return jsonify(db_pool.stats())
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Histogrammes de latence par route et par phase + compteurs SQL (format Prometheus)
+    if not is_admin_request():
+        return jsonify({"error": "Accès refusé"}), 403
+    return Response(render_metrics(query_stats), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/db/queries', methods=['GET'])
+def db_query_stats():
+    # Durées par requête nommée (utils/queries.py) : repérer les requêtes lentes
+    return jsonify(query_stats.stats())
+
+
 # ===============================
 # RUN SERVER
 # ===============================
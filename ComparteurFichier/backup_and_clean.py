@@ -1,99 +1,133 @@
-"""Script pour backup et nettoyage des données MySQL"""
-import pymysql
-import pandas as pd
-import os
+"""Script pour backup et nettoyage des données MySQL
+
+Usage:
+    python backup_and_clean.py                         # backup CSV + nettoyage des \\r
+    python backup_and_clean.py --compress gzip         # backup compressé (.csv.gz)
+    python backup_and_clean.py --skip-clean --workers 4
+    python backup_and_clean.py --dry-run               # compte les lignes a nettoyer
+    python backup_and_clean.py --skip-refresh          # sans mise a jour des donnees derivees
+"""
+import argparse
 from datetime import datetime
 
-# Connexion directe
-conn = pymysql.connect(
-    host="10.33.99.59",
-    port=3307,
-    database="preanalyse-dv",
-    user="preanalyse-dv",
-    password="TuMnWosbYJvRGVWbb5graFfi"
-)
-
-# Creer dossier backup
-backup_dir = f"backup_mysql_{datetime.now().strftime('%Y%m%d_%H%M')}"
-os.makedirs(backup_dir, exist_ok=True)
-print(f"=== Creation backup dans {backup_dir} ===\n")
-
-# Liste des tables a sauvegarder
-tables = ['sso', 'idocs_user', 'sso_user_detail', 'idocs_user_detail', 'con_nom', 'idocs_con']
-
-for table in tables:
-    try:
-        df = pd.read_sql(f"SELECT * FROM {table}", conn)
-        filepath = os.path.join(backup_dir, f"{table}.csv")
-        df.to_csv(filepath, index=False, encoding='utf-8')
-        print(f"[OK] {table}: {len(df)} lignes sauvegardees")
-    except Exception as e:
-        print(f"[ERR] {table}: Erreur - {e}")
-
-print(f"\n=== Backup termine dans {backup_dir} ===")
-
-# Maintenant nettoyer les \r
-print("\n=== Nettoyage des \\r dans les donnees ===\n")
-
-cursor = conn.cursor()
-
-# Liste des colonnes texte a nettoyer pour chaque table
-clean_queries = [
-    # Table sso
-    "UPDATE sso SET id_cree = REPLACE(id_cree, '\r', '') WHERE id_cree LIKE '%\r%'",
-    "UPDATE sso SET nom = REPLACE(nom, '\r', '') WHERE nom LIKE '%\r%'",
-    "UPDATE sso SET prenom = REPLACE(prenom, '\r', '') WHERE prenom LIKE '%\r%'",
-    "UPDATE sso SET sap_princ = REPLACE(sap_princ, '\r', '') WHERE sap_princ LIKE '%\r%'",
-    
-    # Table idocs_user
-    "UPDATE idocs_user SET id_cree = REPLACE(id_cree, '\r', '') WHERE id_cree LIKE '%\r%'",
-    "UPDATE idocs_user SET nom = REPLACE(nom, '\r', '') WHERE nom LIKE '%\r%'",
-    "UPDATE idocs_user SET prenom = REPLACE(prenom, '\r', '') WHERE prenom LIKE '%\r%'",
-    "UPDATE idocs_user SET sap_princ = REPLACE(sap_princ, '\r', '') WHERE sap_princ LIKE '%\r%'",
-    
-    # Table sso_user_detail
-    "UPDATE sso_user_detail SET id_cree = REPLACE(id_cree, '\r', '') WHERE id_cree LIKE '%\r%'",
-    "UPDATE sso_user_detail SET nom = REPLACE(nom, '\r', '') WHERE nom LIKE '%\r%'",
-    "UPDATE sso_user_detail SET prenom = REPLACE(prenom, '\r', '') WHERE prenom LIKE '%\r%'",
-    "UPDATE sso_user_detail SET iwu_id = REPLACE(iwu_id, '\r', '') WHERE iwu_id LIKE '%\r%'",
-    
-    # Table idocs_user_detail
-    "UPDATE idocs_user_detail SET id_cree = REPLACE(id_cree, '\r', '') WHERE id_cree LIKE '%\r%'",
-    "UPDATE idocs_user_detail SET nom = REPLACE(nom, '\r', '') WHERE nom LIKE '%\r%'",
-    "UPDATE idocs_user_detail SET prenom = REPLACE(prenom, '\r', '') WHERE prenom LIKE '%\r%'",
-    "UPDATE idocs_user_detail SET iwu_id = REPLACE(iwu_id, '\r', '') WHERE iwu_id LIKE '%\r%'",
-    
-    # Table con_nom
-    "UPDATE con_nom SET sap_princ = REPLACE(sap_princ, '\r', '') WHERE sap_princ LIKE '%\r%'",
-    "UPDATE con_nom SET sap_nom = REPLACE(sap_nom, '\r', '') WHERE sap_nom LIKE '%\r%'",
-    
-    # Table idocs_con
-    "UPDATE idocs_con SET sap_princ = REPLACE(sap_princ, '\r', '') WHERE sap_princ LIKE '%\r%'",
-    "UPDATE idocs_con SET sap_dealer = REPLACE(sap_dealer, '\r', '') WHERE sap_dealer LIKE '%\r%'",
-    "UPDATE idocs_con SET sap_nom = REPLACE(sap_nom, '\r', '') WHERE sap_nom LIKE '%\r%'",
-]
-
-for query in clean_queries:
-    try:
-        cursor.execute(query)
-        affected = cursor.rowcount
-        if affected > 0:
-            table_name = query.split()[1]
-            col_name = query.split()[3]
-            print(f"[OK] {table_name}.{col_name}: {affected} lignes nettoyees")
-    except Exception as e:
-        print(f"[ERR] Erreur: {e}")
-
-conn.commit()
-print("\n=== Nettoyage termine et commite ===")
-
-# Verification
-print("\n=== Verification ===")
-cursor.execute("SELECT id_cree FROM idocs_user WHERE sap_princ = '12137' LIMIT 3")
-results = cursor.fetchall()
-print(f"Recherche '12137' (sans \\r): {len(results)} resultats trouves")
-if results:
-    print("Exemples:", [r[0] for r in results[:3]])
-
-conn.close()
-print("\n[OK] Termine!")
+from utils.backup import backup_tables, BACKUP_WORKERS, BACKUP_CHUNK_ROWS, COMPRESSIONS
+from utils.cleanup import clean_tables, CLEAN_BATCH_SIZE
+from utils.comparison import refresh_store
+from utils.database import get_conn
+from utils.duplicates import build_duplicate_report
+from utils.id_norm import refresh_id_norm
+from utils.tables import IMPORTED_TABLES, TABLE_COLUMNS
+from utils.user_index import build_user_index, invalidate_user_index
+
+
+def run_backup(args):
+    # Creer dossier backup
+    backup_dir = args.output_dir or f"backup_mysql_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    print(f"=== Creation backup dans {backup_dir} ===\n")
+
+    # Lecture en streaming, tables en parallele, manifest.json avec lignes et SHA-256
+    manifest = backup_tables(
+        backup_dir,
+        tables=IMPORTED_TABLES,
+        compression=args.compress,
+        workers=args.workers,
+        chunk_rows=args.chunk_rows
+    )
+
+    print(f"\n=== Backup termine dans {backup_dir} ===")
+    return all("error" not in entry for entry in manifest["tables"])
+
+
+def run_cleanup(conn, args):
+    # Maintenant nettoyer les \r
+    print("\n=== Nettoyage des \\r dans les donnees ===\n")
+
+    # Une passe par table (toutes les colonnes dans un seul UPDATE), lots commites
+    clean_tables(conn, TABLE_COLUMNS, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    if args.dry_run:
+        print("\n=== Dry-run termine : aucune modification ===")
+        return
+
+    print("\n=== Nettoyage termine et commite ===")
+
+    cursor = conn.cursor()
+
+    # Verification
+    print("\n=== Verification ===")
+    cursor.execute("SELECT id_cree FROM idocs_user WHERE sap_princ = '12137' LIMIT 3")
+    results = cursor.fetchall()
+    print(f"Recherche '12137' (sans \\r): {len(results)} resultats trouves")
+    if results:
+        print("Exemples:", [r[0] for r in results[:3]])
+
+
+def run_refresh(conn):
+    # Donnees derivees des tables importees : a jour avant la reouverture des pages
+    print("\n=== Mise a jour des donnees derivees ===\n")
+
+    # Colonne id_norm des lignes importees (si la migration est appliquee)
+    filled = refresh_id_norm(conn)
+    for table, rows in filled.items():
+        print(f"[OK] {table}: id_norm rempli pour {rows} lignes")
+
+    # Comparaison materialisee (concessions dont les lignes ont change)
+    print("\nComparaison WELCOME / IDOCS (user_comparison):")
+    refresh_store(conn)
+
+    # Index utilisateurs / IWU_ID de /compare_user (reconstruit en une transaction)
+    print("\nIndex utilisateurs / IWU_ID:")
+    for table, rows in build_user_index(conn).items():
+        print(f"  {table}: {rows} lignes")
+
+    # Rapport des IWU_ID en doublon de /duplicates (reconstruit en une transaction)
+    print("\nRapport des IWU_ID en doublon (iwu_duplicates):")
+    groups = build_duplicate_report(conn)
+    print(f"  {groups} IWU_ID en doublon")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup CSV et nettoyage des \\r des tables MySQL")
+    parser.add_argument("--compress", choices=list(COMPRESSIONS), default="none",
+                        help="Compression des fichiers de backup (zstd : pip install zstandard)")
+    parser.add_argument("--workers", type=int, default=BACKUP_WORKERS,
+                        help=f"Tables sauvegardees en parallele (defaut: {BACKUP_WORKERS})")
+    parser.add_argument("--chunk-rows", type=int, default=BACKUP_CHUNK_ROWS,
+                        help=f"Lignes lues par bloc (defaut: {BACKUP_CHUNK_ROWS})")
+    parser.add_argument("--output-dir", help="Dossier de backup (defaut: backup_mysql_<date>)")
+    parser.add_argument("--skip-clean", action="store_true", help="Backup uniquement")
+    parser.add_argument("--batch-size", type=int, default=CLEAN_BATCH_SIZE,
+                        help=f"Lignes par transaction de nettoyage (defaut: {CLEAN_BATCH_SIZE})")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Compter les lignes a nettoyer sans backup ni modification")
+    parser.add_argument("--skip-refresh", action="store_true",
+                        help="Ne pas mettre a jour les donnees derivees (id_norm, user_comparison, index utilisateurs)")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        with get_conn() as conn:
+            run_cleanup(conn, args)
+        return
+
+    # Tables sources importees ou nettoyees : /compare_user lit les tables sources
+    # jusqu'a la reconstruction de l'index (run_refresh)
+    with get_conn() as conn:
+        invalidate_user_index(conn)
+
+    if not run_backup(args) and not args.skip_clean:
+        print("\n[ERR] Backup incomplet : nettoyage annule")
+        return
+
+    if not args.skip_clean:
+        with get_conn() as conn:
+            run_cleanup(conn, args)
+
+    if not args.skip_refresh:
+        with get_conn() as conn:
+            run_refresh(conn)
+
+    print("\n[OK] Termine!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Comparaison WELCOME / IDOCS de plusieurs concessions en une passe.
+
+Usage:
+    python scripts/batch_compare.py 10001 10002 10003
+    python scripts/batch_compare.py --file saps.txt --format csv -o audit.csv
+    python scripts/batch_compare.py --all --users --format csv -o users.csv
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from utils.comparison import compare_dealers, batch_user_rows, parse_sap_list
+from utils.database import get_conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison batch de concessions")
+    parser.add_argument("sap_princ", nargs="*", help="Codes SAP principaux")
+    parser.add_argument("--file", help="Fichier de codes SAP (un par ligne ou séparés par virgules)")
+    parser.add_argument("--all", action="store_true", help="Toutes les concessions de con_nom")
+    parser.add_argument("--users", action="store_true", help="Détail par utilisateur au lieu des statistiques")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Format de sortie (défaut: json)")
+    parser.add_argument("-o", "--output", help="Fichier de sortie (défaut: sortie standard)")
+    args = parser.parse_args()
+
+    values = list(args.sap_princ)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            values += f.read().splitlines()
+
+    with get_conn() as conn:
+        if args.all:
+            values += pd.read_sql(
+                "SELECT DISTINCT sap_princ FROM con_nom WHERE sap_princ IS NOT NULL", conn
+            )["sap_princ"].tolist()
+
+        sap_list = parse_sap_list(values)
+        if not sap_list:
+            parser.error("aucun code SAP (arguments, --file ou --all)")
+
+        print(f"Comparaison de {len(sap_list)} concession(s)...", file=sys.stderr)
+        stats, df_sso, df_idocs = compare_dealers(conn, sap_list)
+
+    df = batch_user_rows(df_sso, df_idocs) if args.users else stats
+
+    if args.format == "csv":
+        content = df.to_csv(index=False)
+    else:
+        records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+        content = json.dumps(records, ensure_ascii=False, indent=2, default=int) + "\n"
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        print(f"Succès ! {len(df)} ligne(s) écrite(s) dans {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Jeu de données synthétique et fausse base à latence réglable (benchmarks)
+
+Les tables sources (schéma et index de utils/tables.py) sont créées dans
+une base SQLite mémoire partagée. Chaque connexion du pool s'y rattache comme
+en mode hors ligne (utils/snapshot.py) ; la latence réseau d'un serveur MySQL
+distant est simulée par une pause avant chaque requête, pause pendant
+laquelle le GIL est relâché comme pendant une vraie attente réseau.
+
+Usage (depuis un script de benchmark):
+    from bench_data import install_fake_database
+    keeper = install_fake_database(dealers=500, users_per_dealer=20, latency=0.02)
+    import app   # les routes utilisent maintenant la fausse base
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import database
+from utils.tables import TABLE_COLUMNS, INDEXES, index_name
+from utils.snapshot import connect_offline
+
+NOMS = ["Dupont", "Müller", "Lefèvre", "Martin", "O'Neil", "Bernard", "Garçon", "Petit"]
+PRENOMS = ["Jean", "René", "Zoé", "Paul", "Anaïs", "Luc"]
+
+# Base mémoire partagée par toutes les connexions du processus
+BENCH_URI = "file:dealerview_bench?mode=memory&cache=shared"
+
+
+def synthetic_rows(dealers, users_per_dealer, seed=1):
+    """
+    Lignes des tables sources pour un nombre de concessions donné.
+
+    Les proportions suivent les données réelles : ~80 % des utilisateurs dans
+    chaque source, identifiants en casse variable côté IDOCS, IWU_ID partagés.
+
+    Args:
+        dealers (int): Nombre de concessions
+        users_per_dealer (int): Utilisateurs tirés par concession
+        seed (int): Graine du générateur
+
+    Returns:
+        dict: Table -> liste de tuples (colonnes de TABLE_COLUMNS)
+    """
+    rnd = random.Random(seed)
+    rows = {table: [] for table in TABLE_COLUMNS}
+    iwu_pool = max(10, dealers * users_per_dealer // 2)
+    for d in range(dealers):
+        sap = str(10000 + d)
+        parts = []
+        if rnd.random() < .8:
+            parts.append(f"IDOCS: DEALER {d} I")
+        if rnd.random() < .8:
+            parts.append(f"WELCOME: DEALER {d} W")
+        if rnd.random() < .95:
+            rows["con_nom"].append((sap, " ; ".join(parts)))
+        rows["idocs_con"].append((sap, sap, f"DEALER {d}"))
+        for _ in range(users_per_dealer):
+            nom, prenom = rnd.choice(NOMS), rnd.choice(PRENOMS)
+            id_cree = f"{prenom}.{nom}{rnd.randint(0, users_per_dealer * 4)}"
+            iwu_id = rnd.choice([None, "NONE", f"IWU{rnd.randint(0, iwu_pool)}"])
+            if rnd.random() < .8:
+                rows["sso"].append((id_cree, nom, prenom, sap))
+                rows["sso_user_detail"].append((id_cree, nom, prenom, iwu_id))
+            if rnd.random() < .8:
+                idocs_id = id_cree.upper() if rnd.random() < .5 else id_cree
+                rows["idocs_user"].append((idocs_id, nom, prenom, sap))
+                rows["idocs_user_detail"].append((idocs_id, nom, prenom, iwu_id, "IVECO", "ADMIN"))
+    return rows
+
+
+def build_database(dealers, users_per_dealer, seed=1, uri=BENCH_URI):
+    """
+    Crée et remplit la base synthétique (tables sources + index).
+
+    Returns:
+        OfflineConnection: Connexion à garder ouverte (la base mémoire vit avec elle)
+    """
+    keeper = connect_offline(uri)
+    with keeper.cursor() as cursor:
+        for table, columns in TABLE_COLUMNS.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(f'{c} TEXT' for c in columns)})")
+        for table, values in synthetic_rows(dealers, users_per_dealer, seed).items():
+            marks = ", ".join(["%s"] * len(TABLE_COLUMNS[table]))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", values)
+        for table, definitions in INDEXES.items():
+            for columns in definitions:
+                cursor.execute(f"CREATE INDEX {index_name(table, columns)} ON {table} ({', '.join(columns)})")
+    keeper.commit()
+    return keeper
+
+
+class SlowCursor:
+    """Curseur qui attend `latency` secondes avant chaque requête."""
+
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, sql, params=None):
+        time.sleep(self._latency)
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, seq):
+        time.sleep(self._latency)
+        return self._cursor.executemany(sql, seq)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.__exit__(exc_type, exc, tb)
+
+
+class SlowConnection:
+    """Connexion hors ligne dont les curseurs simulent la latence réseau."""
+
+    def __init__(self, conn, latency):
+        self._conn = conn
+        self._latency = latency
+
+    def cursor(self, cursor_class=None):
+        return SlowCursor(self._conn.cursor(cursor_class), self._latency)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def latency_connector(latency, uri=BENCH_URI):
+    """Fabrique de connexions pour le pool, avec latence injectée par requête."""
+    return lambda: SlowConnection(connect_offline(uri), latency)
+
+
+def install_fake_database(dealers=500, users_per_dealer=20, latency=0.0, seed=1):
+    """
+    Branche le pool partagé (utils/database.py) sur la base synthétique.
+
+    A appeler avant le premier emprunt de connexion.
+
+    Returns:
+        OfflineConnection: Connexion à garder ouverte pendant le benchmark
+    """
+    keeper = build_database(dealers, users_per_dealer, seed)
+    database.pool = database.ConnectionPool(latency_connector(latency))
+    return keeper
@@ -0,0 +1,94 @@
+"""
+Benchmark de construction des listes de la page d'accueil selon le nombre de concessions.
+
+Mesure build_dealer_list (WELCOME + IDOCS) sur des bases synthétiques de
+taille croissante (voir bench_data.py) : le temps par concession doit rester
+constant (coût linéaire). L'ancienne boucle (iterrows et filtre de con_nom
+pour chaque concession, coût quadratique) est mesurée jusqu'à --legacy-max
+concessions.
+
+Usage:
+    python scripts/bench_home.py
+    python scripts/bench_home.py --sizes 1000 4000 16000 64000 --legacy-max 4000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_data import build_database
+
+from app import build_dealer_list
+from utils.names import ConcessionNameIndex
+from utils.queries import read_query
+from utils.stats import load_dealer_counts
+
+
+def legacy_dealer_list(sap_princs, df_con_nom, counts, other_ids, source):
+    """Ancienne construction : une recherche dans con_nom par concession."""
+    dealers = []
+    for sap_princ in sap_princs:
+        name_row = df_con_nom[df_con_nom["sap_princ"] == sap_princ]
+        sap_nom = name_row["sap_nom"].iloc[0] if len(name_row) > 0 else ""
+        names = []
+        for name in str(sap_nom or "").split(";"):
+            if ":" in name:
+                prefix, content = name.split(":", 1)
+                if prefix.strip().upper() == source and content.strip():
+                    names.append(content.strip())
+        if names:
+            dealers.append({"sap_princ": sap_princ, "names": names,
+                            "count_users": counts.get(sap_princ, 0), "in_both": sap_princ in other_ids})
+    return sorted(dealers, key=lambda x: str(x["sap_princ"]))
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût de la liste des concessions selon leur nombre")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4000, 8000, 16000],
+                        help="Nombres de concessions mesurés")
+    parser.add_argument("--users", type=int, default=2, help="Utilisateurs par concession (défaut: 2)")
+    parser.add_argument("--repeat", type=int, default=5, help="Constructions mesurées par taille (défaut: 5)")
+    parser.add_argument("--legacy-max", type=int, default=4000,
+                        help="Taille maximum pour l'ancienne boucle (défaut: 4000)")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+
+    print(f"{'Concessions':>12s} {'vectorisé':>12s} {'µs/conc.':>9s} {'ancien':>12s} {'µs/conc.':>9s}")
+    for size in args.sizes:
+        keeper = build_database(size, args.users)
+        counts = load_dealer_counts(keeper)
+        df_con_nom = read_query(keeper, "reference.con_nom")
+        names = ConcessionNameIndex.build(df_con_nom)
+        welcome, idocs = counts["welcome"], counts["idocs"]
+        welcome_ids, idocs_ids = set(welcome.index), set(idocs.index)
+        keeper.close()
+
+        def current():
+            build_dealer_list(welcome.index.to_series(), names, welcome, idocs_ids, "WELCOME")
+            build_dealer_list(idocs.index.to_series(), names, idocs, welcome_ids, "IDOCS")
+
+        def legacy():
+            legacy_dealer_list(welcome.index, df_con_nom, welcome, idocs_ids, "WELCOME")
+            legacy_dealer_list(idocs.index, df_con_nom, idocs, welcome_ids, "IDOCS")
+
+        current_ms = timed(current, args.repeat)
+        line = f"{size:12d} {current_ms:9.1f} ms {current_ms * 1000 / size:9.2f}"
+        if size <= args.legacy_max:
+            legacy_ms = timed(legacy, 1)
+            line += f" {legacy_ms:9.1f} ms {legacy_ms * 1000 / size:9.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
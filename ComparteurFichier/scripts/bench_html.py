@@ -0,0 +1,109 @@
+"""
+Benchmark du rendu HTML des tableaux de comparaison (utils/formatters.py).
+
+Compare l'ancien df_to_html (iterrows, une chaîne complète) au rendu par
+colonnes iter_table_html (morceaux streamés) à 1k, 10k et 100k lignes, pour
+les deux contextes : /compare (sap) et /dealers (return_url, attributs
+data-*). Le HTML doit être identique octet pour octet (code retour 1 sinon).
+
+Usage:
+    python scripts/bench_html.py
+    python scripts/bench_html.py --sizes 1000 10000 100000 500000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.formatters import format_iwu_column, iter_table_html
+
+NOMS = ["Dupont", "Müller", "Lefèvre", "Martin", "O'Neil", "Bernard"]
+PRENOMS = ["Jean", "René", "Zoé", "Paul", "Anaïs", "Luc"]
+
+
+def legacy_df_to_html(df, sap=None, return_url=None):
+    """Version d'origine (iterrows), conservée comme référence."""
+    rows = []
+    display_cols = ["Nom Prénom", "iwu_id"]
+
+    header = "<tr>" + "".join(f"<th>{c}</th>" for c in display_cols) + "</tr>"
+    rows.append(header)
+
+    for _, row in df.iterrows():
+        css = row["status"]
+        iwu_val = format_iwu_column(row["iwu_id"])
+        nom_prenom = f"{row['nom']} {row['prenom']}"
+        dealer_match = row.get("dealer_match", True)
+        if return_url:
+            dealer_code = row.get("sap_dealer", sap)
+            onclick = f"openUser('{row['id_cree']}', '{dealer_code}', '{return_url}')"
+            nom_safe = str(row['nom']).replace("'", "")
+            prenom_safe = str(row['prenom']).replace("'", "")
+            iwu_safe = str(row['iwu_id']).replace("'", "")
+            data_attr = f' data-dealer="{dealer_code}" data-dealer-match="{str(dealer_match).lower()}" data-nom="{nom_safe}" data-prenom="{prenom_safe}" data-iwu="{iwu_safe}"'
+        else:
+            onclick = f"openUser('{row['id_cree']}', '{sap}')"
+            data_attr = ""
+        cells = ""
+        cells += f'<td onclick="{onclick}">{nom_prenom}</td>'
+        cells += f'<td onclick="{onclick}">{iwu_val}</td>'
+        rows.append(f'<tr class="{css}"{data_attr}>{cells}</tr>')
+
+    table_class = "table table-bordered" if return_url else "table table-bordered table-striped"
+    return f"<table class='{table_class}'>" + "".join(rows) + "</table>"
+
+
+def synthetic_frame(rows, seed=1):
+    """
+    Tableau de comparaison synthétique (colonnes de user_comparison + sous-concessions).
+
+    Returns:
+        pd.DataFrame: id_cree, nom, prenom, iwu_id, status, sap_dealer, dealer_match
+    """
+    rnd = random.Random(seed)
+    data = []
+    for i in range(rows):
+        nom, prenom = rnd.choice(NOMS), rnd.choice(PRENOMS)
+        iwu_id = rnd.choice(["NONE", f"IWU{i}", f"IWU{i};IWU{i + 1}", f"IWU{i};NONE;IWU{i + 2};IWU{i + 3}"])
+        data.append((f"{prenom}.{nom}{i}", nom, prenom, iwu_id, rnd.choice(["both", "only"]),
+                     str(10000 + i % 7), rnd.random() < .9))
+    return pd.DataFrame(data, columns=["id_cree", "nom", "prenom", "iwu_id", "status", "sap_dealer", "dealer_match"])
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendu HTML des tableaux : iterrows vs colonnes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Nombres de lignes mesurés (défaut: 1000 10000 100000)")
+    args = parser.parse_args()
+
+    identical = True
+    print(f"{'Lignes':>8s} {'Contexte':10s} {'iterrows':>12s} {'colonnes':>12s} {'gain':>7s} {'1er morceau':>12s}")
+    for size in args.sizes:
+        df = synthetic_frame(size)
+        for context, options in [("/compare", {"sap": "10001"}), ("/dealers", {"return_url": "/dealers/10001"})]:
+            expected, legacy_ms = timed(lambda: legacy_df_to_html(df, **options))
+            html, current_ms = timed(lambda: "".join(iter_table_html(df, **options)))
+            # En-tête + premières lignes : ce que le navigateur reçoit avant la fin du rendu
+            _, first_ms = timed(lambda: list(itertools.islice(iter_table_html(df, **options), 2)))
+            identical &= html == expected
+            print(f"{size:8d} {context:10s} {legacy_ms:9.1f} ms {current_ms:9.1f} ms "
+                  f"{legacy_ms / current_ms:6.1f}x {first_ms:9.2f} ms")
+
+    print(f"\nHTML identique à l'ancienne version : {'oui' if identical else 'NON'}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
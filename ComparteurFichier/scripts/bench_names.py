@@ -0,0 +1,135 @@
+"""
+Benchmark de generate_names_final.py sur un classeur synthétique (200k lignes par défaut).
+
+Mesure :
+- la construction des noms : build_names (groupby, une passe) et l'ancienne
+  boucle par SAP principal (filtre + iterrows, coût quadratique), cette
+  dernière jusqu'à --legacy-max lignes, avec vérification que les deux
+  tables sont identiques (code retour 1 sinon)
+- la lecture des fichiers : Excel direct puis copie Parquet en cache
+  (read_excel_cached), si openpyxl est installé pour écrire le classeur
+
+Usage:
+    python scripts/bench_names.py
+    python scripts/bench_names.py --rows 500000 --saps 50000 --legacy-max 20000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_names_final import APP_COLUMNS, IDOCS_COLUMNS, build_names, prepare_source, read_excel_cached
+
+NOMS = ["SPL SECLIN", "Garage Nord", "  Auto Sud ", "Él Véhicules", "nan", ""] + [f"Dealer {i}" for i in range(200)]
+
+
+def synthetic_source(columns, rows, saps, seed):
+    """
+    Export Excel synthétique (colonnes telles que lues par read_excel).
+
+    Args:
+        columns (dict): Colonnes Excel -> colonnes internes (IDOCS_COLUMNS / APP_COLUMNS)
+        rows (int): Nombre de lignes
+        saps (int): Nombre de SAP principaux distincts
+        seed (int): Graine du générateur
+
+    Returns:
+        pd.DataFrame: Colonnes SAP (nombres, parfois vides) et nom
+    """
+    rnd = random.Random(seed)
+    dealer, princ, nom = columns
+    princs = [rnd.randint(10000, 10000 + saps) for _ in range(rows)]
+    # Un tiers des lignes strictes (SAP Dealer == SAP Principal)
+    dealers = [p if rnd.random() < .3 else rnd.randint(50000, 50000 + saps) for p in princs]
+    return pd.DataFrame({
+        dealer: [float(d) if rnd.random() > .01 else None for d in dealers],
+        princ: [float(p) if rnd.random() > .01 else None for p in princs],
+        nom: [rnd.choice(NOMS) for _ in range(rows)],
+    })
+
+
+def legacy_build(idocs, app):
+    """Ancienne construction : filtre de chaque source et iterrows pour chaque SAP principal."""
+    def get_names_list(sap_id, source_df, source_name):
+        rows = source_df[source_df["sap_princ"] == sap_id]
+        strict_rows = rows[rows["sap_dealer"] == sap_id]
+        use_rows = strict_rows if not strict_rows.empty else rows
+        names, seen = [], set()
+        for _, r in use_rows.iterrows():
+            nom = r["sap_nom"]
+            if nom and nom.lower() != "nan" and nom not in seen:
+                seen.add(nom)
+                names.append(f"{source_name}: {nom}")
+        return names
+
+    all_sap_princ = [s for s in set(idocs["sap_princ"]) | set(app["sap_princ"]) if s]
+    rows = [{"sap_princ": s, "sap_nom": " ; ".join(get_names_list(s, idocs, "IDOCS") + get_names_list(s, app, "WELCOME"))}
+            for s in all_sap_princ]
+    return pd.DataFrame(rows).sort_values("sap_princ").reset_index(drop=True)
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:44s} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def bench_excel(df_idocs, tmp_dir):
+    """Lecture Excel directe puis depuis le cache Parquet (openpyxl requis)."""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        print("openpyxl absent : lecture Excel / Parquet non mesurée")
+        return
+    path = os.path.join(tmp_dir, "donnees_lisible.xlsx")
+    timed("écriture du classeur (préparation)", lambda: df_idocs.to_excel(path, index=False))
+    cache_dir = os.path.join(tmp_dir, "cache")
+    timed("read_excel_cached, sans cache (Excel)", lambda: read_excel_cached(path, list(IDOCS_COLUMNS), None))
+    timed("read_excel_cached, 1re lecture (Excel + Parquet)", lambda: read_excel_cached(path, list(IDOCS_COLUMNS), cache_dir))
+    timed("read_excel_cached, cache Parquet", lambda: read_excel_cached(path, list(IDOCS_COLUMNS), cache_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vitesse de generate_names_final.py sur un classeur synthétique")
+    parser.add_argument("--rows", type=int, default=200_000, help="Lignes par fichier source (défaut: 200000)")
+    parser.add_argument("--saps", type=int, default=20_000, help="SAP principaux distincts (défaut: 20000)")
+    parser.add_argument("--legacy-max", type=int, default=10_000,
+                        help="Lignes maximum pour l'ancienne boucle (défaut: 10000)")
+    args = parser.parse_args()
+
+    df_idocs = synthetic_source(list(IDOCS_COLUMNS), args.rows, args.saps, seed=1)
+    df_app = synthetic_source(list(APP_COLUMNS), args.rows, args.saps, seed=2)
+    print(f"=== {args.rows} lignes par source, {args.saps} SAP principaux ===\n")
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_names_")
+    try:
+        bench_excel(df_idocs, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    idocs, app = timed("prepare_source (IDOCS + WELCOME)",
+                       lambda: (prepare_source(df_idocs, IDOCS_COLUMNS), prepare_source(df_app, APP_COLUMNS)))
+    result = timed(f"build_names ({args.rows} lignes)", lambda: build_names(idocs, app))
+    print(f"  {len(result)} concessions")
+
+    # Ancienne boucle : sous-ensemble des premières lignes (coût quadratique)
+    rows = min(args.rows, args.legacy_max)
+    idocs, app = idocs.head(rows), app.head(rows)
+    current = timed(f"build_names ({rows} lignes)", lambda: build_names(idocs, app))
+    expected = timed(f"ancienne boucle ({rows} lignes)", lambda: legacy_build(idocs, app))
+
+    identical = current.values.tolist() == expected.values.tolist()
+    print(f"\nNoms identiques à l'ancienne version : {'oui' if identical else 'NON'}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
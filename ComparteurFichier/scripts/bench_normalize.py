@@ -0,0 +1,96 @@
+"""
+Micro-benchmark de la normalisation des identifiants (utils/parsers.py).
+
+Compare sur --count identifiants synthétiques (accents, casse, séparateurs,
+doublons SSO / IDOCS) :
+- l'ancienne normalize_id (NFD + filtre par caractère + regex) via Series.apply
+- normalize_id mémorisée (cache LRU vide puis rempli) via Series.apply
+- normalize_ids vectorisée
+Les résultats doivent être identiques à l'ancienne version (code retour 1 sinon).
+
+Usage:
+    python scripts/bench_normalize.py
+    python scripts/bench_normalize.py --count 1000000 --distinct 0.3
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parsers import normalize_id, normalize_ids, _normalize_text
+
+NOMS = ["Dupont", "Müller", "Lefèvre", "Martin", "O'Neil", "Bernard", "Garçon", "Łukasz", "Straße", "Nguyễn"]
+PRENOMS = ["Jean", "René", "Zoé", "Paul", "Anaïs", "Luc", "Jean-Luc", "Çelik", "İlker"]
+
+
+def legacy_normalize_id(s):
+    """Version d'origine, sans cache ni traitement vectorisé."""
+    if s is None:
+        return ""
+    s = str(s)
+    s = ''.join(c for c in unicodedata.normalize('NFD', s)
+                if unicodedata.category(c) != 'Mn')
+    s = re.sub(r'[^A-Za-z]', '', s)
+    return s.upper()
+
+
+def synthetic_ids(count, distinct, seed=1):
+    """
+    Identifiants id_cree synthétiques.
+
+    Args:
+        count (int): Nombre d'identifiants
+        distinct (float): Part d'identifiants distincts (les autres sont répétés)
+        seed (int): Graine du générateur
+
+    Returns:
+        pd.Series: Identifiants (dtype object)
+    """
+    rnd = random.Random(seed)
+    pool = []
+    for i in range(max(1, int(count * distinct))):
+        value = f"{rnd.choice(PRENOMS)}{rnd.choice(['.', '_', ' ', ''])}{rnd.choice(NOMS)}{i}"
+        pool.append(value.upper() if rnd.random() < .3 else value)
+    return pd.Series([rnd.choice(pool) for _ in range(count)], dtype=object)
+
+
+def timed(label, func, baseline=None):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    speedup = f"{baseline / elapsed:8.1f}x" if baseline else ""
+    print(f"{label:38s} {elapsed * 1000:10.1f} ms {speedup}")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vitesse de normalize_id / normalize_ids")
+    parser.add_argument("--count", type=int, default=100_000, help="Identifiants normalisés (défaut: 100000)")
+    parser.add_argument("--distinct", type=float, default=0.5,
+                        help="Part d'identifiants distincts (défaut: 0.5)")
+    args = parser.parse_args()
+
+    ids = synthetic_ids(args.count, args.distinct)
+    print(f"=== {len(ids)} identifiants, {ids.nunique()} distincts ===\n")
+
+    expected, baseline = timed("ancienne normalize_id (apply)", lambda: ids.apply(legacy_normalize_id))
+    # Cache LRU de normalize_id vidé : première passe sans mémorisation
+    _normalize_text.cache_clear()
+    cold, _ = timed("normalize_id, cache vide (apply)", lambda: ids.apply(normalize_id), baseline)
+    warm, _ = timed("normalize_id, cache rempli (apply)", lambda: ids.apply(normalize_id), baseline)
+    vectorized, _ = timed("normalize_ids (vectorisée)", lambda: normalize_ids(ids), baseline)
+
+    identical = all(result.tolist() == expected.tolist() for result in (cold, warm, vectorized))
+    print(f"\nRésultats identiques à l'ancienne version : {'oui' if identical else 'NON'}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
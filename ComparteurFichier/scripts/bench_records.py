@@ -0,0 +1,103 @@
+"""
+Benchmark de latence des routes à petits résultats : enregistrements vs DataFrame.
+
+Les petites lectures (utils/queries.fetch_records : /compare_user, /user,
+/api/users, noms de /dealers) sont mesurées telles quelles, puis en
+repassant par pd.read_sql comme avant (read_query + conversion en
+enregistrements, même résultat pour les pages). Sans latence ajoutée par
+défaut : le coût mesuré est celui de la construction des DataFrames.
+L'index utilisateurs (DDL MySQL) n'existe pas dans la base synthétique :
+/compare_user passe par la lecture directe des tables sources.
+
+Usage:
+    python scripts/bench_records.py
+    python scripts/bench_records.py --latency 0.005 --repeat 50
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_data import install_fake_database
+
+from utils.queries import read_query, record_type
+
+# Modules qui lisent par fetch_records (importé par nom)
+FETCH_MODULES = ["app", "utils.comparison", "utils.duplicates", "utils.user_index", "utils.users"]
+
+
+def read_sql_records(conn, name, params=None, **parts):
+    """Ancien chemin : DataFrame pd.read_sql, reconverti en enregistrements (NULL -> None)."""
+    df = read_query(conn, name, params, **parts)
+    df = df.astype(object).where(df.notna(), None)
+    record = record_type(tuple(df.columns))
+    return [record._make(row) for row in df.itertuples(index=False, name=None)]
+
+
+def use_fetch(fetch):
+    for module in FETCH_MODULES:
+        sys.modules[module].fetch_records = fetch
+
+
+def measure(client, url, repeat):
+    """Meilleure latence moyenne (ms) sur 5 séries de repeat appels, corps lu en entier."""
+    client.get(url).get_data()  # caches de référence chargés hors mesure
+    best = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = client.get(url)
+            response.get_data()
+            response.close()
+        best.append((time.perf_counter() - start) / repeat * 1000)
+    return min(best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des routes, fetch_records vs pd.read_sql")
+    parser.add_argument("--dealers", type=int, default=500, help="Concessions générées (défaut: 500)")
+    parser.add_argument("--users", type=int, default=20, help="Utilisateurs par concession (défaut: 20)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence par requête en secondes (défaut: 0)")
+    parser.add_argument("--repeat", type=int, default=20, help="Appels par série de mesure (défaut: 20)")
+    args = parser.parse_args()
+
+    # pd.read_sql prévient pour toute connexion DB-API autre que sqlite3 (pymysql compris)
+    warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+    keeper = install_fake_database(args.dealers, args.users, args.latency)
+
+    import app as app_module
+    from utils import queries
+
+    with keeper.cursor() as cursor:
+        cursor.execute("SELECT id_cree, sap_princ FROM sso ORDER BY id_cree LIMIT 1")
+        user, sap = cursor.fetchone()
+    urls = [
+        f"/compare_user?id={user}",
+        f"/compare_user?id={user}&sap={sap}",
+        "/user",
+        "/api/users",
+        "/dealers/10003",
+    ]
+
+    client = app_module.app.test_client()
+    print(f"=== {args.dealers} concessions, latence {args.latency * 1000:.0f} ms par requête ===\n")
+    print(f"{'Route':45s} {'pd.read_sql':>12s} {'records':>12s} {'gain':>7s}")
+    identical = True
+    for url in urls:
+        use_fetch(read_sql_records)
+        before = measure(client, url, args.repeat)
+        expected = client.get(url).get_data()
+        use_fetch(queries.fetch_records)
+        after = measure(client, url, args.repeat)
+        identical &= client.get(url).get_data() == expected
+        print(f"{url:45s} {before:9.2f} ms {after:9.2f} ms {before / after:6.2f}x")
+
+    print(f"\nPages identiques avec les deux chemins : {'oui' if identical else 'NON'}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de latence des routes de comparaison sur une fausse base à latence injectée.
+
+Chaque requête SQL attend --latency secondes (aller-retour réseau simulé,
+voir bench_data.py). Les routes sont mesurées avec les lectures en parallèle
+(utils/parallel.py) puis en séquentiel sur une seule connexion.
+
+Usage:
+    python scripts/bench_routes.py
+    python scripts/bench_routes.py --latency 0.05 --dealers 2000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_data import install_fake_database
+
+
+def measure(client, url, repeat):
+    """Latence moyenne d'une route (ms), corps streamé lu en entier."""
+    client.get(url).get_data()  # caches de référence chargés hors mesure
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url)
+        response.get_data()
+        response.close()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des routes, lectures parallèles vs séquentielles")
+    parser.add_argument("--dealers", type=int, default=500, help="Concessions générées (défaut: 500)")
+    parser.add_argument("--users", type=int, default=20, help="Utilisateurs par concession (défaut: 20)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence par requête en secondes (défaut: 0.02)")
+    parser.add_argument("--repeat", type=int, default=10, help="Appels mesurés par route (défaut: 10)")
+    args = parser.parse_args()
+
+    # pd.read_sql prévient pour toute connexion DB-API autre que sqlite3 (pymysql compris)
+    warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+    keeper = install_fake_database(args.dealers, args.users, args.latency)
+
+    import app as app_module
+    from utils import parallel
+
+    with keeper.cursor() as cursor:
+        cursor.execute("SELECT id_cree FROM sso ORDER BY id_cree LIMIT 1")
+        user = cursor.fetchone()[0]
+    urls = [
+        "/dealers/10003",
+        "/compare?sap_princ=10005",
+        f"/compare_user?id={user}",
+        "/api/compare?sap_princ=10001,10002",
+    ]
+
+    client = app_module.app.test_client()
+    executor = parallel._executor
+    print(f"=== {args.dealers} concessions, latence {args.latency * 1000:.0f} ms par requête ===\n")
+    print(f"{'Route':45s} {'séquentiel':>12s} {'parallèle':>12s} {'gain':>7s}")
+    for url in urls:
+        parallel._executor = None
+        sequential = measure(client, url, args.repeat)
+        parallel._executor = executor
+        concurrent = measure(client, url, args.repeat)
+        print(f"{url:45s} {sequential:9.1f} ms {concurrent:9.1f} ms {sequential / concurrent:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Construit / rafraîchit la table matérialisée user_comparison.
+
+Usage:
+    python scripts/build_comparison.py          # incrémental (concessions modifiées)
+    python scripts/build_comparison.py --full   # reconstruction complète
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.comparison import refresh_store, REFRESH_BATCH
+from utils.database import get_conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matérialisation de la comparaison WELCOME / IDOCS")
+    parser.add_argument("--full", action="store_true", help="Recalculer toutes les concessions")
+    parser.add_argument("--batch-size", type=int, default=REFRESH_BATCH,
+                        help=f"Concessions par transaction (défaut: {REFRESH_BATCH})")
+    args = parser.parse_args()
+
+    with get_conn() as conn:
+        count = refresh_store(conn, full=args.full, batch_size=args.batch_size)
+
+    print(f"Succès ! {count} concession(s) recalculée(s)")
+
+
+if __name__ == "__main__":
+    main()
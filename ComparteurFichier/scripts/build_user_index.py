@@ -0,0 +1,28 @@
+"""
+Construit / reconstruit l'index inversé utilisateurs / IWU_ID utilisé par /compare_user.
+
+Usage:
+    python scripts/build_user_index.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_conn
+from utils.user_index import build_user_index
+
+
+def main():
+    print("Construction de l'index utilisateurs / IWU_ID...")
+
+    with get_conn() as conn:
+        counts = build_user_index(conn)
+
+    for table, count in counts.items():
+        print(f"  {table}: {count} lignes")
+    print("Succès ! Index reconstruit")
+
+
+if __name__ == "__main__":
+    main()
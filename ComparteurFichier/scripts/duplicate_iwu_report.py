@@ -0,0 +1,48 @@
+"""
+Rapport global des IWU_ID partagés par plusieurs identités (CSV).
+
+Usage:
+    python scripts/duplicate_iwu_report.py                      # doublons_iwu.csv
+    python scripts/duplicate_iwu_report.py -o rapport.csv --chunk-rows 5000
+    python scripts/duplicate_iwu_report.py --store              # reconstruit la table de /duplicates
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_conn
+from utils.duplicates import build_duplicate_report, iter_duplicate_iwu, iter_duplicate_csv, DUPLICATE_CHUNK_ROWS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport des IWU_ID en doublon")
+    parser.add_argument("-o", "--output", default="doublons_iwu.csv", help="Fichier CSV de sortie")
+    parser.add_argument("--chunk-rows", type=int, default=DUPLICATE_CHUNK_ROWS,
+                        help=f"Lignes lues par bloc (défaut: {DUPLICATE_CHUNK_ROWS})")
+    parser.add_argument("--store", action="store_true",
+                        help="Reconstruire la table iwu_duplicates (page /duplicates) au lieu du CSV")
+    args = parser.parse_args()
+
+    print("Analyse des IWU_ID (SSO + IDOCS)...")
+    if args.store:
+        with get_conn() as conn:
+            groups = build_duplicate_report(conn, chunk_rows=args.chunk_rows)
+        print(f"Succès ! {groups} IWU_ID en doublon écrits dans iwu_duplicates")
+        return
+
+    # Groupes écrits au fil de la lecture, sans garder le rapport en mémoire
+    # (un morceau CSV par groupe, après celui de l'en-tête)
+    chunks = 0
+    with get_conn() as conn, open(args.output, "w", encoding="utf-8-sig", newline="") as f:
+        duplicates = iter_duplicate_iwu(conn, chunk_rows=args.chunk_rows, log=print)
+        for chunk in iter_duplicate_csv(duplicates):
+            f.write(chunk)
+            chunks += 1
+
+    print(f"Succès ! {chunks - 1} IWU_ID en doublon écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Exporte les tables DealerView dans un snapshot Arrow (mode hors ligne, analyses).
+
+Usage:
+    python scripts/export_snapshot.py                       # snapshot_<date>/
+    python scripts/export_snapshot.py -o snapshots/ref --tables con_nom idocs_con
+    python scripts/export_snapshot.py --verify snapshots/ref
+
+Lancer l'application sur un snapshot :
+    DEALERVIEW_SNAPSHOT=snapshots/ref python app.py
+"""
+import argparse
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_conn
+from utils.snapshot import export_snapshot, read_manifest, SNAPSHOT_CHUNK_ROWS
+from utils.tables import IMPORTED_TABLES
+
+
+def verify(snapshot_dir):
+    """Vérifie les empreintes SHA-256 des fichiers d'un snapshot."""
+    manifest = read_manifest(snapshot_dir)
+    ok = True
+    for entry in manifest["tables"]:
+        digest = hashlib.sha256()
+        with open(os.path.join(snapshot_dir, entry["file"]), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        valid = digest.hexdigest() == entry["sha256"]
+        ok &= valid
+        print(f"[{'OK' if valid else 'ERR'}] {entry['table']}: {entry['rows']} lignes")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export des tables en snapshot Arrow")
+    parser.add_argument("-o", "--output-dir", help="Dossier du snapshot (défaut: snapshot_<date>)")
+    parser.add_argument("--tables", nargs="+", default=IMPORTED_TABLES, help="Tables à exporter")
+    parser.add_argument("--chunk-rows", type=int, default=SNAPSHOT_CHUNK_ROWS,
+                        help=f"Lignes lues par bloc (défaut: {SNAPSHOT_CHUNK_ROWS})")
+    parser.add_argument("--verify", metavar="DOSSIER", help="Vérifier un snapshot existant")
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify(args.verify) else 1)
+
+    snapshot_dir = args.output_dir or f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    print(f"=== Export du snapshot dans {snapshot_dir} ===\n")
+
+    with get_conn() as conn:
+        export_snapshot(conn, snapshot_dir, tables=args.tables, chunk_rows=args.chunk_rows)
+
+    print(f"\nSuccès ! Snapshot écrit dans {snapshot_dir}")
+    print(f"Mode hors ligne : DEALERVIEW_SNAPSHOT={snapshot_dir} python app.py")
+
+
+if __name__ == "__main__":
+    main()
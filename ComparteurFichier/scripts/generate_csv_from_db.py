@@ -1,66 +1,53 @@
-import psycopg2
+import argparse
+import os
+import sys
+
 import pandas as pd
-import re
 
-# Database connection
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.names import parse_concession_names
+from utils.repository import get_repository, REPOSITORIES
+
+# Database connection (backend postgres)
 DB_HOST = "localhost"
 DB_NAME = "dealerview"
 DB_USER = "postgres"
 DB_PASS = "123"
 
-def get_conn():
-    return psycopg2.connect(
-        host=DB_HOST,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS
-    )
-
-def parse_names_to_columns(sap_nom_string):
-    """
-    Parses 'IDOCS: Name1; WELCOME: Name2' into separate IDOCS and WELCOME strings.
-    """
-    if not sap_nom_string or pd.isna(sap_nom_string):
-        return "", ""
-    
-    parts = [p.strip() for p in str(sap_nom_string).split(';')]
-    
-    idocs_names = []
-    welcome_names = []
-    
-    for part in parts:
-        if part.startswith("IDOCS:"):
-            name = part.replace("IDOCS:", "").strip()
-            if name and name not in idocs_names:
-                idocs_names.append(name)
-        elif part.startswith("WELCOME:"):
-            name = part.replace("WELCOME:", "").strip()
-            if name and name not in welcome_names:
-                welcome_names.append(name)
-                
-    return " / ".join(idocs_names), " / ".join(welcome_names)
+def open_repository(backend, snapshot=None):
+    if backend == "postgres":
+        return get_repository("postgres", host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASS)
+    repo = get_repository(backend)
+    if backend == "sqlite" and snapshot:
+        repo.load_snapshot(snapshot)
+    return repo
 
 def main():
-    conn = get_conn()
+    parser = argparse.ArgumentParser(description="Export des noms de concessions (con_nom) en CSV")
+    parser.add_argument("--backend", choices=list(REPOSITORIES), default="postgres",
+                        help="Source des données (défaut: postgres)")
+    parser.add_argument("--snapshot", help="Snapshot Arrow à charger (backend sqlite)")
+    args = parser.parse_args()
+
+    repo = open_repository(args.backend, args.snapshot)
     
     print("Reading from con_nom table...")
-    df = pd.read_sql("SELECT sap_princ, sap_nom FROM con_nom", conn)
-    conn.close()
+    df = repo.get_dealer_names()
     
     print(f"Found {len(df)} rows.")
     
     # Apply parsing
     print("Parsing names...")
-    # Apply returns a DataFrame if result_type='expand' is used, but simple apply returns Series of tuples
-    # Let's do it simply
+    # Same parser as the application (utils/names.py), duplicate names removed
     
     results = []
-    for _, row in df.iterrows():
-        nom_idocs, nom_welcome = parse_names_to_columns(row['sap_nom'])
+    for sap_princ, sap_nom in zip(df['sap_princ'], df['sap_nom']):
+        names = parse_concession_names(sap_princ, sap_nom)
         results.append({
-            'sap_princ': row['sap_princ'],
-            'nom_idocs': nom_idocs,
-            'nom_welcome': nom_welcome
+            'sap_princ': sap_princ,
+            'nom_idocs': " / ".join(dict.fromkeys(names.idocs)),
+            'nom_welcome': " / ".join(dict.fromkeys(names.welcome))
         })
         
     df_out = pd.DataFrame(results)
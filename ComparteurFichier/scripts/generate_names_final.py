@@ -1,7 +1,15 @@
-import pandas as pd
+import argparse
 import os
+import re
 import sys
 
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_conn
+from utils.names import write_con_nom
+
 # ============================
 # Configuration
 # ============================
@@ -9,134 +17,319 @@ FILE_IDOCS = "donnees_lisible.xlsx"
 FILE_APP = "App.xlsx"
 OUTPUT_CSV = "DB_concession_names.csv"
 
-def clean_sap(x):
-    s = str(x).strip()
-    if s.lower() == "nan" or s == "":
-        return ""
-    if s.endswith(".0"):
-        s = s[:-2]
-    return s
+# Copies Parquet des fichiers Excel (relues tant que l'Excel n'a pas changé)
+CACHE_DIR = ".excel_cache"
 
-def main():
-    # Vérification de la présence des fichiers
-    if not os.path.exists(FILE_IDOCS):
-        print(f"ERREUR: Le fichier '{FILE_IDOCS}' est introuvable.")
-        print("Veuillez uploader le fichier Excel.")
-        return
-    if not os.path.exists(FILE_APP):
-        print(f"ERREUR: Le fichier '{FILE_APP}' est introuvable.")
-        print("Veuillez uploader le fichier Excel.")
-        return
+# Etat de con_nom après le dernier --db (empreintes par concession + noms), pour --incremental
+STATE_FILE = os.path.join(CACHE_DIR, "names_state.csv")
 
-    print("Chargement des fichiers Excel...")
+# Colonnes utiles par fichier : colonne Excel -> colonne interne
+IDOCS_COLUMNS = {
+    "Vendu au code SAP": "sap_dealer",
+    "Code SAP du payeur": "sap_princ",
+    "Payer SAP Name": "sap_nom",
+}
+APP_COLUMNS = {
+    "SAP Officina": "sap_dealer",
+    "SAP Dealer": "sap_princ",
+    "Company Name": "sap_nom",
+}
+
+def clean_saps(values):
+    """Codes SAP d'une colonne en texte : sans espaces ni suffixe ".0" (cellules vides -> "")."""
+    s = values.astype(object).where(values.notna(), "").map(str).str.strip()
+    s = s.where(s.str.lower() != "nan", "")
+    return s.str.replace(r"\.0$", "", regex=True)
+
+# ============================
+# LECTURE EXCEL (cache Parquet)
+# ============================
+def prune_excel_cache(cache_dir, name, keep):
+    """
+    Supprime les anciennes copies Parquet d'un fichier Excel.
+
+    Args:
+        cache_dir (str): Dossier du cache Parquet
+        name (str): Nom du fichier Excel sans extension
+        keep (str): Copie à conserver (chemin complet)
+
+    Returns:
+        int: Nombre de copies supprimées
+    """
+    pattern = re.compile(re.escape(name) + r"\.\d+\.\d+\.parquet")
+    removed = 0
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if pattern.fullmatch(entry) and path != keep:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def read_excel_cached(path, columns, cache_dir=CACHE_DIR):
+    """
+    Lit les colonnes utiles d'un fichier Excel, via une copie Parquet en cache.
+
+    La copie est nommée d'après la taille et la date de modification de
+    l'Excel : elle est réutilisée tant que le fichier n'a pas changé, et les
+    copies des versions précédentes sont supprimées à l'écriture de la
+    nouvelle. Sans pyarrow (ou avec cache_dir=None), l'Excel est lu directement.
+
+    Args:
+        path (str): Fichier Excel
+        columns (list): Colonnes à lire (noms sans espaces superflus)
+        cache_dir (str | None): Dossier du cache Parquet
+
+    Returns:
+        pd.DataFrame: Colonnes demandées, en-têtes nettoyés
+    """
     try:
-        df_idocs = pd.read_excel(FILE_IDOCS)
-        df_app = pd.read_excel(FILE_APP)
-    except Exception as e:
-        print(f"Erreur lors de la lecture des fichiers Excel: {e}")
-        return
+        import pyarrow  # noqa: F401
+    except ImportError:
+        cache_dir = None
 
-    # Nettoyage des noms de colonnes
-    df_idocs.columns = df_idocs.columns.str.strip()
-    df_app.columns = df_app.columns.str.strip()
+    cache_path = None
+    if cache_dir:
+        stat = os.stat(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{name}.{stat.st_size}.{stat.st_mtime_ns}.parquet")
+        if os.path.exists(cache_path):
+            print(f"  {path} : cache {cache_path}")
+            return pd.read_parquet(cache_path)
 
-    # ============================
-    # MAPPING IDOCS
-    # ============================
-    print("Traitement des données IDOCS...")
-    idocs = df_idocs.copy()
-    idocs["sap_dealer"] = idocs["Vendu au code SAP"].map(clean_sap)
-    idocs["sap_princ"] = idocs["Code SAP du payeur"].map(clean_sap)
-    idocs["sap_nom"] = idocs["Payer SAP Name"].fillna("").astype(str).str.strip()
+    wanted = set(columns)
+    df = pd.read_excel(path, usecols=lambda c: str(c).strip() in wanted)
+    df.columns = df.columns.str.strip()
 
-    sap_idocs = idocs["sap_princ"].unique()
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Types mixtes (nombres et texte dans une colonne) : stockés en texte, NULL conservés
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].map(lambda v: v if v is None or isinstance(v, str) or v != v else str(v))
+        df.to_parquet(cache_path, index=False)
+        prune_excel_cache(cache_dir, name, cache_path)
+    return df
 
-    # ============================
-    # MAPPING WELCOME (APP)
-    # ============================
-    print("Traitement des données WELCOME...")
-    app = df_app.copy()
-    app["sap_dealer"] = app["SAP Officina"].map(clean_sap)
-    app["sap_princ"] = app["SAP Dealer"].map(clean_sap)
-    app["sap_nom"] = app["Company Name"].fillna("").astype(str).str.strip()
+def prepare_source(df, columns):
+    """Colonnes sap_dealer, sap_princ, sap_nom nettoyées d'un fichier source."""
+    df = df.rename(columns=columns)
+    return pd.DataFrame({
+        "sap_dealer": clean_saps(df["sap_dealer"]),
+        "sap_princ": clean_saps(df["sap_princ"]),
+        "sap_nom": df["sap_nom"].fillna("").astype(str).str.strip(),
+    })
 
-    sap_app = app["sap_princ"].unique()
+# ============================
+# LOGIQUE DE RECHERCHE DE NOM (STRICTE)
+# ============================
+def names_by_sap(source_df, source_name):
+    """
+    Noms préfixés par SAP principal, en une passe sur toute la source.
 
-    # ============================
-    # LISTE DES SAP PRINCIPAUX UNIQUES
-    # ============================
-    all_sap_princ = list(set(list(sap_idocs) + list(sap_app)))
-    all_sap_princ = [s for s in all_sap_princ if s and s.lower() != "nan"]
-    
-    df_sap = pd.DataFrame({"sap_princ": all_sap_princ})
+    Pour chaque sap_princ, seules les lignes où SAP Dealer == SAP Principal
+    sont retenues s'il en existe, sinon toutes ses lignes. Les noms vides
+    ou "nan" sont ignorés, les doublons supprimés (ordre du fichier).
+
+    Args:
+        source_df (pd.DataFrame): Colonnes sap_dealer, sap_princ, sap_nom
+        source_name (str): "IDOCS" ou "WELCOME"
+
+    Returns:
+        pd.Series: "SOURCE: Nom ; SOURCE: Nom2" indexé par sap_princ
+    """
+    strict = source_df["sap_dealer"] == source_df["sap_princ"]
+    has_strict = strict.groupby(source_df["sap_princ"]).transform("any")
+    rows = source_df[strict | ~has_strict]
+
+    nom = rows["sap_nom"]
+    rows = rows[(nom != "") & (nom.str.lower() != "nan")]
+    rows = rows.drop_duplicates(["sap_princ", "sap_nom"])
+
+    prefixed = source_name + ": " + rows["sap_nom"]
+    return prefixed.groupby(rows["sap_princ"], sort=False).agg(" ; ".join)
+
+def build_names(idocs, app):
+    """
+    Table finale sap_princ / sap_nom (noms IDOCS puis WELCOME).
+
+    Args:
+        idocs (pd.DataFrame): Source IDOCS préparée (prepare_source)
+        app (pd.DataFrame): Source WELCOME préparée
+
+    Returns:
+        pd.DataFrame: Colonnes sap_princ, sap_nom triées par sap_princ
+    """
+    # Liste des SAP principaux uniques
+    all_sap_princ = pd.Series(pd.unique(pd.concat([idocs["sap_princ"], app["sap_princ"]])), dtype=object)
+    all_sap_princ = all_sap_princ[all_sap_princ != ""]
+    all_sap_princ = all_sap_princ.sort_values().reset_index(drop=True)
+
+    names_idocs = all_sap_princ.map(names_by_sap(idocs, "IDOCS")).fillna("")
+    names_welcome = all_sap_princ.map(names_by_sap(app, "WELCOME")).fillna("")
+
+    # Joindre par des points-virgules (séparateur seulement si les deux sources ont des noms)
+    separator = pd.Series(" ; ", index=all_sap_princ.index).where((names_idocs != "") & (names_welcome != ""), "")
+    return pd.DataFrame({
+        "sap_princ": all_sap_princ,
+        "sap_nom": names_idocs + separator + names_welcome,
+    })
+
+# ============================
+# REGENERATION INCREMENTALE
+# ============================
+def group_fingerprints(source_df):
+    """
+    Empreinte des lignes de chaque SAP principal d'une source.
+
+    Chaque ligne est hachée avec sa position dans la concession
+    (sap_dealer, sap_nom, rang), puis les empreintes d'une concession sont
+    sommées : l'empreinte change dès qu'une ligne est ajoutée, supprimée,
+    modifiée ou déplacée.
+
+    Args:
+        source_df (pd.DataFrame): Source préparée (prepare_source)
+
+    Returns:
+        pd.Series: Empreinte hexadécimale indexée par sap_princ
+    """
+    rows = source_df[source_df["sap_princ"] != ""]
+    keyed = pd.DataFrame({
+        "sap_dealer": rows["sap_dealer"].to_numpy(),
+        "sap_nom": rows["sap_nom"].to_numpy(),
+        "rank": rows.groupby("sap_princ").cumcount().to_numpy(),
+    })
+    row_hash = pd.util.hash_pandas_object(keyed, index=False)
+    # Somme uint64 (modulo 2**64) par concession
+    sums = row_hash.groupby(rows["sap_princ"].to_numpy(), sort=False).sum()
+    return sums.map("{:016x}".format)
+
+def fingerprints(idocs, app):
+    """Empreintes IDOCS et WELCOME par sap_princ ("" si absent d'une source)."""
+    return pd.DataFrame({
+        "fp_idocs": group_fingerprints(idocs),
+        "fp_welcome": group_fingerprints(app),
+    }).fillna("")
+
+def read_state(path):
+    """
+    Etat de la génération précédente.
+
+    Returns:
+        pd.DataFrame | None: Colonnes fp_idocs, fp_welcome, sap_nom indexées par sap_princ
+    """
+    if not os.path.exists(path):
+        return None
+    state = pd.read_csv(path, sep=';', encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    return state.set_index("sap_princ")
+
+def write_state(path, fps, df_final):
+    """Enregistre empreintes et noms écrits dans con_nom (base du prochain --incremental)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    state = fps.join(df_final.set_index("sap_princ"), how="inner")
+    state.index.name = "sap_princ"
+    state.to_csv(path, sep=';', encoding="utf-8-sig")
+
+def build_incremental(idocs, app, fps, state):
+    """
+    Recalcule uniquement les concessions dont les lignes sources ont changé.
+
+    Args:
+        idocs (pd.DataFrame): Source IDOCS préparée
+        app (pd.DataFrame): Source WELCOME préparée
+        fps (pd.DataFrame): Empreintes actuelles (fingerprints)
+        state (pd.DataFrame): Etat précédent (read_state)
+
+    Returns:
+        tuple: (df_final complet, lignes recalculées, sap_princ supprimés)
+    """
+    previous = state.reindex(fps.index)
+    changed = fps.index[
+        (previous["fp_idocs"] != fps["fp_idocs"]) | (previous["fp_welcome"] != fps["fp_welcome"])
+    ]
+    removed = sorted(state.index.difference(fps.index))
+
+    # Les noms d'une concession ne dépendent que de ses lignes : filtrage exact
+    updated = build_names(
+        idocs[idocs["sap_princ"].isin(changed)],
+        app[app["sap_princ"].isin(changed)]
+    )
+
+    kept = state.loc[fps.index.difference(changed), ["sap_nom"]].rename_axis("sap_princ").reset_index()
+    df_final = pd.concat([kept, updated], ignore_index=True)
+    df_final = df_final.sort_values("sap_princ").reset_index(drop=True)
+    return df_final, updated, removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère DB_concession_names.csv depuis les exports Excel")
+    parser.add_argument("--idocs", default=FILE_IDOCS, help=f"Export IDOCS (défaut: {FILE_IDOCS})")
+    parser.add_argument("--app", default=FILE_APP, help=f"Export WELCOME (défaut: {FILE_APP})")
+    parser.add_argument("--output", default=OUTPUT_CSV, help=f"CSV généré (défaut: {OUTPUT_CSV})")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"Cache Parquet des Excel (défaut: {CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Toujours relire les fichiers Excel")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne recalculer que les concessions dont les lignes ont changé")
+    parser.add_argument("--state", default=STATE_FILE, help=f"Etat de la génération précédente (défaut: {STATE_FILE})")
+    parser.add_argument("--db", action="store_true",
+                        help="Mettre à jour con_nom (concessions recalculées uniquement)")
+    args = parser.parse_args()
+
+    # Vérification de la présence des fichiers
+    for path in (args.idocs, args.app):
+        if not os.path.exists(path):
+            print(f"ERREUR: Le fichier '{path}' est introuvable.")
+            print("Veuillez uploader le fichier Excel.")
+            return
+
+    print("Chargement des fichiers Excel...")
+    cache_dir = None if args.no_cache else args.cache_dir
+    try:
+        df_idocs = read_excel_cached(args.idocs, list(IDOCS_COLUMNS), cache_dir)
+        df_app = read_excel_cached(args.app, list(APP_COLUMNS), cache_dir)
+    except Exception as e:
+        print(f"Erreur lors de la lecture des fichiers Excel: {e}")
+        return
 
     # ============================
-    # LOGIQUE DE RECHERCHE DE NOM (STRICTE)
+    # MAPPING IDOCS / WELCOME (APP)
     # ============================
-    
-    def get_names_list(sap_id, source_df, source_name):
-        # 1. Filtrer pour le SAP Principal donné
-        rows = source_df[source_df["sap_princ"] == sap_id]
-        
-        if rows.empty:
-            return []
-
-        # 2. Essayer la condition STRICTE : SAP Dealer == SAP Principal
-        strict_rows = rows[rows["sap_dealer"] == sap_id]
-
-        if not strict_rows.empty:
-            use_rows = strict_rows
-        else:
-            use_rows = rows
-        
-        # 3. Récupérer les noms uniques et ajouter le préfixe
-        formatted_names = []
-        seen_names = set()
-        
-        for _, r in use_rows.iterrows():
-            nom = r["sap_nom"]
-            if nom and nom.lower() != "nan" and nom not in seen_names:
-                seen_names.add(nom)
-                # Format: "SOURCE: Nom"
-                formatted_names.append(f"{source_name}: {nom}")
-
-        return formatted_names
+    print("Traitement des données IDOCS et WELCOME...")
+    idocs = prepare_source(df_idocs, IDOCS_COLUMNS)
+    app = prepare_source(df_app, APP_COLUMNS)
 
     # ============================
     # CONSTRUCTION DU CSV FINAL
     # ============================
-    print("Génération des noms combinés...")
-    
-    final_rows = []
-    
-    for _, row in df_sap.iterrows():
-        sap_id = row["sap_princ"]
-        
-        # Récupérer les listes de noms
-        names_idocs = get_names_list(sap_id, idocs, "IDOCS")
-        names_welcome = get_names_list(sap_id, app, "WELCOME")
-        
-        # Combiner toutes les chaînes
-        all_names = names_idocs + names_welcome
-        
-        # Joindre par des points-virgules
-        sap_nom_combined = " ; ".join(all_names)
-        
-        final_rows.append({
-            "sap_princ": sap_id,
-            "sap_nom": sap_nom_combined
-        })
-
-    df_final = pd.DataFrame(final_rows)
-    df_final = df_final.sort_values("sap_princ")
+    fps = fingerprints(idocs, app)
+    state = read_state(args.state) if args.incremental else None
+    if state is not None:
+        print("Génération incrémentale des noms combinés...")
+        df_final, updated, removed = build_incremental(idocs, app, fps, state)
+        print(f"  {len(updated)} concessions recalculées, {len(removed)} supprimées, "
+              f"{len(df_final) - len(updated)} inchangées")
+    else:
+        if args.incremental:
+            print(f"Pas d'état précédent ({args.state}) : génération complète")
+        print("Génération des noms combinés...")
+        df_final = build_names(idocs, app)
+        updated, removed = df_final, []
 
     # ============================
     # EXPORT
     # ============================
     # Export avec 2 colonnes : sap_princ, sap_nom
-    df_final.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig", sep=';')
+    df_final.to_csv(args.output, index=False, encoding="utf-8-sig", sep=';')
+
+    if args.db:
+        print("Mise à jour de con_nom...")
+        with get_conn() as conn:
+            # Génération complète : con_nom remplacée (concessions disparues supprimées)
+            counts = write_con_nom(conn, updated, removed, replace=state is None)
+        print(f"  {counts['upserted']} concessions écrites, {counts['deleted']} supprimées")
+        print("  Rafraîchir l'application : POST /cache/invalidate?key=con_nom")
+
+        # L'état décrit le contenu de con_nom : enregistré seulement après l'écriture
+        write_state(args.state, fps, df_final)
 
-    print(f"Succès ! Fichier généré : {OUTPUT_CSV}")
+    print(f"Succès ! Fichier généré : {args.output}")
     print(f"Colonnes : {list(df_final.columns)}")
     print("-" * 30)
     print("Aperçu des 5 premières lignes :")
@@ -0,0 +1,52 @@
+"""
+Charge DB_concession_names.csv (généré par generate_names_final.py) dans con_nom.
+
+Chargement dans con_nom_staging puis échange atomique (RENAME TABLE) :
+la page d'accueil ne voit jamais une table à moitié chargée.
+
+Usage:
+    python scripts/load_concession_names.py
+    python scripts/load_concession_names.py --method infile
+    python scripts/load_concession_names.py --csv autre.csv --batch-size 2000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bulk_load import load_csv, LOAD_BATCH_SIZE, LOAD_METHODS
+from utils.database import get_conn, open_connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chargement en masse de DB_concession_names.csv dans con_nom")
+    parser.add_argument("--csv", default="DB_concession_names.csv", help="Fichier à charger")
+    parser.add_argument("--method", choices=LOAD_METHODS, default="insert",
+                        help="insert : INSERT multi-lignes par lots ; infile : LOAD DATA LOCAL INFILE")
+    parser.add_argument("--batch-size", type=int, default=LOAD_BATCH_SIZE,
+                        help=f"Lignes par INSERT (défaut: {LOAD_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"ERREUR: Le fichier '{args.csv}' est introuvable.")
+        sys.exit(1)
+
+    print(f"Chargement de {args.csv} dans con_nom ({args.method})...")
+    # LOAD DATA LOCAL demande une connexion dédiée (option local_infile)
+    conn = open_connection(local_infile=True) if args.method == "infile" else get_conn()
+    try:
+        result = load_csv(conn, args.csv, method=args.method, batch_size=args.batch_size)
+    except Exception as e:
+        print(f"[ERR] Chargement annulé, con_nom inchangée : {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print(f"[OK] {result['rows']} lignes chargées en {result['load_seconds']}s "
+          f"({result['rows_per_second']} lignes/s), échange compris : {result['total_seconds']}s")
+    print("Rafraîchir l'application : POST /cache/invalidate?key=con_nom")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Ajoute et remplit la colonne id_norm (normalize_id(id_cree)) des tables
+utilisateurs, crée les index, puis vérifie par EXPLAIN que les requêtes des
+routes les utilisent.
+
+Usage:
+    python scripts/migrate_id_norm.py                  # migration + vérification
+    python scripts/migrate_id_norm.py --batch-size 5000
+    python scripts/migrate_id_norm.py --check-only     # EXPLAIN uniquement
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_conn
+from utils.id_norm import migrate_id_norm, explain_check, ID_NORM_BATCH_SIZE
+
+
+def sample_values(conn):
+    # Valeurs réelles pour les plans (un identifiant avec IWU_ID et une concession)
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT id_cree, iwu_id FROM sso_user_detail
+            WHERE iwu_id IS NOT NULL AND iwu_id <> '' AND iwu_id <> 'NONE'
+            LIMIT 1
+        """)
+        id_cree, iwu_id = cursor.fetchone() or ("x", "x")
+        cursor.execute("SELECT sap_princ FROM sso WHERE sap_princ IS NOT NULL LIMIT 1")
+        sap_princ = (cursor.fetchone() or ("x",))[0]
+    return id_cree, sap_princ, iwu_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration id_norm des tables utilisateurs")
+    parser.add_argument("--batch-size", type=int, default=ID_NORM_BATCH_SIZE,
+                        help=f"Identifiants distincts par transaction (défaut: {ID_NORM_BATCH_SIZE})")
+    parser.add_argument("--check-only", action="store_true", help="Vérification EXPLAIN sans migration")
+    args = parser.parse_args()
+
+    with get_conn() as conn:
+        if not args.check_only:
+            print("=== Migration id_norm ===\n")
+            migrate_id_norm(conn, batch_size=args.batch_size)
+
+        print("\n=== Vérification des plans (EXPLAIN) ===\n")
+        report = explain_check(conn, *sample_values(conn))
+
+    for line in report:
+        status = "OK " if line["ok"] else "ERR"
+        print(f"[{status}] {line['query']}: {line['table']} type={line['type']} "
+              f"key={line['key']} rows={line['rows']}")
+
+    if not all(line["ok"] for line in report):
+        print("\nCertaines requêtes n'utilisent pas d'index")
+        sys.exit(1)
+    print("\nSuccès ! Toutes les requêtes utilisent un index")
+
+
+if __name__ == "__main__":
+    main()
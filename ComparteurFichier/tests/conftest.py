@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Modules de l'application (utils, app) importables depuis les tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    # pd.read_sql prévient pour toute connexion DB-API autre que sqlite3 (pymysql compris)
+    config.addinivalue_line("filterwarnings", "ignore:pandas only supports SQLAlchemy:UserWarning")
@@ -0,0 +1,131 @@
+"""
+Tests de utils/backup.py : CSV identique à l'ancien export pandas, manifest SHA-256 et gzip
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils import database
+from utils.backup import backup_table, backup_tables
+from utils.database import ConnectionPool
+from utils.snapshot import OfflineConnection, connect_offline
+from utils.tables import TABLE_COLUMNS
+
+URI = "file:test_backup?mode=memory&cache=shared"
+
+SSO = [
+    ("jean.dupont", "Dupont", "Jean", "10001"),
+    ("rene.leveque", "Lévêque", "René", "10002"),
+    ("virgule", "Nom, avec virgule", 'Dit "Jo"', "10003"),
+    # \r avant nettoyage : écrit sans guillemets, comme to_csv avec des fins de ligne \n
+    ("retour\r", "Ligne\nsuivante", "Pointvirgule;", None),
+    ("vide", "", None, "10004"),
+]
+
+CON_NOM = [
+    ("10001", "IDOCS: GARAGE, NORD ; WELCOME: NORD"),
+    ("10002", 'WELCOME: "Garçon" Auto'),
+    ("10003", "IDOCS: DEUX\nLIGNES"),
+    ("10004", ""),
+    (None, "SANS CODE"),
+]
+
+
+def create_tables(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE sso ({', '.join(TABLE_COLUMNS['sso'])})")
+        cursor.executemany("INSERT INTO sso VALUES (%s, %s, %s, %s)", SSO)
+        cursor.execute(f"CREATE TABLE con_nom ({', '.join(TABLE_COLUMNS['con_nom'])})")
+        cursor.executemany("INSERT INTO con_nom VALUES (%s, %s)", CON_NOM)
+    conn.commit()
+
+
+@pytest.fixture
+def conn():
+    conn = OfflineConnection(sqlite3.connect(":memory:"))
+    create_tables(conn)
+    return conn
+
+
+def legacy_export(conn, path):
+    """Ancien backup_and_clean.py : pd.read_sql puis to_csv."""
+    df = pd.read_sql("SELECT * FROM sso", conn._db)
+    df.to_csv(path, index=False, encoding='utf-8')
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("chunk_rows", [2, 10000])
+def test_csv_identical_to_legacy_export(conn, tmp_path, chunk_rows):
+    entry = backup_table(conn, "sso", str(tmp_path), chunk_rows=chunk_rows)
+    data = (tmp_path / "sso.csv").read_bytes()
+    assert data == legacy_export(conn, str(tmp_path / "legacy.csv"))
+    assert data.count(b"\r\n") == 0
+    assert entry["rows"] == len(SSO)
+
+
+def test_manifest_sha256_and_size(conn, tmp_path):
+    entry = backup_table(conn, "sso", str(tmp_path))
+    data = (tmp_path / entry["file"]).read_bytes()
+    assert entry["file"] == "sso.csv"
+    assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+    assert entry["csv_bytes"] == len(data)
+
+
+def test_gzip_round_trip(conn, tmp_path):
+    os.makedirs(tmp_path / "none")
+    plain = backup_table(conn, "con_nom", str(tmp_path / "none"))
+    entry = backup_table(conn, "con_nom", str(tmp_path), compression="gzip", chunk_rows=2)
+    assert entry["file"] == "con_nom.csv.gz"
+
+    with gzip.open(tmp_path / "con_nom.csv.gz", "rb") as f:
+        data = f.read()
+    # Empreinte et taille du CSV non compressé : identiques au backup sans compression
+    assert (entry["sha256"], entry["csv_bytes"]) == (plain["sha256"], plain["csv_bytes"])
+    assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"), newline="")))
+    assert rows[0] == TABLE_COLUMNS["con_nom"]
+    assert rows[1:] == [["" if value is None else value for value in row] for row in CON_NOM]
+
+
+def test_empty_table(conn, tmp_path):
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM con_nom")
+    entry = backup_table(conn, "con_nom", str(tmp_path))
+    assert entry["rows"] == 0
+    assert (tmp_path / "con_nom.csv").read_bytes() == b"sap_princ,sap_nom\n"
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    keeper = connect_offline(URI)
+    create_tables(keeper)
+    monkeypatch.setattr(database, "pool", ConnectionPool(lambda: connect_offline(URI)))
+    yield keeper
+    database.pool.clear()
+    keeper.close()
+
+
+def test_backup_tables_writes_manifest(pooled, tmp_path):
+    backup_dir = tmp_path / "backup"
+    manifest = backup_tables(str(backup_dir), tables=["sso", "absente", "con_nom"],
+                             compression="gzip", workers=2, log=lambda line: None)
+
+    with open(backup_dir / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f) == manifest
+    assert manifest["compression"] == "gzip"
+    sso, missing, con_nom = manifest["tables"]
+    assert (sso["table"], sso["rows"], con_nom["rows"]) == ("sso", len(SSO), len(CON_NOM))
+    assert missing["table"] == "absente" and "error" in missing
+    for entry in (sso, con_nom):
+        with gzip.open(backup_dir / entry["file"], "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == entry["sha256"]
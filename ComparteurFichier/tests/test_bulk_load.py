@@ -0,0 +1,141 @@
+"""
+Tests de utils/bulk_load.py : lecture du CSV et chargement staging + échange (connexion factice)
+"""
+
+import pytest
+
+from utils.bulk_load import load_csv, read_csv_rows
+
+COLUMNS = ["sap_princ", "sap_nom"]
+
+CSV = (
+    "\ufeffsap_princ;sap_nom;autre\n"
+    "00123;IDOCS: GARAGE A;x\n"
+    "10002;;y\n"
+    "10003;WELCOME: GARAGE C | IDOCS: GARAGE C2;\n"
+    "10004;NA;z\n"
+    "10005;IDOCS: GARAGE E;\n"
+)
+ROWS = [
+    ("00123", "IDOCS: GARAGE A"),
+    ("10002", ""),
+    ("10003", "WELCOME: GARAGE C | IDOCS: GARAGE C2"),
+    ("10004", "NA"),
+    ("10005", "IDOCS: GARAGE E"),
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "DB_concession_names.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+def test_read_csv_rows(csv_path):
+    # BOM retiré, codes en texte (zéros conservés), chaînes vides et "NA" gardées telles quelles
+    assert read_csv_rows(csv_path, COLUMNS) == ROWS
+
+
+def test_read_csv_rows_column_order(csv_path):
+    assert read_csv_rows(csv_path, ["sap_nom", "sap_princ"])[0] == ("IDOCS: GARAGE A", "00123")
+
+
+class FakeConnection:
+    """
+    Connexion MySQL factice : enregistre les requêtes et garde les lignes insérées en staging.
+
+    Args:
+        lost_rows (int): Lignes ignorées par le serveur (chargement incomplet)
+    """
+
+    def __init__(self, lost_rows=0):
+        self.statements = []
+        self.staging = []
+        self.lost_rows = lost_rows
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def sql(self, prefix):
+        return [sql for sql, _ in self.statements if sql.startswith(prefix)]
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        if sql.startswith("INSERT INTO con_nom_staging"):
+            self.conn.staging += [tuple(params[i:i + len(COLUMNS)]) for i in range(0, len(params), len(COLUMNS))]
+
+    def fetchone(self):
+        keys = {row[0] for row in self.conn.staging[self.conn.lost_rows:]}
+        return (len(keys),)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+def test_insert_batches_then_swap(csv_path):
+    conn = FakeConnection()
+    logs = []
+    result = load_csv(conn, csv_path, batch_size=2, log=logs.append)
+
+    assert result["rows"] == len(ROWS)
+    assert conn.staging == ROWS
+    inserts = conn.statements[2:5]
+    assert [len(params) for _, params in inserts] == [4, 4, 2]
+    assert inserts[0][0] == (
+        "INSERT INTO con_nom_staging (sap_princ, sap_nom) VALUES (%s, %s), (%s, %s) "
+        "ON DUPLICATE KEY UPDATE sap_nom = VALUES(sap_nom)"
+    )
+    assert logs == ["  lot 1: 2/5 lignes", "  lot 2: 4/5 lignes", "  lot 3: 5/5 lignes"]
+    assert [sql for sql, _ in conn.statements[:2]] == [
+        "DROP TABLE IF EXISTS con_nom_staging", "CREATE TABLE con_nom_staging LIKE con_nom",
+    ]
+    assert [sql for sql, _ in conn.statements[-3:]] == [
+        "DROP TABLE IF EXISTS con_nom_old",
+        "RENAME TABLE con_nom TO con_nom_old, con_nom_staging TO con_nom",
+        "DROP TABLE con_nom_old",
+    ]
+    assert conn.commits == 1 and conn.rollbacks == 0
+
+
+def test_count_mismatch_aborts_before_swap(csv_path):
+    conn = FakeConnection(lost_rows=1)
+    with pytest.raises(RuntimeError, match="4 sap_princ chargés pour 5"):
+        load_csv(conn, csv_path, log=lambda line: None)
+
+    # con_nom n'est jamais renommée ni supprimée : seule la staging est nettoyée
+    assert not conn.sql("RENAME") and not conn.sql("DROP TABLE con_nom_old")
+    assert conn.statements[-1][0] == "DROP TABLE IF EXISTS con_nom_staging"
+    assert conn.rollbacks == 1
+
+
+def test_infile_detects_line_terminator(tmp_path):
+    path = tmp_path / "crlf.csv"
+    path.write_bytes(CSV.replace("\n", "\r\n").encode("utf-8"))
+    conn = FakeConnection()
+    conn.staging = list(ROWS)  # lignes chargées par le serveur
+    load_csv(conn, str(path), method="infile")
+    sql, params = conn.sql("LOAD DATA")[0], conn.statements[2][1]
+    assert "LINES TERMINATED BY '\\r\\n' IGNORE 1 LINES (sap_princ, sap_nom)" in sql
+    assert params == [str(path)]
+
+
+def test_unknown_method(csv_path):
+    with pytest.raises(ValueError):
+        load_csv(FakeConnection(), csv_path, method="copy")
@@ -0,0 +1,165 @@
+"""
+Tests de utils/cache.SnapshotCache : TTL, dépendances et invalidation pendant un chargement
+"""
+
+import threading
+import types
+
+import pytest
+
+from utils import cache
+from utils.cache import SnapshotCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class Loader:
+    """Loader qui retourne (nom, numéro de chargement)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.name, self.calls
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_value_cached_until_ttl_expires(clock):
+    snapshot = SnapshotCache(ttl=300)
+    loader = Loader("con_nom")
+    snapshot.register("con_nom", loader)
+
+    assert snapshot.get("con_nom") == ("con_nom", 1)
+    clock.now += 299
+    assert snapshot.get("con_nom") == ("con_nom", 1)
+    clock.now += 1
+    assert snapshot.get("con_nom") == ("con_nom", 2)
+
+    stats = snapshot.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"], stats["keys"]) == (1, 2, 0.3333, ["con_nom"])
+
+
+def test_invalidate_cascades_to_dependents(clock):
+    snapshot = SnapshotCache()
+    parent, other = Loader("con_nom"), Loader("dealer_counts")
+    snapshot.register("con_nom", parent)
+    snapshot.register("dealer_counts", other)
+    snapshot.register("concession_names", lambda: ("names", snapshot.get("con_nom")), depends_on=("con_nom",))
+
+    assert snapshot.get("concession_names") == ("names", ("con_nom", 1))
+    snapshot.get("dealer_counts")
+
+    assert snapshot.invalidate("con_nom") == 2
+    assert snapshot.stats()["keys"] == ["dealer_counts"]
+    assert snapshot.get("concession_names") == ("names", ("con_nom", 2))
+
+    # Invalider une clé dérivée ne touche pas sa source
+    assert snapshot.invalidate("concession_names") == 1
+    assert snapshot.invalidate("concession_names") == 0
+    assert snapshot.stats()["keys"] == ["con_nom", "dealer_counts"]
+
+    assert snapshot.invalidate() == 2
+    assert snapshot.stats()["keys"] == []
+    assert other.calls == 1
+
+
+def blocking_loader(name):
+    """Loader dont le premier chargement attend release (chargement en cours)."""
+    started, release = threading.Event(), threading.Event()
+    loader = Loader(name)
+
+    def load():
+        value = loader()
+        if loader.calls == 1:
+            started.set()
+            release.wait(5)
+        return value
+
+    return load, loader, started, release
+
+
+def load_in_thread(snapshot, key):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(snapshot.get(key)))
+    thread.start()
+    return thread, results
+
+
+@pytest.mark.parametrize("invalidated", ["con_nom", None])
+def test_invalidate_during_load_does_not_store_stale_value(invalidated):
+    snapshot = SnapshotCache()
+    load, loader, started, release = blocking_loader("con_nom")
+    snapshot.register("con_nom", load)
+
+    thread, results = load_in_thread(snapshot, "con_nom")
+    assert started.wait(5)
+    snapshot.invalidate(invalidated)
+    release.set()
+    thread.join(5)
+
+    # L'appelant en cours reçoit sa valeur, qui n'est pas gardée en cache
+    assert results == [("con_nom", 1)]
+    assert snapshot.stats()["keys"] == []
+    assert snapshot.get("con_nom") == ("con_nom", 2)
+    assert snapshot.get("con_nom") == ("con_nom", 2)
+
+
+def test_parent_invalidation_during_dependent_load():
+    snapshot = SnapshotCache()
+    snapshot.register("con_nom", Loader("con_nom"))
+    load, loader, started, release = blocking_loader("concession_names")
+    snapshot.register("concession_names", load, depends_on=("con_nom",))
+
+    thread, results = load_in_thread(snapshot, "concession_names")
+    assert started.wait(5)
+    snapshot.invalidate("con_nom")
+    release.set()
+    thread.join(5)
+
+    assert results == [("concession_names", 1)]
+    assert snapshot.get("concession_names") == ("concession_names", 2)
+
+
+def test_invalidating_other_key_keeps_loaded_value():
+    snapshot = SnapshotCache()
+    snapshot.register("dealer_counts", Loader("dealer_counts"))
+    load, loader, started, release = blocking_loader("con_nom")
+    snapshot.register("con_nom", load)
+
+    thread, _ = load_in_thread(snapshot, "con_nom")
+    assert started.wait(5)
+    snapshot.invalidate("dealer_counts")
+    release.set()
+    thread.join(5)
+
+    assert snapshot.get("con_nom") == ("con_nom", 1)
+    assert loader.calls == 1
+
+
+def test_concurrent_misses_load_once():
+    snapshot = SnapshotCache()
+    load, loader, started, release = blocking_loader("con_nom")
+    snapshot.register("con_nom", load)
+
+    first, results = load_in_thread(snapshot, "con_nom")
+    assert started.wait(5)
+    others = [load_in_thread(snapshot, "con_nom") for _ in range(3)]
+    release.set()
+    for thread, other_results in [(first, results)] + others:
+        thread.join(5)
+        assert other_results == [("con_nom", 1)]
+    assert loader.calls == 1
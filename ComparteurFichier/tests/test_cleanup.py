@@ -0,0 +1,196 @@
+"""
+Tests de utils/cleanup.py (SQLite) et du contrôle backup avant nettoyage de backup_and_clean.py
+"""
+
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+import backup_and_clean
+from utils import cleanup
+from utils.cleanup import clean_table, clean_tables, count_dirty, primary_key
+from utils.snapshot import OfflineConnection
+
+COLUMNS = ["id_cree", "nom"]
+
+# (id, id_cree, nom) : trous dans les id, \r dans une colonne, les deux ou aucune
+ROWS = [
+    (1, "jean.dupont\r", "Dupont"),
+    (2, "paul.martin", "Martin\r"),
+    (3, "luc.petit", "Petit"),
+    (7, "anne.roux\r", "Roux\r\r"),
+    (8, "marc.blanc", None),
+    (12, "\r", "Vide"),
+    (13, "eve.noir", "Noir"),
+    (21, "leo.gris\r", "Gris"),
+]
+DIRTY = {1, 2, 7, 12, 21}
+
+
+def make_conn(with_pk):
+    db = sqlite3.connect(":memory:")
+    key = "id INTEGER PRIMARY KEY" if with_pk else "id INTEGER"
+    db.execute(f"CREATE TABLE sso ({key}, id_cree TEXT, nom TEXT)")
+    db.executemany("INSERT INTO sso VALUES (?, ?, ?)", ROWS)
+    db.commit()
+    return OfflineConnection(db)
+
+
+@pytest.fixture
+def pk_conn(monkeypatch):
+    # primary_key lit information_schema (MySQL) : clé entière déclarée directement
+    monkeypatch.setattr(cleanup, "primary_key", lambda conn, table: "id")
+    return make_conn(with_pk=True)
+
+
+@pytest.fixture
+def no_pk_conn(monkeypatch):
+    monkeypatch.setattr(cleanup, "primary_key", lambda conn, table: None)
+    return make_conn(with_pk=False)
+
+
+def table_rows(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT id, id_cree, nom FROM sso ORDER BY id")
+        return cursor.fetchall()
+
+
+def expected_rows():
+    return [
+        (id_, *(value.replace("\r", "") if value is not None else None for value in values))
+        for id_, *values in ROWS
+    ]
+
+
+def test_pk_range_batches(pk_conn):
+    logs = []
+    assert clean_table(pk_conn, "sso", COLUMNS, batch_size=5, log=logs.append) == len(DIRTY)
+    assert table_rows(pk_conn) == expected_rows()
+    # Plages [1-5], [6-10], [11-15], [16-20], [21-25] de MIN(id) à MAX(id), une transaction chacune
+    assert [line.split(":")[0] for line in logs] == [
+        f"  sso lot {batch} (id {start}-{start + 4})" for batch, start in enumerate(range(1, 22, 5), 1)
+    ]
+
+
+def test_pk_range_empty_table(pk_conn):
+    with pk_conn.cursor() as cursor:
+        cursor.execute("DELETE FROM sso")
+    assert clean_table(pk_conn, "sso", COLUMNS, log=lambda line: None) == 0
+
+
+def test_limit_batches_until_short_batch(no_pk_conn):
+    logs = []
+    assert clean_table(no_pk_conn, "sso", COLUMNS, batch_size=2, log=logs.append) == len(DIRTY)
+    assert table_rows(no_pk_conn) == expected_rows()
+    # Chaque lot relit la table (WHERE ... LIKE) : 2 + 2 + 1 lignes, arrêt au lot incomplet
+    assert [int(line.split(": ")[1].split()[0]) for line in logs] == [2, 2, 1]
+
+
+def test_limit_exact_multiple_ends_with_empty_batch(no_pk_conn):
+    logs = []
+    assert clean_table(no_pk_conn, "sso", COLUMNS, batch_size=len(DIRTY), log=logs.append) == len(DIRTY)
+    assert len(logs) == 2
+
+
+@pytest.mark.parametrize("fixture", ["pk_conn", "no_pk_conn"])
+def test_dry_run_counts_match_updated_rows(request, fixture):
+    conn = request.getfixturevalue(fixture)
+    counts = count_dirty(conn, "sso", COLUMNS)
+    assert counts == {"rows": 5, "id_cree": 4, "nom": 2}
+
+    dry_run = clean_tables(conn, {"sso": COLUMNS}, batch_size=3, dry_run=True, log=lambda line: None)
+    assert table_rows(conn) == [tuple(row) for row in ROWS]
+    assert dry_run == clean_tables(conn, {"sso": COLUMNS}, batch_size=3, log=lambda line: None) == {"sso": 5}
+    assert count_dirty(conn, "sso", COLUMNS)["rows"] == 0
+
+
+def test_failing_table_is_rolled_back_and_others_cleaned(pk_conn):
+    logs = []
+    results = clean_tables(pk_conn, {"absente": COLUMNS, "sso": COLUMNS}, log=logs.append)
+    assert results == {"sso": len(DIRTY)}
+    assert logs[0].startswith("[ERR] absente")
+
+
+# ============================
+# primary_key (information_schema) sur une connexion factice
+# ============================
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, params=None):
+        self.params = params
+
+    def fetchall(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+@pytest.mark.parametrize("rows, expected", [
+    ([("id", "BIGINT")], "id"),
+    ([("id", "int")], "id"),
+    ([("code", "varchar")], None),
+    ([("a", "int"), ("b", "int")], None),
+    ([], None),
+])
+def test_primary_key_integer_single_column(rows, expected):
+    assert primary_key(FakeConnection(rows), "sso") == expected
+
+
+# ============================
+# backup_and_clean.py : pas de nettoyage sans backup complet
+# ============================
+@pytest.fixture
+def script(monkeypatch):
+    calls = []
+
+    @contextmanager
+    def get_conn():
+        yield None
+
+    monkeypatch.setattr(backup_and_clean, "get_conn", get_conn)
+    monkeypatch.setattr(backup_and_clean, "invalidate_user_index", lambda conn: calls.append("invalidate"))
+    monkeypatch.setattr(backup_and_clean, "run_cleanup", lambda conn, args: calls.append("clean"))
+    monkeypatch.setattr(backup_and_clean, "run_refresh", lambda conn: calls.append("refresh"))
+
+    def run(manifest, *argv):
+        monkeypatch.setattr(backup_and_clean, "backup_tables", lambda directory, **kwargs: manifest)
+        monkeypatch.setattr("sys.argv", ["backup_and_clean.py", "--output-dir", "backup_test", *argv])
+        backup_and_clean.main()
+        return calls
+
+    return run
+
+
+COMPLETE = {"tables": [{"table": "sso", "rows": 8}, {"table": "con_nom", "rows": 2}]}
+INCOMPLETE = {"tables": [{"table": "sso", "rows": 8}, {"table": "con_nom", "error": "timeout"}]}
+
+
+def test_backup_failure_aborts_cleanup(script):
+    assert script(INCOMPLETE) == ["invalidate"]
+
+
+def test_complete_backup_runs_cleanup(script):
+    assert script(COMPLETE) == ["invalidate", "clean", "refresh"]
+
+
+def test_skip_clean_refreshes_after_failed_backup(script):
+    assert script(INCOMPLETE, "--skip-clean") == ["invalidate", "refresh"]
+
+
+def test_dry_run_skips_backup(script):
+    assert script(INCOMPLETE, "--dry-run") == ["clean"]
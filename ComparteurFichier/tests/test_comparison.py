@@ -0,0 +1,187 @@
+"""
+Tests de utils/comparison.py : table matérialisée, rafraîchissement et comparaison batch
+"""
+
+import pandas as pd
+import pytest
+
+import app
+from utils import database
+from utils.comparison import (
+    BATCH_STATS_COLUMNS, compare_dealers, compute_comparison, compute_dealer_stats, get_comparison,
+    parse_sap_list, refresh_store,
+)
+from utils.database import ConnectionPool
+from utils.snapshot import connect_offline
+from utils.tables import TABLE_COLUMNS
+
+URI = "file:test_comparison?mode=memory&cache=shared"
+
+ROWS = {
+    "sso": [("jean.dupont", "Dupont", "Jean", "10001"), ("paul.martin", "Martin", "Paul", "10001")],
+    "sso_user_detail": [("jean.dupont", "Dupont", "Jean", "IWU1"), ("paul.martin", "Martin", "Paul", None)],
+    "idocs_user": [("JEAN.DUPONT", "Dupont", "Jean", "10001")],
+    "idocs_user_detail": [("JEAN.DUPONT", "Dupont", "Jean", "IWU1", "IVECO", "ADMIN")],
+}
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    keeper = connect_offline(URI)
+    with keeper.cursor() as cursor:
+        for table, columns in TABLE_COLUMNS.items():
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        for table, rows in ROWS.items():
+            marks = ", ".join(["%s"] * len(TABLE_COLUMNS[table]))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", rows)
+    keeper.commit()
+    # Connexions supplémentaires de fetch_parallel sur la même base
+    monkeypatch.setattr(database, "pool", ConnectionPool(lambda: connect_offline(URI)))
+    yield keeper
+    database.pool.clear()
+    keeper.close()
+
+
+def names(df):
+    return sorted(df["nom"])
+
+
+def test_stored_comparison_matches_live(conn):
+    live = get_comparison(conn, "10001")
+    refresh_store(conn, log=lambda *args: None)
+    stored = get_comparison(conn, "10001")
+    for before, after in zip(live, stored):
+        assert before[["id_cree", "nom", "iwu_id", "status"]].values.tolist() == \
+            after[["id_cree", "nom", "iwu_id", "status"]].values.tolist()
+
+
+def test_store_is_served_until_refreshed(conn):
+    refresh_store(conn, log=lambda *args: None)
+    with conn.cursor() as cursor:
+        cursor.execute("UPDATE sso SET nom = 'Durand' WHERE id_cree = 'paul.martin'")
+        cursor.execute("INSERT INTO sso VALUES ('luc.petit', 'Petit', 'Luc', '10001')")
+    conn.commit()
+
+    # Pas d'empreinte recalculée à la lecture : lignes du dernier rafraîchissement
+    df_sso, _ = get_comparison(conn, "10001")
+    assert names(df_sso) == ["Dupont", "Martin"]
+
+    refresh_store(conn, log=lambda *args: None)
+    df_sso, _ = get_comparison(conn, "10001")
+    assert names(df_sso) == ["Dupont", "Durand", "Petit"]
+
+
+def test_unmaterialized_dealer_is_computed_live(conn):
+    refresh_store(conn, log=lambda *args: None)
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO sso VALUES ('luc.petit', 'Petit', 'Luc', '10009')")
+    conn.commit()
+    df_sso, df_idocs = get_comparison(conn, "10009")
+    assert names(df_sso) == ["Petit"] and len(df_idocs) == 0
+
+
+# ============================
+# Comparaison batch (compare_dealers) et liste de codes
+# ============================
+BATCH_ROWS = {
+    "sso": [
+        ("jean.dupont", "Dupont", "Jean", "10001"),
+        ("paul.martin", "Martin", "Paul", "10001"),
+        ("Luc Petit", "Petit", "Luc", "10001"),
+        ("paul.martin", "Martin", "Paul", "10002"),
+        ("anne.roux", "Roux", "Anne", "10002"),
+        ("zoe.leroy", "Leroy", "Zoé", "10004"),
+    ],
+    "sso_user_detail": [
+        ("jean.dupont", "Dupont", "Jean", "IWU1"),
+        ("jean.dupont", "Dupont", "Jean", "IWU2"),
+        ("paul.martin", "Martin", "Paul", None),
+        ("Luc Petit", "Petit", "Luc", "IWU3"),
+        ("anne.roux", "Roux", "Anne", "NONE"),
+    ],
+    "idocs_user": [
+        ("JEAN.DUPONT", "Dupont", "Jean", "10001"),
+        ("lucpetit", "Petit", "Luc", "10001"),
+        ("marc.blanc", "Blanc", "Marc", "10001"),
+        ("Paul.Martin", "Martin", "Paul", "10002"),
+        ("marc.blanc", "Blanc", "Marc", "10003"),
+    ],
+    "idocs_user_detail": [
+        ("JEAN.DUPONT", "Dupont", "Jean", "IWU1", "IVECO", "ADMIN"),
+        ("lucpetit", "Petit", "Luc", None, "IVECO", "USER"),
+        ("marc.blanc", "Blanc", "Marc", "IWU9", "IVECO", "USER"),
+    ],
+}
+
+# 10005 : aucune ligne dans les deux sources
+SAPS = ["10001", "10002", "10003", "10004", "10005"]
+
+
+@pytest.fixture
+def batch_conn(monkeypatch):
+    keeper = connect_offline("file:test_comparison_batch?mode=memory&cache=shared")
+    with keeper.cursor() as cursor:
+        for table, columns in TABLE_COLUMNS.items():
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        for table, rows in BATCH_ROWS.items():
+            marks = ", ".join(["%s"] * len(TABLE_COLUMNS[table]))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", rows)
+    keeper.commit()
+    monkeypatch.setattr(database, "pool", ConnectionPool(
+        lambda: connect_offline("file:test_comparison_batch?mode=memory&cache=shared")
+    ))
+    yield keeper
+    database.pool.clear()
+    keeper.close()
+
+
+def test_batch_stats_equal_single_dealer_stats(batch_conn):
+    stats, _, _ = compare_dealers(batch_conn, SAPS)
+    assert stats["sap_princ"].tolist() == SAPS
+    for sap, row in zip(SAPS, stats[BATCH_STATS_COLUMNS].to_dict(orient="records")):
+        single = compute_dealer_stats(*compute_comparison(batch_conn, [sap]))
+        assert row == {key: int(value) for key, value in single.items()}, sap
+    assert stats.set_index("sap_princ").loc["10001", ["total_sso", "in_both", "sso_no_iwu"]].tolist() == [3, 2, 1]
+
+
+def test_batch_rows_equal_single_dealer_rows(batch_conn):
+    _, df_sso, df_idocs = compare_dealers(batch_conn, SAPS)
+    columns = ["sap_princ", "id_cree", "iwu_id", "id_norm", "status"]
+    for batch, single_source in ((df_sso, 0), (df_idocs, 1)):
+        singles = pd.concat([compute_comparison(batch_conn, [sap])[single_source] for sap in SAPS])
+        assert sorted(batch[columns].values.tolist()) == sorted(singles[columns].values.tolist())
+
+
+def test_batch_ignores_duplicate_codes(batch_conn):
+    stats, df_sso, _ = compare_dealers(batch_conn, ["10002", "10001", "10002"])
+    assert stats["sap_princ"].tolist() == ["10002", "10001"]
+    assert len(df_sso) == 5
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["10001"], ["10001"]),
+    (["10001,10002", "10003"], ["10001", "10002", "10003"]),
+    (["  10001 , 10002,,", "\t10003\n10001\r\n"], ["10001", "10002", "10003"]),
+    (["10002 10001", "10002"], ["10002", "10001"]),
+    ([10001, "010001"], ["10001", "010001"]),
+    (["", " , ", "\n"], []),
+    ([], []),
+])
+def test_parse_sap_list(values, expected):
+    assert parse_sap_list(values) == expected
+
+
+def test_api_compare_limit(batch_conn, monkeypatch):
+    monkeypatch.setattr(app, "BATCH_MAX_SAPS", 3)
+    client = app.app.test_client()
+
+    response = client.get("/api/compare?sap_princ=10001,10002,10003,10004")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "3 concessions maximum par appel"}
+
+    # Limite appliquée après dédoublonnage
+    response = client.get("/api/compare?sap_princ=10001,10002&sap_princ=10002 10001&sap_princ=10003")
+    assert response.status_code == 200
+    assert [d["sap_princ"] for d in response.get_json()["dealers"]] == ["10001", "10002", "10003"]
+
+    assert client.post("/api/compare", json={"sap_princ": [" ", ","]}).status_code == 400
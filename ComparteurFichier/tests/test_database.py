@@ -0,0 +1,194 @@
+"""
+Tests de utils/database.ConnectionPool avec un faux driver
+"""
+
+import threading
+import types
+
+import pymysql
+import pytest
+
+from utils import database
+from utils.database import ConnectionPool, PoolExhaustedError
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+        self.fail_rollback = False
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise pymysql.err.OperationalError(2013, "Lost connection")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnector:
+    def __init__(self):
+        self.opened = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise pymysql.err.OperationalError(2003, "Can't connect")
+        self.opened.append(FakeConnection(len(self.opened) + 1))
+        return self.opened[-1]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def connector():
+    return FakeConnector()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(database, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def metrics(pool, *keys):
+    stats = pool.stats()
+    return {key: stats[key] for key in keys}
+
+
+def test_connection_reused_after_close(connector):
+    pool = ConnectionPool(connector, max_size=2)
+    with pool.acquire() as conn:
+        assert conn.number == 1
+    with pool.acquire() as conn:
+        assert conn.number == 1
+    assert connector.opened[0].rollbacks == 2
+    assert metrics(pool, "borrowed", "created", "reused", "size", "idle", "in_use") == {
+        "borrowed": 2, "created": 1, "reused": 1, "size": 1, "idle": 1, "in_use": 0,
+    }
+
+
+def test_closed_handle_cannot_be_used(connector):
+    pool = ConnectionPool(connector)
+    conn = pool.acquire()
+    conn.close()
+    conn.close()
+    with pytest.raises(pymysql.err.InterfaceError):
+        conn.ping()
+    assert pool.stats()["idle"] == 1
+
+
+def test_ping_on_borrow_replaces_dead_connection(connector):
+    pool = ConnectionPool(connector)
+    pool.acquire().close()
+    dead = connector.opened[0]
+    dead.alive = False
+
+    with pool.acquire() as conn:
+        assert conn.number == 2
+    assert dead.closed
+    assert metrics(pool, "broken", "created", "reused", "size") == {
+        "broken": 1, "created": 2, "reused": 0, "size": 1,
+    }
+
+
+def test_failed_rollback_discards_connection(connector):
+    pool = ConnectionPool(connector)
+    conn = pool.acquire()
+    connector.opened[0].fail_rollback = True
+    conn.close()
+    assert connector.opened[0].closed
+    assert metrics(pool, "broken", "size", "idle") == {"broken": 1, "size": 0, "idle": 0}
+
+
+def test_idle_connections_evicted(connector, clock):
+    pool = ConnectionPool(connector, max_idle=300)
+    first, second = pool.acquire(), pool.acquire()
+    first.close()
+    clock.now += 200
+    second.close()
+
+    # first inactive depuis 301 s, second depuis 101 s : seule first est fermée
+    clock.now += 101
+    with pool.acquire() as conn:
+        assert conn.number == 2
+    assert connector.opened[0].closed and not connector.opened[1].closed
+    assert metrics(pool, "evicted", "size", "created") == {"evicted": 1, "size": 1, "created": 2}
+
+
+def test_most_recent_idle_connection_reused_first(connector):
+    pool = ConnectionPool(connector)
+    first, second = pool.acquire(), pool.acquire()
+    first.close()
+    second.close()
+    with pool.acquire() as conn:
+        assert conn.number == 2
+
+
+def test_timeout_raises_pool_exhausted(connector):
+    pool = ConnectionPool(connector, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
+    assert metrics(pool, "exhausted", "timeouts", "size", "in_use") == {
+        "exhausted": 1, "timeouts": 1, "size": 1, "in_use": 1,
+    }
+    held.close()
+    assert pool.acquire().number == 1
+
+
+def test_waiting_borrower_gets_released_connection(connector):
+    pool = ConnectionPool(connector, max_size=1, timeout=5)
+    held = pool.acquire()
+    borrowed = []
+    waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+    waiter.start()
+    while pool.stats()["exhausted"] == 0 and waiter.is_alive():
+        waiter.join(0.01)
+    held.close()
+    waiter.join(5)
+    assert borrowed[0].number == 1
+    assert metrics(pool, "exhausted", "timeouts", "reused") == {"exhausted": 1, "timeouts": 0, "reused": 1}
+
+
+def test_acquire_without_wait(connector):
+    pool = ConnectionPool(connector, max_size=1, timeout=5)
+    held = pool.acquire()
+    assert pool.acquire(wait=False) is None
+    assert metrics(pool, "busy", "exhausted", "timeouts") == {"busy": 1, "exhausted": 0, "timeouts": 0}
+    held.close()
+    assert pool.acquire(wait=False).number == 1
+
+
+def test_connect_failure_frees_slot(connector):
+    pool = ConnectionPool(connector, max_size=1, timeout=0.05)
+    connector.fail = True
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.acquire()
+    assert pool.stats()["size"] == 0
+    connector.fail = False
+    assert pool.acquire().number == 1
+
+
+def test_clear_closes_idle_connections(connector):
+    pool = ConnectionPool(connector)
+    held = pool.acquire()
+    pool.acquire().close()
+    pool.clear()
+    assert connector.opened[1].closed and not connector.opened[0].closed
+    assert metrics(pool, "size", "idle", "in_use") == {"size": 1, "idle": 0, "in_use": 1}
+    held.close()
@@ -0,0 +1,87 @@
+"""
+Tests de utils/duplicates.py : détection par groupes triés et rapport matérialisé
+"""
+
+import pytest
+
+from utils import database
+from utils.database import ConnectionPool
+from utils.duplicates import (
+    build_duplicate_report, duplicate_report_state, iter_duplicate_iwu, iter_stored_groups, read_duplicate_page
+)
+from utils.snapshot import connect_offline
+from utils.tables import TABLE_COLUMNS
+
+URI = "file:test_duplicates?mode=memory&cache=shared"
+
+ROWS = {
+    "sso_user_detail": [
+        ("jean.dupont", "Dupont", "Jean", "IWU1"),
+        ("paul.martin", "Martin", "Paul", "IWU2"),
+        ("luc.petit", "Petit", "Luc", "IWU2"),
+        ("zoe.leroy", "Leroy", "Zoé", "NONE"),
+        ("anais.roux", "Roux", "Anaïs", "IWU3"),
+    ],
+    "idocs_user_detail": [
+        # Même identité normalisée que jean.dupont : pas un doublon
+        ("JEAN.DUPONT", "Dupont", "Jean", "IWU1", "IVECO", "ADMIN"),
+        ("PAUL.MARTIN", "Martin", "Paul", "IWU2", "IVECO", "ADMIN"),
+        ("rene.morel", "Morel", "René", "NONE", "IVECO", "ADMIN"),
+        ("marc.blanc", "Blanc", "Marc", "IWU3", "IVECO", "ADMIN"),
+    ],
+}
+
+EXPECTED = [
+    ("IWU2", [("LUCPETIT", "SSO"), ("PAULMARTIN", "SSO + IDOCS")]),
+    ("IWU3", [("ANAISROUX", "SSO"), ("MARCBLANC", "IDOCS")]),
+]
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    keeper = connect_offline(URI)
+    with keeper.cursor() as cursor:
+        for table, columns in TABLE_COLUMNS.items():
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        for table, rows in ROWS.items():
+            marks = ", ".join(["%s"] * len(TABLE_COLUMNS[table]))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", rows)
+    keeper.commit()
+    # Lecture des tables sources sur une seconde connexion pendant la construction
+    monkeypatch.setattr(database, "pool", ConnectionPool(lambda: connect_offline(URI)))
+    yield keeper
+    database.pool.clear()
+    keeper.close()
+
+
+def summary(groups):
+    return [
+        (group["iwu_id"], [(identity["id_norm"], identity["source"]) for identity in group["identites"]])
+        for group in groups
+    ]
+
+
+def test_groups_span_chunks(conn):
+    # Un bloc par ligne : chaque groupe est réparti sur plusieurs blocs
+    assert summary(iter_duplicate_iwu(conn, chunk_rows=1)) == EXPECTED
+    assert summary(iter_duplicate_iwu(conn, chunk_rows=1000)) == EXPECTED
+
+
+def test_report_is_materialized(conn):
+    assert duplicate_report_state(conn) is None
+
+    assert build_duplicate_report(conn, chunk_rows=2, batch_size=1, log=lambda *args: None) == 2
+    assert duplicate_report_state(conn).nb_groups == 2
+    assert summary(read_duplicate_page(conn, 1, page_size=1)) == EXPECTED[:1]
+    assert summary(read_duplicate_page(conn, 2, page_size=1)) == EXPECTED[1:]
+    assert summary(iter_stored_groups(conn, batch_groups=1)) == EXPECTED
+
+
+def test_rebuild_replaces_report(conn):
+    build_duplicate_report(conn, log=lambda *args: None)
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM idocs_user_detail WHERE id_cree = 'marc.blanc'")
+    conn.commit()
+
+    assert build_duplicate_report(conn, log=lambda *args: None) == 1
+    assert summary(iter_stored_groups(conn)) == EXPECTED[:1]
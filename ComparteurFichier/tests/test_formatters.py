@@ -0,0 +1,62 @@
+"""
+Tests de utils/formatters.py : rendu par colonnes identique à l'ancien df_to_html (iterrows)
+"""
+
+import pandas as pd
+import pytest
+
+from utils.formatters import df_to_html, format_iwu_column, iter_table_html
+
+ROWS = [
+    ("jean.dupont", "Dupont", "Jean", "IWU1", "both"),
+    ("o.neil", "O'Neil", "Zoé", "IWU1;IWU2;NONE", "only"),
+    ("paul.martin", "Martin", "Paul", "NONE", "only"),
+    ("rene.morel", "Morel", "René", "IWU1", "both"),
+    ("luc.petit", "Petit", "Luc", "IWU3;IWU4", "both"),
+]
+
+
+def legacy_df_to_html(df, sap=None, return_url=None):
+    rows = ["<tr><th>Nom Prénom</th><th>iwu_id</th></tr>"]
+    for _, row in df.iterrows():
+        dealer_match = row.get("dealer_match", True)
+        if return_url:
+            dealer_code = row.get("sap_dealer", sap)
+            onclick = f"openUser('{row['id_cree']}', '{dealer_code}', '{return_url}')"
+            data_attr = (f' data-dealer="{dealer_code}" data-dealer-match="{str(dealer_match).lower()}"'
+                         f' data-nom="{str(row["nom"]).replace(chr(39), "")}"'
+                         f' data-prenom="{str(row["prenom"]).replace(chr(39), "")}"'
+                         f' data-iwu="{str(row["iwu_id"]).replace(chr(39), "")}"')
+        else:
+            onclick = f"openUser('{row['id_cree']}', '{sap}')"
+            data_attr = ""
+        rows.append(f'<tr class="{row["status"]}"{data_attr}>'
+                    f'<td onclick="{onclick}">{row["nom"]} {row["prenom"]}</td>'
+                    f'<td onclick="{onclick}">{format_iwu_column(row["iwu_id"])}</td></tr>')
+    table_class = "table table-bordered" if return_url else "table table-bordered table-striped"
+    return f"<table class='{table_class}'>" + "".join(rows) + "</table>"
+
+
+def frame(with_dealers):
+    df = pd.DataFrame(ROWS, columns=["id_cree", "nom", "prenom", "iwu_id", "status"])
+    if with_dealers:
+        df["sap_dealer"] = ["10001", "10002", "10001", "10003", "10002"]
+        df["dealer_match"] = [True, False, True, True, False]
+    return df
+
+
+@pytest.mark.parametrize("with_dealers", [False, True])
+@pytest.mark.parametrize("options", [{"sap": "10001"}, {"sap": "10001", "return_url": "/dealers/10001"}])
+def test_html_matches_legacy(with_dealers, options):
+    df = frame(with_dealers)
+    expected = legacy_df_to_html(df, **options)
+    assert df_to_html(df, **options) == expected
+    # Découpage en morceaux sans effet sur le HTML produit
+    chunks = list(iter_table_html(df, chunk_rows=2, **options))
+    assert len(chunks) == 5
+    assert "".join(chunks) == expected
+
+
+def test_empty_frame():
+    df = frame(False).iloc[0:0]
+    assert df_to_html(df, sap="10001") == legacy_df_to_html(df, sap="10001")
@@ -0,0 +1,112 @@
+"""
+Tests de scripts/generate_names_final.py : build_names identique à l'ancienne boucle par SAP principal
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+
+from scripts.generate_names_final import APP_COLUMNS, IDOCS_COLUMNS, build_names, prepare_source
+
+
+def legacy_clean_sap(x):
+    s = str(x).strip()
+    if s.lower() == "nan" or s == "":
+        return ""
+    if s.endswith(".0"):
+        s = s[:-2]
+    return s
+
+
+def legacy_build(df_idocs, df_app):
+    def prepare(df, columns):
+        df = df.rename(columns=columns)
+        df["sap_dealer"] = df["sap_dealer"].map(legacy_clean_sap)
+        df["sap_princ"] = df["sap_princ"].map(legacy_clean_sap)
+        df["sap_nom"] = df["sap_nom"].fillna("").astype(str).str.strip()
+        return df
+
+    def get_names_list(sap_id, source_df, source_name):
+        rows = source_df[source_df["sap_princ"] == sap_id]
+        strict_rows = rows[rows["sap_dealer"] == sap_id]
+        use_rows = strict_rows if not strict_rows.empty else rows
+        formatted_names, seen_names = [], set()
+        for _, r in use_rows.iterrows():
+            nom = r["sap_nom"]
+            if nom and nom.lower() != "nan" and nom not in seen_names:
+                seen_names.add(nom)
+                formatted_names.append(f"{source_name}: {nom}")
+        return formatted_names
+
+    idocs, app = prepare(df_idocs, IDOCS_COLUMNS), prepare(df_app, APP_COLUMNS)
+    all_sap_princ = set(idocs["sap_princ"]) | set(app["sap_princ"])
+    rows = [
+        {"sap_princ": s, "sap_nom": " ; ".join(get_names_list(s, idocs, "IDOCS") + get_names_list(s, app, "WELCOME"))}
+        for s in all_sap_princ if s and s.lower() != "nan"
+    ]
+    return pd.DataFrame(rows).sort_values("sap_princ").reset_index(drop=True)
+
+
+def synthetic_sources(rows, saps, seed):
+    # Codes SAP comme les lit read_excel : nombres, flottants "x.0", texte avec espaces, vides
+    rnd = random.Random(seed)
+
+    def sap():
+        r, code = rnd.random(), rnd.randint(10000, 10000 + saps)
+        if r < .05:
+            return np.nan
+        return float(code) if r < .5 else (str(code) if r < .9 else f" {code} ")
+
+    noms = ["SPL SECLIN", "Garage Nord", "nan", "", "  Auto Sud ", None, "Él Véhicules", "NaN"]
+    noms += [f"Dealer {i}" for i in range(20)]
+
+    def source(columns):
+        dealer, princ, nom = columns
+        df = pd.DataFrame({
+            dealer: [sap() for _ in range(rows)],
+            princ: [sap() for _ in range(rows)],
+            nom: [rnd.choice(noms) for _ in range(rows)],
+        }, dtype=object)
+        # Lignes strictes (SAP Dealer == SAP Principal) fréquentes
+        strict = [rnd.random() < .3 for _ in range(rows)]
+        df.loc[strict, dealer] = df.loc[strict, princ]
+        return df
+
+    return source(list(IDOCS_COLUMNS)), source(list(APP_COLUMNS))
+
+
+def current_build(df_idocs, df_app):
+    return build_names(prepare_source(df_idocs, IDOCS_COLUMNS), prepare_source(df_app, APP_COLUMNS))
+
+
+def test_build_names_matches_legacy():
+    for seed in range(3):
+        df_idocs, df_app = synthetic_sources(2000, 150, seed)
+        expected = legacy_build(df_idocs, df_app)
+        result = current_build(df_idocs, df_app)
+        assert result["sap_princ"].tolist() == expected["sap_princ"].tolist()
+        assert result["sap_nom"].tolist() == expected["sap_nom"].tolist()
+
+
+def test_strict_rows_and_order():
+    df_idocs = pd.DataFrame({
+        "Vendu au code SAP": [20001.0, 10001.0, "10001", 30003, 30003],
+        "Code SAP du payeur": [10001.0, 10001.0, " 10001 ", 30003.0, 30003],
+        "Payer SAP Name": ["Filiale", "Zeta", "Alpha", "nan", None],
+    }, dtype=object)
+    df_app = pd.DataFrame({
+        "SAP Officina": [20002, 20003, 20002],
+        "SAP Dealer": [10002, 10002, 10002],
+        "Company Name": ["B", "A", "B"],
+    }, dtype=object)
+    result = current_build(df_idocs, df_app)
+    assert result.values.tolist() == [
+        # Lignes strictes seulement, dans l'ordre du fichier
+        ["10001", "IDOCS: Zeta ; IDOCS: Alpha"],
+        # Aucune ligne stricte : toutes les lignes, doublons supprimés
+        ["10002", "WELCOME: B ; WELCOME: A"],
+        # Concession sans nom exploitable conservée avec un nom vide
+        ["30003", ""],
+    ]
+    assert result.values.tolist() == legacy_build(df_idocs, df_app).values.tolist()
@@ -0,0 +1,170 @@
+"""
+Tests de la page d'accueil : liste des concessions et statistiques
+
+Référence : l'ancien calcul de home() (lecture de tous les couples
+sap_princ / id_cree, boucle iterrows et filtre con_nom par concession),
+comparé à build_dealer_list + load_dealer_counts sur le même jeu de données.
+"""
+
+import pandas as pd
+import pytest
+
+from app import build_dealer_list
+from utils.names import ConcessionNameIndex
+from utils.queries import read_query
+from utils.snapshot import connect_offline
+from utils.stats import load_dealer_counts
+from utils.tables import TABLE_COLUMNS
+
+URI = "file:test_home?mode=memory&cache=shared"
+
+ROWS = {
+    "sso": [
+        ("jean.dupont", "Dupont", "Jean", "10001"),
+        ("jean.dupont", "Dupont", "Jean", "10001"),
+        ("paul.martin", "Martin", "Paul", "10001"),
+        ("paul.martin", "Martin", "Paul", "10002"),
+        ("luc.petit", "Petit", "Luc", "10003"),
+        ("zoe.leroy", "Leroy", "Zoé", "10005"),
+        ("orphelin", "Sans", "Sap", None),
+    ],
+    "idocs_user": [
+        ("JEAN.DUPONT", "Dupont", "Jean", "10001"),
+        ("rene.morel", "Morel", "René", "10002"),
+        ("marc.blanc", "Blanc", "Marc", "10004"),
+        ("marc.blanc", "Blanc", "Marc", "10005"),
+    ],
+    "con_nom": [
+        ("10001", "IDOCS: GARAGE DU NORD ; WELCOME: GARAGE NORD ; WELCOME: NORD BIS"),
+        ("10002", "WELCOME: Garçon Auto"),
+        # Ligne en double : seule la première compte
+        ("10002", "IDOCS: IGNOREE"),
+        ("10003", "SANS PREFIXE"),
+        ("10004", "IDOCS: SUD ; idocs : Sud Bis ; WELCOME:"),
+        ("10005", "WELCOME: CENTRE ; IDOCS: CENTRE"),
+        (None, "WELCOME: SANS CODE"),
+    ],
+}
+
+
+def legacy_parse_names(sap_nom_string, source):
+    if not sap_nom_string or pd.isna(sap_nom_string):
+        return {"all_names": [], "display_name": "", "count": 0}
+    clean_names = []
+    for name in [n.strip() for n in str(sap_nom_string).split(';')]:
+        if ':' in name:
+            prefix, content = name.split(':', 1)
+            if prefix.strip().upper() == source and content.strip():
+                clean_names.append(content.strip())
+    if not clean_names:
+        return {"all_names": [], "display_name": "", "count": 0}
+    return {"all_names": clean_names, "display_name": clean_names[0], "count": len(clean_names)}
+
+
+def legacy_home(conn, search="", show_matches=""):
+    df_sso_princ = pd.read_sql("SELECT DISTINCT sap_princ FROM sso WHERE sap_princ IS NOT NULL", conn)
+    df_idocs_princ = pd.read_sql("SELECT DISTINCT sap_princ FROM idocs_user WHERE sap_princ IS NOT NULL", conn)
+    df_con_nom = pd.read_sql("SELECT sap_princ, sap_nom FROM con_nom WHERE sap_princ IS NOT NULL", conn)
+    df_welcome_users = pd.read_sql("SELECT DISTINCT sap_princ, id_cree FROM sso WHERE sap_princ IS NOT NULL", conn)
+    df_idocs_users = pd.read_sql("SELECT DISTINCT sap_princ, id_cree FROM idocs_user WHERE sap_princ IS NOT NULL", conn)
+
+    welcome_grp = df_welcome_users.groupby("sap_princ")["id_cree"].apply(lambda x: len(set(x)))
+    idocs_grp = df_idocs_users.groupby("sap_princ")["id_cree"].apply(lambda x: len(set(x)))
+    sso_ids = set(df_sso_princ["sap_princ"])
+    idocs_ids = set(df_idocs_princ["sap_princ"])
+
+    def dealers(df_princ, other_ids, grp, source):
+        result = []
+        for _, row in df_princ.iterrows():
+            sap_princ = row["sap_princ"]
+            in_both = sap_princ in other_ids
+            if show_matches and not in_both:
+                continue
+            name_row = df_con_nom[df_con_nom['sap_princ'] == sap_princ]
+            sap_nom = name_row['sap_nom'].iloc[0] if len(name_row) > 0 else ""
+            names_info = legacy_parse_names(sap_nom, source)
+            if names_info["count"] == 0:
+                continue
+            if search:
+                search_lower = search.lower()
+                if not (search_lower in str(sap_princ).lower() or
+                        any(search_lower in name.lower() for name in names_info["all_names"])):
+                    continue
+            result.append({
+                "sap_princ": sap_princ,
+                "names_info": names_info,
+                "count_users": grp.get(sap_princ, 0),
+                "in_both": in_both
+            })
+        return sorted(result, key=lambda x: str(x['sap_princ']))
+
+    total_concessions_welcome = len(df_sso_princ)
+    total_concessions_idocs = len(df_idocs_princ)
+    total_concessions_both = len(sso_ids & idocs_ids)
+    stats = {
+        'total_users_welcome': df_welcome_users['id_cree'].nunique(),
+        'total_users_idocs': df_idocs_users['id_cree'].nunique(),
+        'total_concessions_welcome': total_concessions_welcome,
+        'total_concessions_idocs': total_concessions_idocs,
+        'total_concessions_both': total_concessions_both,
+        'only_welcome': total_concessions_welcome - total_concessions_both,
+        'only_idocs': total_concessions_idocs - total_concessions_both,
+        'both': total_concessions_both
+    }
+    return (
+        dealers(df_sso_princ, idocs_ids, welcome_grp, "WELCOME"),
+        dealers(df_idocs_princ, sso_ids, idocs_grp, "IDOCS"),
+        stats,
+    )
+
+
+def current_home(conn, search="", show_matches=""):
+    counts = load_dealer_counts(conn)
+    names = ConcessionNameIndex.build(read_query(conn, "reference.con_nom"))
+    welcome_grp, idocs_grp = counts["welcome"], counts["idocs"]
+    return (
+        build_dealer_list(welcome_grp.index.to_series(), names, welcome_grp, set(idocs_grp.index),
+                          "WELCOME", search, show_matches),
+        build_dealer_list(idocs_grp.index.to_series(), names, idocs_grp, set(welcome_grp.index),
+                          "IDOCS", search, show_matches),
+        counts["stats"],
+    )
+
+
+def plain(value):
+    # Entiers numpy -> int : comparaison des valeurs affichées, pas des types
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return int(value) if hasattr(value, "item") else value
+
+
+@pytest.fixture(scope="module")
+def conn():
+    keeper = connect_offline(URI)
+    with keeper.cursor() as cursor:
+        for table in ROWS:
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(TABLE_COLUMNS[table])})")
+            marks = ", ".join(["%s"] * len(TABLE_COLUMNS[table]))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", ROWS[table])
+    keeper.commit()
+    yield keeper
+    keeper.close()
+
+
+@pytest.mark.parametrize("search, show_matches", [
+    ("", ""), ("", "1"), ("nord", ""), ("1000", "1"), ("GARÇON", ""), ("sud bis", ""), ("zzz", ""),
+])
+def test_home_matches_legacy(conn, search, show_matches):
+    assert plain(current_home(conn, search, show_matches)) == plain(legacy_home(conn, search, show_matches))
+
+
+def test_dealer_counts_match_legacy(conn):
+    # Toutes les concessions, y compris celles sans nom (absentes des listes)
+    counts = load_dealer_counts(conn)
+    for table, source in [("sso", "welcome"), ("idocs_user", "idocs")]:
+        pairs = pd.read_sql(f"SELECT DISTINCT sap_princ, id_cree FROM {table} WHERE sap_princ IS NOT NULL", conn)
+        expected = pairs.groupby("sap_princ")["id_cree"].apply(lambda x: len(set(x)))
+        assert plain(counts[source].sort_index().to_dict()) == plain(expected.to_dict())
+    assert plain(counts["stats"]) == plain(legacy_home(conn)[2])
@@ -0,0 +1,84 @@
+"""
+Tests de utils/id_norm.py : index de la migration et plans des requêtes des routes (SQLite)
+"""
+
+import sqlite3
+
+import pytest
+
+from utils.id_norm import ID_NORM_INDEXES, OBSOLETE_INDEXES, check_queries, create_id_norm_indexes
+from utils.tables import TABLE_COLUMNS, index_name
+
+
+@pytest.fixture
+def plans():
+    db = sqlite3.connect(":memory:")
+    for table, columns in TABLE_COLUMNS.items():
+        extra = ["id_norm"] if table in ID_NORM_INDEXES else []
+        db.execute(f"CREATE TABLE {table} ({', '.join(columns + extra)})")
+    for table, definitions in ID_NORM_INDEXES.items():
+        for columns in definitions:
+            db.execute(f"CREATE INDEX {index_name(table, columns)} ON {table} ({', '.join(columns)})")
+    return {
+        label: [row[3] for row in db.execute("EXPLAIN QUERY PLAN " + sql.replace("%s", "?"), params)]
+        for label, sql, params in check_queries("jean.dupont", "10001", "IWU1")
+    }
+
+
+def test_route_queries_use_migration_indexes(plans):
+    for label, plan in plans.items():
+        assert not [step for step in plan if step.startswith("SCAN")], label
+    used = " ".join(step for plan in plans.values() for step in plan)
+    for table in ("sso", "idocs_user"):
+        assert f"USING INDEX {index_name(table, ['sap_princ'])} (sap_princ=?)" in used
+        assert index_name(table, ["id_norm"]) in used
+
+
+def test_composite_index_not_created():
+    for table, definitions in OBSOLETE_INDEXES.items():
+        assert not set(map(tuple, definitions)) & set(map(tuple, ID_NORM_INDEXES[table]))
+
+
+class FakeConnection:
+    """Connexion MySQL factice : index existants (information_schema) et requêtes exécutées."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if "information_schema" not in sql:
+            self.conn.statements.append(sql)
+
+    def fetchall(self):
+        return [(name,) for name in self.conn.existing]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+def test_obsolete_composite_index_dropped():
+    existing = ["idx_sso_sap_princ_id_norm", "idx_sso_id_norm", "idx_sso_user_detail_iwu_id"]
+    conn = FakeConnection(existing)
+    created = create_id_norm_indexes(conn, log=lambda line: None)
+
+    expected = [
+        index_name(table, columns)
+        for table, definitions in ID_NORM_INDEXES.items() for columns in definitions
+        if index_name(table, columns) not in existing
+    ]
+    assert created == expected
+    # Seul l'index composite existant est supprimé (absent de idocs_user)
+    assert [sql for sql in conn.statements if sql.startswith("DROP")] == ["DROP INDEX idx_sso_sap_princ_id_norm ON sso"]
+    assert "CREATE INDEX idx_sso_sap_princ ON sso (sap_princ)" in conn.statements
@@ -0,0 +1,123 @@
+"""
+Tests de utils/names.py : index des noms (comparé à l'ancienne lecture de con_nom) et écriture de con_nom
+"""
+
+import pandas as pd
+import pytest
+
+from utils.names import ConcessionNameIndex, write_con_nom
+from utils.snapshot import connect_offline
+
+URI = "file:test_names?mode=memory&cache=shared"
+
+CON_NOM = [
+    ("10001", "IDOCS: GARAGE DU NORD ; WELCOME: GARAGE NORD ; WELCOME: NORD BIS"),
+    ("10002", "WELCOME: Garçon Auto"),
+    # Ligne en double : seule la première compte
+    ("10002", "IDOCS: IGNOREE"),
+    ("10003", "SANS PREFIXE"),
+    ("10004", "IDOCS: SUD ; idocs : Sud Bis ; WELCOME:"),
+    ("10005", " welcome:CENTRE;IDOCS: CENTRE ; ; WELCOME: A:B"),
+    ("10006", ""),
+    ("10007", None),
+    (None, "WELCOME: SANS CODE"),
+]
+
+SAPS = ["10001", "10002", "10003", "10004", "10005", "10006", "10007", "99999"]
+
+
+def legacy_names(df_con_nom, sap_princ, source):
+    """Ancienne lecture de home() : première ligne con_nom de la concession, puis parse_names."""
+    name_row = df_con_nom[df_con_nom['sap_princ'] == sap_princ]
+    sap_nom = name_row['sap_nom'].iloc[0] if len(name_row) > 0 else ""
+    if not sap_nom or pd.isna(sap_nom):
+        return []
+    clean_names = []
+    for name in [n.strip() for n in str(sap_nom).split(';')]:
+        if ':' in name:
+            prefix, content = name.split(':', 1)
+            if prefix.strip().upper() == source and content.strip():
+                clean_names.append(content.strip())
+    return clean_names
+
+
+@pytest.fixture(scope="module")
+def con_nom():
+    return pd.DataFrame(CON_NOM, columns=["sap_princ", "sap_nom"])
+
+
+@pytest.mark.parametrize("source", ["WELCOME", "IDOCS"])
+def test_index_matches_legacy_lookup(con_nom, source):
+    index = ConcessionNameIndex.build(con_nom)
+    for sap_princ in SAPS:
+        assert list(index.get(sap_princ).names(source)) == legacy_names(con_nom, sap_princ, source), sap_princ
+
+
+@pytest.mark.parametrize("source", ["WELCOME", "IDOCS"])
+def test_names_series_matches_legacy_lookup(con_nom, source):
+    index = ConcessionNameIndex.build(con_nom)
+    sap_princs = pd.Series(SAPS + ["10001", None], index=range(100, 110))
+    result = index.names_series(sap_princs, source)
+
+    assert result.dtype == object
+    assert list(result.index) == list(sap_princs.index)
+    for sap_princ, names in zip(sap_princs, result):
+        # Aucun nom pour la source : None (et non un tuple vide)
+        expected = legacy_names(con_nom, sap_princ, source) if sap_princ is not None else []
+        assert names == (tuple(expected) if expected else None), sap_princ
+
+
+def test_index_records(con_nom):
+    index = ConcessionNameIndex.build(con_nom)
+    assert len(index) == 7
+    assert "10007" in index and "99999" not in index and None not in index
+    assert index.raw("10002") == "WELCOME: Garçon Auto"
+    assert index.raw("99999") is None
+
+    names = index.get("10005")
+    assert (names.welcome, names.idocs, names.common) == (("CENTRE", "A:B"), ("CENTRE",), ("CENTRE",))
+    assert names.labels == ("W + I: CENTRE", "W: A:B")
+    empty = index.get("99999")
+    assert (empty.sap_princ, empty.welcome, empty.idocs, empty.labels) == ("99999", (), (), ())
+
+
+def test_names_series_empty():
+    index = ConcessionNameIndex.build(pd.DataFrame(columns=["sap_princ", "sap_nom"]))
+    assert index.names_series(pd.Series(["10001"]), "WELCOME").tolist() == [None]
+    assert index.names_series(pd.Series([], dtype=object), "IDOCS").tolist() == []
+
+
+@pytest.fixture
+def conn():
+    keeper = connect_offline(URI)
+    with keeper.cursor() as cursor:
+        cursor.execute("CREATE TABLE con_nom (sap_princ, sap_nom)")
+        cursor.executemany("INSERT INTO con_nom VALUES (%s, %s)", [
+            ("10001", "IDOCS: ANCIEN"), ("10002", "WELCOME: GARDE"), ("10003", "IDOCS: DISPARU"),
+        ])
+    keeper.commit()
+    yield keeper
+    keeper.close()
+
+
+def content(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sap_princ, sap_nom FROM con_nom ORDER BY sap_princ")
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["sap_princ", "sap_nom"])
+
+
+def test_incremental_write_keeps_other_dealers(conn):
+    counts = write_con_nom(conn, frame([("10001", "IDOCS: NOUVEAU")]), removed=["10003"], batch_size=1)
+    assert counts == {"upserted": 1, "deleted": 1}
+    assert content(conn) == [("10001", "IDOCS: NOUVEAU"), ("10002", "WELCOME: GARDE")]
+
+
+def test_full_write_replaces_table(conn):
+    counts = write_con_nom(conn, frame([("10001", "IDOCS: NOUVEAU"), ("10004", "WELCOME: NEUF")]), replace=True)
+    # 10002 et 10003 absents de la génération complète : supprimés
+    assert counts == {"upserted": 2, "deleted": 2}
+    assert content(conn) == [("10001", "IDOCS: NOUVEAU"), ("10004", "WELCOME: NEUF")]
@@ -0,0 +1,91 @@
+"""
+Tests de utils/parallel.fetch_parallel avec un pool de connexions saturé
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils import database, parallel
+from utils.database import ConnectionPool
+
+
+class FakeConnection:
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    pool = ConnectionPool(FakeConnection, max_size=2, timeout=1)
+    monkeypatch.setattr(database, "pool", pool)
+    return pool
+
+
+def slow_task(value, seconds=0.2):
+    def task(conn):
+        time.sleep(seconds)
+        return value
+    return task
+
+
+def test_concurrent_pages_do_not_exhaust_pool(small_pool):
+    # Deux pages tiennent chacune une connexion et lancent deux tâches : plus aucune connexion libre
+    started = threading.Barrier(2)
+    results, errors = [], []
+
+    def page(name):
+        with small_pool.acquire() as conn:
+            started.wait()
+            try:
+                results.append(parallel.fetch_parallel(conn, slow_task(name + "-sso"), slow_task(name + "-idocs")))
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=page, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(results) == [["a-sso", "a-idocs"], ["b-sso", "b-idocs"]]
+    assert small_pool.stats()["timeouts"] == 0
+    assert small_pool.stats()["in_use"] == 0
+
+
+def test_tasks_without_free_connection_run_on_caller_connection(small_pool):
+    seen = []
+
+    def task(value):
+        def run(conn):
+            seen.append((value, conn))
+            return value
+        return run
+
+    with small_pool.acquire() as conn:
+        # Une seule connexion libre pour trois tâches supplémentaires
+        results = parallel.fetch_parallel(conn, task(1), task(2), task(3), task(4))
+
+    assert results == [1, 2, 3, 4]
+    assert [value for value, used in seen if used is conn] == [1, 3, 4]
+    assert small_pool.stats()["busy"] == 1
+    assert small_pool.stats()["in_use"] == 0
+
+
+def test_reserved_connections_are_released_on_error(small_pool):
+    def failing(conn):
+        raise ValueError("échec")
+
+    with small_pool.acquire() as conn:
+        with pytest.raises(ValueError):
+            parallel.fetch_parallel(conn, slow_task("ok", 0), failing)
+
+    assert small_pool.stats()["in_use"] == 0
@@ -0,0 +1,36 @@
+"""
+Tests de utils/parsers.py : normalize_id / normalize_ids identiques à la version d'origine
+"""
+
+import re
+import unicodedata
+
+import pandas as pd
+
+from utils.parsers import normalize_id, normalize_ids
+
+IDS = [
+    "Jean.Dupont", "JEAN.DUPONT", "jean dupont", "Zoé_Lefèvre12", "Łukasz.Straße", "Nguyễn-Çelik",
+    "İlker", "ﬁlou", "Ｆｕｌｌ", "O'Neil", "", "   ", "\x1e", "123",
+    # Séparateur interne de normalize_ids : repli sur la version scalaire
+    "a\x00b",
+]
+
+
+def legacy_normalize_id(s):
+    if s is None:
+        return ""
+    s = ''.join(c for c in unicodedata.normalize('NFD', str(s)) if unicodedata.category(c) != 'Mn')
+    return re.sub(r'[^A-Za-z]', '', s).upper()
+
+
+def test_scalar_and_vectorized_match_legacy():
+    expected = [legacy_normalize_id(s) for s in IDS]
+    assert [normalize_id(s) for s in IDS] == expected
+    assert normalize_ids(pd.Series(IDS, dtype=object)).tolist() == expected
+
+
+def test_missing_values_are_empty():
+    values = pd.Series([None, float("nan"), pd.NA, "Jean"], dtype=object)
+    assert normalize_ids(values).tolist() == ["", "", "", "JEAN"]
+    assert [normalize_id(v) for v in values] == ["", "", "", "JEAN"]
@@ -0,0 +1,155 @@
+"""
+Tests de utils/profiling.py (phases imbriquées, Server-Timing) et de la protection de /metrics
+"""
+
+import re
+import types
+
+import pytest
+from flask import Flask, render_template_string
+
+import app
+from utils import profiling
+from utils.profiling import RequestTimer, instrument_app, phase, render_metrics, timed_iter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profiling, "time", types.SimpleNamespace(perf_counter=clock.perf_counter))
+    return clock
+
+
+def test_nested_phase_suspends_outer_phase(clock):
+    timer = RequestTimer()
+    timer.start("transform")
+    clock.now += 1.0
+    timer.start("db")
+    clock.now += 2.0
+    timer.stop()
+    clock.now += 0.5
+    timer.start("db")
+    clock.now += 0.25
+    timer.stop()
+    clock.now += 0.25
+    timer.stop()
+
+    # transform : 1.0 + 0.5 + 0.25 (hors db) ; db : 2.0 + 0.25 ; chaque seconde comptée une fois
+    assert timer.phases == {"transform": 1.75, "db": 2.25}
+    assert timer.finish() == sum(timer.phases.values()) == 4.0
+
+
+def test_same_phase_nested_counted_once(clock):
+    timer = RequestTimer()
+    timer.start("db")
+    clock.now += 1.0
+    timer.start("db")
+    clock.now += 1.0
+    timer.stop()
+    clock.now += 1.0
+    timer.stop()
+    assert timer.phases == {"db": 3.0}
+
+
+def test_finish_closes_open_phases(clock):
+    timer = RequestTimer()
+    timer.start("transform")
+    clock.now += 1.0
+    timer.start("html")
+    clock.now += 0.5
+    assert timer.finish() == 1.5
+    assert timer.phases == {"transform": 1.0, "html": 0.5}
+    assert timer.header() == "transform;dur=1000.0, html;dur=500.0, total;dur=1500.0"
+
+
+def test_phase_outside_request_does_nothing():
+    with phase("db"):
+        pass
+    assert list(timed_iter(iter([1, 2]), "html")) == [1, 2]
+
+
+@pytest.fixture
+def plain_app():
+    flask_app = Flask(__name__)
+    instrument_app(flask_app)
+
+    @flask_app.route("/plain/<name>")
+    def plain(name):
+        with phase("transform"):
+            with phase("db"):
+                rows = [name.upper()] * 3
+            rows = [row.lower() for row in rows]
+        html = "".join(timed_iter((f"<td>{row}</td>" for row in rows), "html"))
+        return render_template_string("<table>{{ html|safe }}</table>", html=html)
+
+    @flask_app.route("/boom")
+    def boom():
+        raise RuntimeError("erreur")
+
+    return flask_app
+
+
+def test_server_timing_header_on_plain_route(plain_app):
+    response = plain_app.test_client().get("/plain/dupont")
+    assert response.status_code == 200
+    header = response.headers["Server-Timing"]
+    entries = re.findall(r"(\w+);dur=(\d+\.\d)", header)
+    assert ", ".join(f"{name};dur={value}" for name, value in entries) == header
+    # Phases dans l'ordre où elles ont été comptées pour la première fois, total en dernier
+    assert [name for name, _ in entries] == ["transform", "db", "html", "template", "total"]
+    durations = {name: float(value) for name, value in entries}
+    assert durations["total"] >= sum(durations.values()) - durations["total"] - 0.5
+
+
+def test_request_and_phases_recorded_in_metrics(plain_app):
+    client = plain_app.test_client()
+    client.get("/plain/martin").close()
+    response = client.get("/boom")
+    response.close()
+    assert response.status_code == 500
+
+    body = render_metrics()
+    for route, status in (("/plain/<name>", 200), ("/boom", 500)):
+        labels = f'route="{route}",method="GET",status="{status}"'
+        assert re.search(rf"dealerview_request_duration_seconds_count\{{{labels}\}} [1-9]", body)
+    for name in ("db", "transform", "html", "template"):
+        assert f'dealerview_request_phase_seconds_count{{route="/plain/<name>",phase="{name}"}}' in body
+
+
+# ============================
+# /metrics : même protection que /cache/invalidate
+# ============================
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "ADMIN_TOKEN", "")
+    return app.app.test_client()
+
+
+def test_metrics_local_call_allowed(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "# TYPE dealerview_request_duration_seconds histogram" in response.get_data(as_text=True)
+
+
+def test_metrics_remote_call_refused(client):
+    response = client.get("/metrics", environ_base={"REMOTE_ADDR": "10.20.30.40"})
+    assert response.status_code == 403
+    assert response.get_json() == {"error": "Accès refusé"}
+
+
+def test_metrics_admin_token(client, monkeypatch):
+    monkeypatch.setattr(app, "ADMIN_TOKEN", "secret")
+    remote = {"REMOTE_ADDR": "10.20.30.40"}
+    assert client.get("/metrics", environ_base=remote, headers={"X-Admin-Token": "secret"}).status_code == 200
+    assert client.get("/metrics", environ_base=remote, headers={"X-Admin-Token": "autre"}).status_code == 403
+    # Jeton configuré : l'appel local doit aussi le fournir
+    assert client.get("/metrics").status_code == 403
@@ -0,0 +1,43 @@
+"""
+Tests de utils/queries.py : fetch_records (chemin sans pandas) face à read_query
+"""
+
+import pandas as pd
+import pytest
+
+from utils.queries import fetch_records, query_stats, read_query
+from utils.snapshot import connect_offline
+from utils.tables import TABLE_COLUMNS
+
+URI = "file:test_queries?mode=memory&cache=shared"
+
+ROWS = [("10001", "10001", "GARAGE DU NORD"), ("10001", "10001", None), ("10002", "10001", "NORD BIS")]
+
+
+@pytest.fixture
+def conn():
+    keeper = connect_offline(URI)
+    with keeper.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE idocs_con ({', '.join(TABLE_COLUMNS['idocs_con'])})")
+        cursor.executemany("INSERT INTO idocs_con (sap_dealer, sap_princ, sap_nom) VALUES (%s, %s, %s)", ROWS)
+    keeper.commit()
+    yield keeper
+    keeper.close()
+
+
+def test_records_match_read_query(conn):
+    records = fetch_records(conn, "dealers.sub_names", ["10001"])
+    df = read_query(conn, "dealers.sub_names", ["10001"])
+    assert [row._fields for row in records] == [tuple(df.columns)] * len(df)
+    # Mêmes lignes ; NULL reste None (pas de NaN)
+    expected = df.astype(object).where(df.notna(), None).values.tolist()
+    assert sorted(map(list, records), key=str) == sorted(expected, key=str)
+    assert any(row.sap_nom is None for row in records)
+
+
+def test_records_are_timed_and_errors_match_read_query(conn):
+    query_stats.reset()
+    fetch_records(conn, "dealers.sub_names", ["10002"])
+    assert query_stats.stats()["dealers.sub_names"]["count"] == 1
+    with pytest.raises(pd.errors.DatabaseError):
+        fetch_records(conn, "reference.con_nom")
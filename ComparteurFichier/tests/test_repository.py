@@ -0,0 +1,84 @@
+"""
+Tests de utils/repository.py : requêtes nommées partagées avec les routes
+"""
+
+import pandas as pd
+import pytest
+
+from utils import database
+from utils.comparison import fetch_users
+from utils.database import ConnectionPool
+from utils.queries import query_stats
+from utils.repository import MySQLRepository, SQLiteRepository, repository
+from utils.snapshot import connect_offline
+from utils.tables import TABLE_COLUMNS
+
+URI = "file:test_repository?mode=memory&cache=shared"
+
+FRAMES = {
+    "sso": [("jean.dupont", "Dupont", "Jean", "10001"), ("paul.martin", "Martin", "Paul", "10002")],
+    "sso_user_detail": [("jean.dupont", "Dupont", "Jean", "IWU1"), ("paul.martin", "Martin", "Paul", None)],
+    "idocs_user_detail": [("JEAN.DUPONT", "Dupont", "Jean", "IWU1", "IVECO", "ADMIN")],
+    "con_nom": [("10001", "IDOCS: DEALER 1"), (None, "SANS CODE")],
+}
+
+
+def frames():
+    return {table: pd.DataFrame(rows, columns=TABLE_COLUMNS[table]) for table, rows in FRAMES.items()}
+
+
+@pytest.fixture
+def sqlite_repo():
+    repo = SQLiteRepository()
+    repo.load_frames(frames())
+    return repo
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    keeper = connect_offline(URI)
+    with keeper.cursor() as cursor:
+        for table, columns in TABLE_COLUMNS.items():
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        for table, rows in FRAMES.items():
+            marks = ", ".join(["%s"] * len(TABLE_COLUMNS[table]))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", rows)
+    keeper.commit()
+    monkeypatch.setattr(database, "pool", ConnectionPool(lambda: connect_offline(URI)))
+    yield keeper
+    database.pool.clear()
+    keeper.close()
+
+
+def test_get_users_matches_route_query(sqlite_repo, pooled):
+    expected = fetch_users(pooled, "SSO", ["10001", "10002"])
+    df = sqlite_repo.get_users("SSO", ["10001", "10002"])
+    assert sorted(map(tuple, df.values.tolist())) == sorted(map(tuple, expected.values.tolist()))
+
+
+def test_find_by_iwu_and_dealer_names(sqlite_repo):
+    found = sqlite_repo.find_by_iwu("IWU1")
+    assert sorted(zip(found["source"], found["id_cree"])) == [("IDOCS", "JEAN.DUPONT"), ("SSO", "jean.dupont")]
+    assert sqlite_repo.get_dealer_names()["sap_princ"].tolist() == ["10001"]
+
+
+def test_explain_uses_indexes(sqlite_repo):
+    plan = " ".join(sqlite_repo.explain("find_by_iwu", "IWU1")["detail"])
+    assert "idx_sso_user_detail_iwu_id" in plan
+    assert "idx_idocs_user_detail_iwu_id" in plan
+
+
+def test_application_backend_records_query_stats(pooled):
+    query_stats.reset()
+    assert MySQLRepository().get_dealer_names()["sap_nom"].tolist() == ["IDOCS: DEALER 1"]
+    assert query_stats.stats()["reference.con_nom"]["count"] == 1
+
+
+def test_route_reads_use_caller_connection(pooled):
+    query_stats.reset()
+    with database.get_conn() as conn:
+        df = fetch_users(conn, "SSO", ["10001"])
+        # La connexion de l'appelant reste utilisable après la lecture
+        assert repository.get_dealer_names(conn=conn)["sap_princ"].tolist() == ["10001"]
+    assert df["id_cree"].tolist() == ["jean.dupont"]
+    assert query_stats.stats()["comparison.users"]["count"] == 1
@@ -0,0 +1,112 @@
+"""
+Tests de utils/search.UserSearchIndex : résultats de l'ancienne recherche LIKE et classement
+"""
+
+import pandas as pd
+import pytest
+
+from utils.search import SEARCH_LIMIT, UserSearchIndex, fold_text
+
+COLUMNS = ["id_cree", "nom", "prenom", "iwu_id", "source"]
+
+ROWS = [
+    ("jean.dupont", "Dupont", "Jean", "IWU100", "IDOCS"),
+    ("jean.dupont", "Dupont", "Jean", "IWU101", "SSO"),
+    ("jean.dupont", "Dupont", "Jean", "IWU100", "SSO"),
+    ("helene.leveque", "Lévêque", "Hélène", "NONE", "SSO"),
+    ("marc.dupond", "Dupond", "Marc", None, "IDOCS"),
+    ("pierre.du", "Du", "Pierre", "IWU200", "SSO"),
+    ("andre.durand", "Durand", "André", "IWU300", "IDOCS"),
+    ("luc.perdu", "Perdu", "Luc", "IWU400", "IDOCS"),
+    ("eric.noel", "Noël", "Éric", "IWU-É1", "SSO"),
+    ("zoe.ai", "Ai", "Zoé", "", "SSO"),
+]
+
+TERMS = [
+    "du", "DU", "d", "é", "e", "ai", "dupont", "DUPONT", "Dupon", "lévêque", "leveque", "LEVEQUE",
+    "hel", "ene", "iwu1", "IWU100", "iwu-e1", "noel", "eric", "andré", "zzz", "iwu",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return UserSearchIndex(pd.DataFrame(ROWS, columns=COLUMNS))
+
+
+def legacy_search(rows, term):
+    """
+    Ancienne recherche : LIKE '%terme%' sur nom, prenom et iwu_id des deux tables de détail
+    (collation MySQL insensible à la casse et aux accents), regroupée par id_cree.
+
+    Les IWU "NONE" (utilisateur sans IWU) ne sont pas cherchés, comme dans l'index.
+    """
+    term = fold_text(term).strip()
+    grouped = {}
+    for id_cree, nom, prenom, iwu_id, source in rows:
+        values = [nom, prenom] + ([iwu_id] if iwu_id != "NONE" else [])
+        if any(term in fold_text(value) for value in values):
+            grouped.setdefault(id_cree, {"id_cree": id_cree, "nom": nom, "prenom": prenom, "sources": set()})
+            grouped[id_cree]["sources"].add(source)
+    return grouped
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_same_users_as_legacy_search(index, term):
+    expected = legacy_search(ROWS, term)
+    results = index.search(term)
+    assert {r["id_cree"] for r in results} == set(expected)
+    for result in results:
+        legacy = expected[result["id_cree"]]
+        assert (result["nom"], result["prenom"]) == (legacy["nom"], legacy["prenom"])
+        assert set(result["source"].split(" + ")) == legacy["sources"]
+
+
+def test_empty_term(index):
+    assert index.search("") == index.search("   ") == []
+
+
+def test_sources_merged_in_fixed_order(index):
+    # Première ligne de jean.dupont en IDOCS : l'ordre affiché reste "SSO + IDOCS"
+    assert index.search("dupont")[0]["source"] == "SSO + IDOCS"
+    assert index.search("durand")[0]["source"] == "IDOCS"
+
+
+def test_displayed_iwu(index):
+    # IWU qui correspond à la recherche, sinon le premier ; "" sans IWU (NONE, None ou vide)
+    assert index.search("iwu101")[0]["iwu_id"] == "IWU101"
+    assert index.search("dupont")[0]["iwu_id"] == "IWU100"
+    for term in ("leveque", "dupond", "zoe"):
+        assert index.search(term)[0]["iwu_id"] == ""
+
+
+def test_ranking_exact_then_prefix_then_substring(index):
+    # "du" : nom identique (Du), début de nom (Dupond, Dupont, Durand), sous-chaîne (Perdu)
+    assert [r["id_cree"] for r in index.search("du")] == [
+        "pierre.du", "marc.dupond", "jean.dupont", "andre.durand", "luc.perdu",
+    ]
+    # Score du meilleur champ : "luc" identique au prénom de luc.perdu, sous-chaîne de "Duluc"
+    rows = ROWS + [("paul.duluc", "Duluc", "Paul", "NONE", "SSO"), ("lucas.roy", "Roy", "Lucas", "NONE", "SSO")]
+    ranked = UserSearchIndex(pd.DataFrame(rows, columns=COLUMNS)).search("LUC")
+    assert [r["id_cree"] for r in ranked] == ["luc.perdu", "lucas.roy", "paul.duluc"]
+
+
+def test_short_terms_scan_all_users(index):
+    assert [r["id_cree"] for r in index.search("ai")] == ["zoe.ai"]
+    # Un caractère : accent ignoré, même résultat que "e" (tous les utilisateurs sauf marc.dupond)
+    assert index.search("é") == index.search("E")
+    assert len(index.search("é")) == len(set(id_cree for id_cree, *_ in ROWS)) - 1
+
+
+def test_limit_keeps_best_ranked():
+    rows = (
+        [(f"s{i:03d}", f"Saint-Martin{i:03d}", "A", "NONE", "SSO") for i in range(120)]
+        + [(f"p{i:03d}", f"Martinez{i:03d}", "A", "NONE", "IDOCS") for i in range(60)]
+        + [(f"e{i:03d}", "Martin", f"P{i:03d}", "NONE", "SSO") for i in range(30)]
+    )
+    index = UserSearchIndex(pd.DataFrame(rows, columns=COLUMNS))
+    results = index.search("martin")
+    assert len(results) == SEARCH_LIMIT == 100
+    assert [r["id_cree"] for r in results] == (
+        [f"e{i:03d}" for i in range(30)] + [f"p{i:03d}" for i in range(60)] + [f"s{i:03d}" for i in range(10)]
+    )
+    assert len(index.search("martin", limit=500)) == len(legacy_search(rows, "martin")) == 210
@@ -0,0 +1,123 @@
+"""
+Tests de utils/snapshot.py : export Arrow, relecture et routes en mode hors ligne
+"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import app
+from utils import database, snapshot_cache
+from utils.database import ConnectionPool
+from utils.snapshot import (
+    OfflineConnection, export_snapshot, offline_connector, read_frame, read_manifest, read_table
+)
+from utils.tables import IMPORTED_TABLES, TABLE_COLUMNS
+
+pa = pytest.importorskip("pyarrow")
+
+ROWS = {
+    "sso": [
+        ("jean.dupont", "Dupont", "Jean", "10001"),
+        ("paul.martin", "Martin", "Paul", "10001"),
+        ("paul.martin", "Martin", "Paul", "10002"),
+        ("zoe.leroy", "Leroy", "Zoé", None),
+    ],
+    "idocs_user": [
+        ("JEAN.DUPONT", "Dupont", "Jean", "10001"),
+        ("rene.morel", "Morel", "René", "10002"),
+    ],
+    "sso_user_detail": [
+        ("jean.dupont", "Dupont", "Jean", "IWU1"),
+        ("paul.martin", "Martin", "Paul", "IWU2"),
+        ("zoe.leroy", "Leroy", "Zoé", None),
+    ],
+    "idocs_user_detail": [
+        ("JEAN.DUPONT", "Dupont", "Jean", "IWU1", "IVECO", "ADMIN"),
+        ("rene.morel", "Morel", "René", "IWU2", "IVECO", "VENDEUR"),
+    ],
+    "con_nom": [
+        ("10001", "IDOCS: GARAGE DU NORD ; WELCOME: GARAGE NORD"),
+        ("10002", "WELCOME: Garçon Auto"),
+    ],
+    "idocs_con": [
+        ("10001", "10001", "GARAGE DU NORD"),
+        ("10002", "10002", "GARCON AUTO"),
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def snapshot_dir(tmp_path_factory):
+    source = OfflineConnection(sqlite3.connect(":memory:"))
+    with source.cursor() as cursor:
+        for table, columns in TABLE_COLUMNS.items():
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+            marks = ", ".join(["%s"] * len(columns))
+            cursor.executemany(f"INSERT INTO {table} VALUES ({marks})", ROWS[table])
+    source.commit()
+
+    path = tmp_path_factory.mktemp("snapshot")
+    # Blocs de 2 lignes : plusieurs fetchmany par table
+    export_snapshot(source, str(path), chunk_rows=2, log=lambda line: None)
+    source.close()
+    return str(path)
+
+
+def test_manifest_lists_every_table(snapshot_dir):
+    manifest = read_manifest(snapshot_dir)
+    assert [entry["table"] for entry in manifest["tables"]] == IMPORTED_TABLES
+    for entry in manifest["tables"]:
+        assert entry["file"] == f"{entry['table']}.arrow"
+        assert entry["rows"] == len(ROWS[entry["table"]])
+        assert entry["columns"] == TABLE_COLUMNS[entry["table"]]
+
+
+def test_text_columns_dictionary_encoded(snapshot_dir):
+    data = read_table(snapshot_dir, "sso")
+    assert all(pa.types.is_dictionary(field.type) for field in data.schema)
+    # sap_princ : deux valeurs distinctes (et un NULL) pour quatre lignes
+    assert len(data.column("sap_princ").chunk(0).dictionary) == 2
+
+
+@pytest.mark.parametrize("table", IMPORTED_TABLES)
+def test_read_frame_round_trip(snapshot_dir, table):
+    df = read_frame(snapshot_dir, table)
+    assert list(df.columns) == TABLE_COLUMNS[table]
+    assert [tuple(None if pd.isna(v) else v for v in row) for row in df.itertuples(index=False)] == ROWS[table]
+
+
+# ============================
+# MODE HORS LIGNE
+# ============================
+@pytest.fixture
+def client(snapshot_dir, monkeypatch):
+    monkeypatch.setattr(database, "pool", ConnectionPool(offline_connector(snapshot_dir)))
+    snapshot_cache.invalidate()
+    yield app.app.test_client()
+    snapshot_cache.invalidate()
+    database.pool.clear()
+
+
+@pytest.mark.parametrize("method, url, expected", [
+    ("get", "/", "GARAGE NORD"),
+    ("get", "/dealers/10001", "jean.dupont"),
+    ("get", "/compare?sap_princ=10002", "rene.morel"),
+    ("get", "/compare_user?id=jean.dupont", "IWU1"),
+    ("post", "/search_user", "paul.martin"),
+    ("get", "/duplicates", "Rapport"),
+])
+def test_routes_served_from_snapshot(client, method, url, expected):
+    kwargs = {"data": {"search": "mart"}} if method == "post" else {}
+    response = getattr(client, method)(url, **kwargs)
+    assert response.status_code == 200
+    assert expected in response.get_data(as_text=True)
+
+
+def test_api_users_from_snapshot(client):
+    response = client.get("/api/users?limit=2")
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert len(payload["users"]) == 2
+    assert payload["next_cursor"]
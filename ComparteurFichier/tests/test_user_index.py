@@ -0,0 +1,156 @@
+"""
+Tests de utils/user_index.py : condition id_match et index face à la lecture directe (SQLite)
+"""
+
+import sqlite3
+
+import pytest
+
+from utils import database, user_index
+from utils.database import ConnectionPool
+from utils.parsers import normalize_id
+from utils.snapshot import OfflineConnection, connect_offline
+from utils.tables import TABLE_COLUMNS
+from utils.user_index import (
+    DEALER_INDEX_COLUMNS, IWU_INDEX_COLUMNS, build_user_index, id_match, invalidate_user_index, lookup_user,
+    _lookup_index, _lookup_live,
+)
+
+ROWS = ["Jean.Dupont", "JEAN.DUPONT", "jean.dupont2", "Paul.Martin"]
+
+
+@pytest.fixture
+def conn():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE sso (id_cree TEXT, id_norm TEXT)")
+    db.executemany("INSERT INTO sso VALUES (?, ?)", [(id_cree, normalize_id(id_cree)) for id_cree in ROWS])
+    # Ligne importée après le dernier remplissage de id_norm
+    db.execute("INSERT INTO sso VALUES ('jean.dupont', NULL)")
+    return OfflineConnection(db)
+
+
+def matching(conn, id_cree, indexed):
+    sql, params = id_match(id_cree, indexed)
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT id_cree FROM sso WHERE {sql} ORDER BY id_cree", params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+@pytest.mark.parametrize("id_cree", ["Jean.Dupont", "jean.dupont", "Paul.Martin", "inconnu"])
+def test_indexed_match_equals_legacy_match(conn, id_cree):
+    assert matching(conn, id_cree, indexed=True) == matching(conn, id_cree, indexed=False)
+
+
+def test_indexed_match_finds_rows_without_id_norm(conn):
+    assert "jean.dupont" in matching(conn, "jean.dupont", indexed=True)
+
+
+# ============================
+# Index (user_iwu_index / user_dealer_index) et lecture directe
+# ============================
+URI = "file:test_user_index?mode=memory&cache=shared"
+
+USERS = [
+    ("jean.dupont", "Dupont", "Jean", "10001"),
+    ("jean.dupont", "Dupont", "Jean", "10002"),
+    ("Jean Dupont", "Dupont", "Jean", "10003"),
+    ("JEANDUPONT", "Dupont", "Jean", "10004"),
+    ("paul.martin", "Martin", "Paul", "10001"),
+    ("   ", "Vide", "Vide", "10005"),
+    (None, "Sans", "Id", "10006"),
+]
+
+DETAILS = {
+    "sso_user_detail": [
+        ("jean.dupont", "Dupont", "Jean", "IWU1"),
+        ("Jean Dupont", "Dupont", "Jean", "IWU2"),
+        ("JEANDUPONT", "Dupont", "Jean", "NONE"),
+        ("paul.martin", "Martin", "Paul", "IWU1"),
+        ("   ", "Vide", "Vide", "IWU3"),
+        (None, "Sans", "Id", "IWU1"),
+    ],
+    "idocs_user_detail": [
+        ("JEAN.DUPONT", "Dupont", "Jean", "IWU1", "IVECO", "ADMIN"),
+        ("jean.dupont", "Dupont", "J.", None, "IVECO", "USER"),
+        ("luc.petit", "Petit", "Luc", "IWU2", None, None),
+    ],
+}
+
+IDS = ["jean.dupont", "JEAN.DUPONT", "Jean Dupont", "JEANDUPONT", "jeandupont", "paul.martin",
+       "luc.petit", "   ", "", "inconnu"]
+
+
+def create_tables(keeper, detail_columns):
+    with keeper.cursor() as cursor:
+        for table in ("sso", "idocs_user"):
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(TABLE_COLUMNS[table])})")
+            cursor.executemany(f"INSERT INTO {table} VALUES (%s, %s, %s, %s)", USERS)
+        for table, rows in DETAILS.items():
+            columns = detail_columns.get(table, TABLE_COLUMNS[table])
+            cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+            cursor.executemany(f"INSERT INTO {table} VALUES ({', '.join(['%s'] * len(columns))})",
+                               [row[:len(columns)] for row in rows])
+        # INDEX_SCHEMA est en DDL MySQL (index déclarés dans CREATE TABLE) : mêmes colonnes en SQLite
+        cursor.execute(f"CREATE TABLE user_iwu_index ({', '.join(IWU_INDEX_COLUMNS)})")
+        cursor.execute(f"CREATE TABLE user_dealer_index ({', '.join(DEALER_INDEX_COLUMNS)})")
+        cursor.execute("CREATE TABLE user_index_state (id, built_at, optional_columns)")
+    keeper.commit()
+
+
+@pytest.fixture(params=["complet", "sans marque"])
+def indexed(request, monkeypatch):
+    keeper = connect_offline(URI)
+    detail_columns = {}
+    if request.param == "sans marque":
+        # Export IDOCS sans les colonnes optionnelles marque / typeprofil
+        detail_columns["idocs_user_detail"] = ["id_cree", "nom", "prenom", "iwu_id"]
+    create_tables(keeper, detail_columns)
+    monkeypatch.setattr(user_index, "ensure_index", lambda conn: None)
+    monkeypatch.setattr(database, "pool", ConnectionPool(lambda: connect_offline(URI)))
+    build_user_index(keeper, log=lambda *args: None)
+    yield keeper, request.param
+    database.pool.clear()
+    keeper.close()
+
+
+def comparable(result):
+    return {
+        "SSO": sorted(map(tuple, result["SSO"]), key=str),
+        "IDOCS": sorted(map(tuple, result["IDOCS"]), key=str),
+        "fields": [rows[0]._fields for rows in (result["SSO"], result["IDOCS"]) if rows],
+        "dealers": sorted(set(map(tuple, result["dealers"])), key=str),
+        "duplicates": sorted((sorted(d.items()) for d in result["duplicates"]), key=str),
+    }
+
+
+@pytest.mark.parametrize("id_cree", IDS)
+def test_index_lookup_matches_live_lookup(indexed, id_cree):
+    conn, _ = indexed
+    live = _lookup_live(conn, id_cree, indexed=False)
+    index = _lookup_index(conn, id_cree)
+    if index is None:
+        # Utilisateur absent de l'index : lecture directe, qui ne trouve rien non plus
+        assert not live["SSO"] and not live["IDOCS"] and not live["dealers"]
+    else:
+        assert comparable(index) == comparable(live)
+
+
+@pytest.mark.parametrize("id_cree", IDS)
+def test_lookup_user_same_result_after_invalidation(indexed, id_cree):
+    conn, _ = indexed
+    from_index = comparable(lookup_user(conn, id_cree))
+    invalidate_user_index(conn)
+    assert _lookup_index(conn, id_cree) is None
+    assert comparable(lookup_user(conn, id_cree)) == from_index
+
+
+def test_optional_detail_columns(indexed):
+    conn, variant = indexed
+    fields = lookup_user(conn, "JEAN.DUPONT")["IDOCS"][0]._fields
+    expected = ("id_cree", "nom", "prenom", "iwu_id")
+    assert fields == (expected + ("marque", "typeprofil") if variant == "complet" else expected)
+
+
+def test_invalidate_without_index_tables():
+    keeper = sqlite3.connect(":memory:")
+    invalidate_user_index(OfflineConnection(keeper))
@@ -0,0 +1,61 @@
+"""
+Tests de utils/users.list_users : pagination par curseur et filtre par préfixe
+"""
+
+import sqlite3
+
+import pytest
+
+from utils.snapshot import OfflineConnection
+from utils.users import list_users
+
+SSO = [
+    ("jean.dupont", "Dupont", "Jean"),
+    ("sans.nom", None, "Luc"),
+    ("sans.prenom", "Martin", None),
+    ("paul.martin", "Martin", "Paul"),
+    ("zoe.petit", "Petit", "Zoé"),
+    ("remise.100", "100%_Remise", "Anne"),
+]
+IDOCS = [
+    ("JEAN.DUPONT", "Dupont", "Jean"),
+    ("anonyme", None, None),
+    ("sans.prenom", "Martin", None),
+    ("remise.x", "100xRemise", "Anne"),
+    ("bang", "Eh!Oh", "Léa"),
+]
+
+
+@pytest.fixture
+def conn():
+    db = sqlite3.connect(":memory:")
+    for table, rows in (("sso_user_detail", SSO), ("idocs_user_detail", IDOCS)):
+        db.execute(f"CREATE TABLE {table} (id_cree TEXT, nom TEXT, prenom TEXT)")
+        db.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)", rows)
+    return OfflineConnection(db)
+
+
+def all_pages(conn, prefix="", limit=2):
+    users, cursor = list_users(conn, prefix=prefix, limit=limit)
+    while cursor:
+        page, cursor = list_users(conn, prefix=prefix, cursor=cursor, limit=limit)
+        users += page
+    return [(u["id_cree"], u["nom"], u["prenom"]) for u in users]
+
+
+def sort_key(row):
+    # Ordre (nom, id_cree, prenom), NULL en premier
+    id_cree, nom, prenom = row
+    return [(value is not None, value or "") for value in (nom, id_cree, prenom)]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 100])
+def test_pages_cover_every_user_once(conn, limit):
+    expected = sorted(set(SSO + IDOCS), key=sort_key)
+    assert all_pages(conn, limit=limit) == expected
+
+
+def test_prefix_wildcards_are_literal(conn):
+    assert [row[0] for row in all_pages(conn, prefix="100%_")] == ["remise.100"]
+    assert [row[0] for row in all_pages(conn, prefix="Eh!")] == ["bang"]
+    assert [row[0] for row in all_pages(conn, prefix="Mar")] == ["paul.martin", "sans.prenom"]
@@ -3,13 +3,26 @@ Utilitaires pour DealerView
 """
 
 from .database import get_conn
-from .formatters import format_iwu_column, df_to_html
-from .parsers import parse_multiple_names, normalize_id
+from .formatters import format_iwu_column, df_to_html, iter_table_html
+from .parsers import normalize_id, normalize_ids
+from .names import ConcessionNameIndex, parse_concession_names
+from .cache import snapshot_cache, get_frame, get_sap_nom, get_concession_names, search_users
+from .comparison import get_comparison, compute_dealer_stats
 
 __all__ = [
     'get_conn',
     'format_iwu_column',
     'df_to_html',
-    'parse_multiple_names',
-    'normalize_id'
+    'iter_table_html',
+    'normalize_id',
+    'normalize_ids',
+    'ConcessionNameIndex',
+    'parse_concession_names',
+    'snapshot_cache',
+    'get_frame',
+    'get_sap_nom',
+    'get_concession_names',
+    'search_users',
+    'get_comparison',
+    'compute_dealer_stats'
 ]
@@ -0,0 +1,162 @@
+"""
+Backup CSV des tables MySQL en streaming
+
+Chaque table est lue par un curseur serveur (SSCursor) et écrite bloc par
+bloc : la mémoire utilisée ne dépend pas de la taille de la table. Les
+tables sont sauvegardées en parallèle (une connexion du pool par table) et
+un manifest.json récapitule lignes, taille et empreinte SHA-256 de chaque
+fichier.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pymysql
+
+from .database import get_conn
+from .tables import IMPORTED_TABLES
+
+try:
+    import zstandard
+except ImportError:  # compression zstd optionnelle
+    zstandard = None
+
+# Lignes lues par fetchmany
+BACKUP_CHUNK_ROWS = 10000
+
+# Tables sauvegardées simultanément (une connexion chacune)
+BACKUP_WORKERS = 3
+
+# Extension des fichiers par mode de compression
+COMPRESSIONS = {
+    "none": ".csv",
+    "gzip": ".csv.gz",
+    "zstd": ".csv.zst",
+}
+
+
+def open_output(path, compression):
+    """
+    Ouvre un fichier de sortie binaire, compressé ou non.
+
+    Args:
+        path (str): Chemin du fichier
+        compression (str): "none", "gzip" ou "zstd"
+
+    Returns:
+        Fichier binaire ouvert en écriture
+    """
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Compression zstd indisponible : pip install zstandard")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+def backup_table(conn, table, backup_dir, compression="none", chunk_rows=BACKUP_CHUNK_ROWS):
+    """
+    Sauvegarde une table en CSV (en-tête + lignes, NULL -> vide).
+
+    Args:
+        conn: Connexion DB-API
+        table (str): Nom de la table
+        backup_dir (str): Dossier de destination
+        compression (str): "none", "gzip" ou "zstd"
+        chunk_rows (int): Lignes lues et écrites par bloc
+
+    Returns:
+        dict: table, file, rows, csv_bytes et sha256 (du CSV non compressé), seconds
+    """
+    start = time.perf_counter()
+    filename = f"{table}{COMPRESSIONS[compression]}"
+    digest = hashlib.sha256()
+    buffer = io.StringIO()
+    # Fins de ligne \n comme l'ancien export pandas (to_csv)
+    writer = csv.writer(buffer, lineterminator="\n")
+    rows = 0
+    size = 0
+
+    def flush(out):
+        nonlocal size
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        digest.update(data)
+        size += len(data)
+        out.write(data)
+
+    with open_output(os.path.join(backup_dir, filename), compression) as out, \
+            conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(f"SELECT * FROM {table}")
+        writer.writerow([column[0] for column in cursor.description])
+        while True:
+            chunk = cursor.fetchmany(chunk_rows)
+            if not chunk:
+                break
+            writer.writerows(chunk)
+            rows += len(chunk)
+            flush(out)
+        flush(out)
+
+    return {
+        "table": table,
+        "file": filename,
+        "rows": rows,
+        "csv_bytes": size,
+        "sha256": digest.hexdigest(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def backup_tables(backup_dir, tables=IMPORTED_TABLES, compression="none",
+                  workers=BACKUP_WORKERS, chunk_rows=BACKUP_CHUNK_ROWS, log=print):
+    """
+    Sauvegarde plusieurs tables en parallèle et écrit manifest.json.
+
+    Une erreur sur une table est reportée dans le manifest sans arrêter les autres.
+
+    Args:
+        backup_dir (str): Dossier de destination (créé si besoin)
+        tables (list): Tables à sauvegarder
+        compression (str): "none", "gzip" ou "zstd"
+        workers (int): Tables sauvegardées simultanément
+        chunk_rows (int): Lignes par bloc
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        dict: Contenu du manifest (created_at, compression, tables)
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("Compression zstd indisponible : pip install zstandard")
+
+    def run(table):
+        try:
+            with get_conn() as conn:
+                entry = backup_table(conn, table, backup_dir, compression, chunk_rows)
+            log(f"[OK] {table}: {entry['rows']} lignes sauvegardees ({entry['seconds']}s)")
+        except Exception as e:
+            entry = {"table": table, "error": str(e)}
+            log(f"[ERR] {table}: Erreur - {e}")
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        entries = list(executor.map(run, tables))
+
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "compression": compression,
+        "tables": entries,
+    }
+    with open(os.path.join(backup_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
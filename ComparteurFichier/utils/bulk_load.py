@@ -0,0 +1,134 @@
+"""
+Chargement en masse d'un CSV dans une table MySQL (con_nom par défaut)
+
+Le CSV est chargé dans une table de staging (CREATE TABLE ... LIKE), puis
+échangé avec la table cible par un RENAME TABLE atomique : les lecteurs
+(page d'accueil, cache des noms) voient l'ancien contenu complet jusqu'à
+l'échange, jamais une table à moitié chargée.
+
+Deux méthodes de chargement :
+- "insert" : INSERT multi-lignes ... ON DUPLICATE KEY UPDATE par lots
+- "infile" : LOAD DATA LOCAL INFILE (connexion ouverte avec local_infile=True,
+  option local_infile activée côté serveur)
+"""
+
+import time
+
+import pandas as pd
+
+# Lignes par lot INSERT
+LOAD_BATCH_SIZE = 5000
+
+LOAD_METHODS = ["insert", "infile"]
+
+
+def read_csv_rows(path, columns):
+    """
+    Lit les lignes d'un CSV généré par les scripts (séparateur ;, utf-8-sig).
+
+    Args:
+        path (str): Fichier CSV
+        columns (list): Colonnes à charger
+
+    Returns:
+        list: Tuples dans l'ordre de columns
+    """
+    df = pd.read_csv(path, sep=';', encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    return list(df[columns].itertuples(index=False, name=None))
+
+
+def _line_terminator(path):
+    with open(path, "rb") as f:
+        return "\\r\\n" if b"\r\n" in f.readline() else "\\n"
+
+
+def _insert_batches(cursor, table, columns, rows, batch_size, log):
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{c} = VALUES({c})" for c in columns[1:])
+    row_placeholders = f"({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) "
+            f"VALUES {', '.join([row_placeholders] * len(batch))} "
+            f"ON DUPLICATE KEY UPDATE {updates}",
+            [value for row in batch for value in row]
+        )
+        log(f"  lot {start // batch_size + 1}: {start + len(batch)}/{len(rows)} lignes")
+
+
+def _load_infile(cursor, table, columns, path):
+    cursor.execute(
+        f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+        f"FIELDS TERMINATED BY ';' OPTIONALLY ENCLOSED BY '\"' "
+        f"LINES TERMINATED BY '{_line_terminator(path)}' IGNORE 1 LINES "
+        f"({', '.join(columns)})",
+        [path]
+    )
+
+
+def load_csv(conn, path, table="con_nom", columns=("sap_princ", "sap_nom"),
+             method="insert", batch_size=LOAD_BATCH_SIZE, log=print):
+    """
+    Charge un CSV dans une table de staging puis l'échange avec la table cible.
+
+    En cas d'erreur (ou s'il manque des clés du CSV dans la table chargée),
+    la table cible n'est pas modifiée.
+
+    Args:
+        conn: Connexion DB-API (avec local_infile=True pour method="infile")
+        path (str): Fichier CSV (en-tête, séparateur ;, utf-8-sig)
+        table (str): Table cible
+        columns (tuple): Colonnes chargées (la première est la clé)
+        method (str): "insert" ou "infile"
+        batch_size (int): Lignes par INSERT (method="insert")
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        dict: rows, load_seconds, total_seconds, rows_per_second
+    """
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Méthode inconnue : {method} ({', '.join(LOAD_METHODS)})")
+
+    columns = list(columns)
+    staging = f"{table}_staging"
+    previous = f"{table}_old"
+    started = time.perf_counter()
+    rows = read_csv_rows(path, columns)
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} LIKE {table}")
+        try:
+            load_started = time.perf_counter()
+            if method == "infile":
+                _load_infile(cursor, staging, columns, path)
+            else:
+                _insert_batches(cursor, staging, columns, rows, batch_size, log)
+            conn.commit()
+            load_seconds = time.perf_counter() - load_started
+
+            cursor.execute(f"SELECT COUNT(DISTINCT {columns[0]}) FROM {staging}")
+            loaded_keys = cursor.fetchone()[0]
+            expected_keys = len({row[0] for row in rows})
+            if loaded_keys != expected_keys:
+                raise RuntimeError(
+                    f"{loaded_keys} {columns[0]} chargés pour {expected_keys} dans {path}"
+                )
+
+            # Echange atomique : les lecteurs passent de l'ancienne table à la nouvelle
+            cursor.execute(f"DROP TABLE IF EXISTS {previous}")
+            cursor.execute(f"RENAME TABLE {table} TO {previous}, {staging} TO {table}")
+            cursor.execute(f"DROP TABLE {previous}")
+        except Exception:
+            conn.rollback()
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            raise
+
+    total_seconds = time.perf_counter() - started
+    return {
+        "rows": len(rows),
+        "load_seconds": round(load_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "rows_per_second": round(len(rows) / load_seconds) if load_seconds > 0 else None,
+    }
@@ -0,0 +1,214 @@
+"""
+Cache mémoire partagé des tables de référence (snapshot)
+
+Les tables sso, idocs_user et con_nom ne changent qu'après un import
+(backup_and_clean.py, scripts de génération des noms). Les routes lisent
+donc une copie en mémoire, rechargée après expiration du TTL ou sur
+invalidation explicite (endpoint POST /cache/invalidate).
+"""
+
+import os
+import threading
+import time
+
+from .database import get_conn
+from .names import ConcessionNameIndex
+from .queries import read_query
+from .repository import repository
+from .search import UserSearchIndex
+from .stats import load_dealer_counts
+
+# Durée de vie des entrées en secondes (configurable par variable d'environnement)
+CACHE_TTL = int(os.environ.get("DEALERVIEW_CACHE_TTL", "300"))
+
+# Tables de référence partagées par les routes (clé -> requête de utils/queries.py)
+REFERENCE_QUERIES = {
+    "all_saps": "reference.all_saps",
+}
+
+
+class SnapshotCache:
+    """
+    Cache clé -> valeur thread-safe avec TTL et compteurs hits/misses.
+
+    Chaque clé est associée à un loader (fonction sans argument). Un seul
+    thread recharge une clé expirée ; les autres attendent son résultat.
+    Chaque invalidation incrémente la génération de la clé : une valeur dont
+    le chargement a commencé avant l'invalidation est retournée à l'appelant
+    mais n'est pas mise en cache.
+    """
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._loaders = {}
+        self._entries = {}
+        self._key_locks = {}
+        self._dependents = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def register(self, key, loader, depends_on=()):
+        """
+        Associe un loader à une clé du cache.
+
+        Args:
+            key (str): Clé
+            loader (callable): Fonction sans argument produisant la valeur
+            depends_on (tuple): Clés dont la valeur est dérivée (leur
+                                invalidation invalide aussi cette clé)
+        """
+        with self._lock:
+            self._loaders[key] = loader
+            self._key_locks.setdefault(key, threading.Lock())
+            for parent in depends_on:
+                self._dependents.setdefault(parent, []).append(key)
+
+    def get(self, key):
+        """
+        Retourne la valeur en cache, en la (re)chargeant si absente ou expirée.
+
+        Args:
+            key (str): Clé enregistrée via register()
+
+        Returns:
+            Valeur produite par le loader de la clé
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        with self._key_locks[key]:
+            # Un autre thread a pu recharger la clé pendant l'attente
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                with self._lock:
+                    self.hits += 1
+                return entry[1]
+
+            with self._lock:
+                self.misses += 1
+                generation = self._generations.get(key, 0)
+            value = self._loaders[key]()
+            with self._lock:
+                if self._generations.get(key, 0) == generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def invalidate(self, key=None):
+        """
+        Supprime une entrée (ou toutes si key est None).
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        with self._lock:
+            keys = list(self._loaders) if key is None else [key, *self._dependents.get(key, [])]
+            count = 0
+            for name in keys:
+                self._generations[name] = self._generations.get(name, 0) + 1
+                count += 1 if self._entries.pop(name, None) is not None else 0
+            return count
+
+    def stats(self):
+        """Retourne les compteurs et les clés actuellement chargées."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "ttl": self.ttl,
+                "keys": sorted(self._entries),
+            }
+
+
+def _conn_loader(func):
+    def load():
+        conn = get_conn()
+        try:
+            return func(conn)
+        finally:
+            conn.close()
+    return load
+
+
+def _query_loader(query_name):
+    return _conn_loader(lambda conn: read_query(conn, query_name))
+
+
+# Instance partagée par toute l'application
+snapshot_cache = SnapshotCache()
+
+for _name, _query_name in REFERENCE_QUERIES.items():
+    snapshot_cache.register(_name, _query_loader(_query_name))
+
+# Noms de concessions bruts (pages / et /dealers), lus par la couche d'accès
+snapshot_cache.register("con_nom", repository.get_dealer_names)
+
+# Noms de concessions découpés une fois (voir utils/names.py), construits depuis con_nom
+snapshot_cache.register(
+    "concession_names",
+    lambda: ConcessionNameIndex.build(get_frame("con_nom")),
+    depends_on=("con_nom",)
+)
+
+# Comptes par concession et statistiques globales (voir utils/stats.py)
+snapshot_cache.register("dealer_counts", _conn_loader(load_dealer_counts))
+
+# Index de recherche utilisateurs (voir utils/search.py)
+snapshot_cache.register("user_search_index", _conn_loader(UserSearchIndex.build))
+
+
+def get_frame(name):
+    """
+    Retourne une table de référence depuis le cache.
+
+    Le DataFrame est partagé entre les requêtes : ne pas le modifier en place.
+
+    Args:
+        name (str): "con_nom" ou clé de REFERENCE_QUERIES
+
+    Returns:
+        pd.DataFrame: Table de référence
+    """
+    return snapshot_cache.get(name)
+
+
+def get_sap_nom(sap_princ):
+    """
+    Retourne la chaîne sap_nom brute d'une concession depuis le cache con_nom.
+
+    Args:
+        sap_princ (str): Code SAP principal
+
+    Returns:
+        str | None: sap_nom de la première ligne trouvée, None si absente
+    """
+    return get_concession_names().raw(sap_princ)
+
+
+def get_concession_names():
+    """
+    Retourne l'index des noms de concessions depuis le cache.
+
+    Returns:
+        ConcessionNameIndex: sap_princ -> noms WELCOME / IDOCS déjà découpés
+    """
+    return snapshot_cache.get("concession_names")
+
+
+def search_users(term):
+    """
+    Recherche des utilisateurs dans l'index en cache (voir UserSearchIndex.search).
+
+    Args:
+        term (str): Terme recherché dans nom, prénom ou IWU ID
+
+    Returns:
+        list: Dicts id_cree, nom, prenom, iwu_id, source
+    """
+    return snapshot_cache.get("user_search_index").search(term)
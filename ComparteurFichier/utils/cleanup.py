@@ -0,0 +1,149 @@
+"""
+Nettoyage des \\r dans les colonnes texte des tables importées
+
+Une table est traitée en une seule passe : un UPDATE réécrit toutes ses
+colonnes texte à la fois. Les lignes sont traitées par plages de clé
+primaire (une transaction courte par lot) ; une table sans clé primaire
+numérique est traitée par lots UPDATE ... LIMIT.
+"""
+
+import time
+
+from .tables import TABLE_COLUMNS
+
+# Lignes (plage de clé primaire ou LIMIT) par transaction
+CLEAN_BATCH_SIZE = 5000
+
+_CR_PATTERN = "%\r%"
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+
+def primary_key(conn, table):
+    """
+    Clé primaire numérique mono-colonne d'une table.
+
+    Returns:
+        str | None: Nom de la colonne, None si absente ou composite / non entière
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT k.COLUMN_NAME, c.DATA_TYPE
+            FROM information_schema.KEY_COLUMN_USAGE k
+            JOIN information_schema.COLUMNS c
+              ON c.TABLE_SCHEMA = k.TABLE_SCHEMA AND c.TABLE_NAME = k.TABLE_NAME
+             AND c.COLUMN_NAME = k.COLUMN_NAME
+            WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s
+              AND k.CONSTRAINT_NAME = 'PRIMARY'
+        """, [table])
+        rows = cursor.fetchall()
+    if len(rows) == 1 and rows[0][1].lower() in _INTEGER_TYPES:
+        return rows[0][0]
+    return None
+
+
+def count_dirty(conn, table, columns):
+    """
+    Compte les lignes contenant \\r (mode dry-run), au total et par colonne.
+
+    Returns:
+        dict: {"rows": n, "<colonne>": n, ...}
+    """
+    sums = ", ".join(f"SUM({c} LIKE %s)" for c in columns)
+    where = " OR ".join(f"{c} LIKE %s" for c in columns)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*), {sums} FROM {table} WHERE {where}",
+            [_CR_PATTERN] * (2 * len(columns))
+        )
+        row = cursor.fetchone()
+    return {"rows": int(row[0] or 0), **{c: int(v or 0) for c, v in zip(columns, row[1:])}}
+
+
+def clean_table(conn, table, columns, batch_size=CLEAN_BATCH_SIZE, log=print):
+    """
+    Supprime les \\r de toutes les colonnes d'une table, par lots commités.
+
+    Args:
+        conn: Connexion DB-API
+        table (str): Nom de la table
+        columns (list): Colonnes texte à nettoyer
+        batch_size (int): Plage de clé primaire (ou LIMIT) par transaction
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        int: Nombre de lignes modifiées
+    """
+    assignments = ", ".join(f"{c} = REPLACE({c}, '\r', '')" for c in columns)
+    dirty = " OR ".join(f"{c} LIKE %s" for c in columns)
+    params = [_CR_PATTERN] * len(columns)
+    pk = primary_key(conn, table)
+    total = 0
+    batch = 0
+
+    with conn.cursor() as cursor:
+        if pk is not None:
+            cursor.execute(f"SELECT MIN({pk}), MAX({pk}) FROM {table}")
+            low, high = cursor.fetchone()
+            ranges = range(low, high + 1, batch_size) if low is not None else []
+            for start in ranges:
+                batch += 1
+                started = time.perf_counter()
+                cursor.execute(
+                    f"UPDATE {table} SET {assignments} "
+                    f"WHERE {pk} >= %s AND {pk} < %s AND ({dirty})",
+                    [start, start + batch_size] + params
+                )
+                conn.commit()
+                total += cursor.rowcount
+                log(f"  {table} lot {batch} ({pk} {start}-{start + batch_size - 1}): "
+                    f"{cursor.rowcount} lignes ({time.perf_counter() - started:.2f}s)")
+        else:
+            # Sans clé primaire : les lignes nettoyées ne correspondent plus au filtre
+            while True:
+                batch += 1
+                started = time.perf_counter()
+                cursor.execute(
+                    f"UPDATE {table} SET {assignments} WHERE {dirty} LIMIT %s",
+                    params + [batch_size]
+                )
+                conn.commit()
+                total += cursor.rowcount
+                log(f"  {table} lot {batch}: {cursor.rowcount} lignes "
+                    f"({time.perf_counter() - started:.2f}s)")
+                if cursor.rowcount < batch_size:
+                    break
+    return total
+
+
+def clean_tables(conn, tables=TABLE_COLUMNS, batch_size=CLEAN_BATCH_SIZE, dry_run=False, log=print):
+    """
+    Nettoie (ou compte, en dry-run) les \\r de plusieurs tables.
+
+    Args:
+        conn: Connexion DB-API
+        tables (dict): Table -> colonnes texte
+        batch_size (int): Lignes par transaction
+        dry_run (bool): Compter les lignes concernées sans rien modifier
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        dict: Table -> lignes modifiées (ou à modifier en dry-run)
+    """
+    results = {}
+    for table, columns in tables.items():
+        started = time.perf_counter()
+        try:
+            if dry_run:
+                counts = count_dirty(conn, table, columns)
+                results[table] = counts["rows"]
+                detail = ", ".join(f"{c}: {counts[c]}" for c in columns if counts[c])
+                log(f"[DRY-RUN] {table}: {counts['rows']} lignes a nettoyer"
+                    + (f" ({detail})" if detail else ""))
+            else:
+                results[table] = clean_table(conn, table, columns, batch_size, log)
+                log(f"[OK] {table}: {results[table]} lignes nettoyees "
+                    f"({time.perf_counter() - started:.2f}s)")
+        except Exception as e:
+            conn.rollback()
+            log(f"[ERR] {table}: Erreur - {e}")
+    return results
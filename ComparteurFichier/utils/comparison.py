@@ -0,0 +1,396 @@
+"""
+Comparaison WELCOME / IDOCS des utilisateurs d'une concession
+
+Le calcul (agrégation des IWU_ID, normalisation des identifiants, statut
+"both") est matérialisé dans la table user_comparison par le script
+scripts/build_comparison.py et par backup_and_clean.py après chaque import.
+Les routes /dealers et /compare lisent cette table par sap_princ ; elles
+recalculent en direct seulement si elle est absente ou ne contient pas la
+concession.
+
+compare_dealers calcule la comparaison et les statistiques de plusieurs
+concessions en une requête par source (API /api/compare, scripts/batch_compare.py).
+"""
+
+from functools import partial
+
+import pandas as pd
+
+from .parallel import fetch_parallel
+from .parsers import normalize_ids
+from .queries import read_query
+from .repository import repository
+from .tables import SOURCE_TABLES
+
+# Nombre de concessions traitées par transaction lors d'un rafraîchissement
+REFRESH_BATCH = 200
+
+STORE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS user_comparison (
+        sap_princ VARCHAR(50) NOT NULL,
+        source VARCHAR(10) NOT NULL,
+        position INT NOT NULL,
+        id_cree VARCHAR(255),
+        nom VARCHAR(255),
+        prenom VARCHAR(255),
+        iwu_id TEXT,
+        id_norm VARCHAR(255),
+        status VARCHAR(10),
+        PRIMARY KEY (sap_princ, source, position)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_comparison_state (
+        sap_princ VARCHAR(50) NOT NULL,
+        source VARCHAR(10) NOT NULL,
+        nb_rows INT NOT NULL,
+        checksum BIGINT NOT NULL,
+        refreshed_at DATETIME NOT NULL,
+        PRIMARY KEY (sap_princ, source)
+    )
+    """,
+]
+
+STORE_COLUMNS = ["sap_princ", "source", "position", "id_cree", "nom", "prenom", "iwu_id", "id_norm", "status"]
+
+# Colonnes des statistiques par concession (compute_dealer_stats / compute_batch_stats)
+BATCH_STATS_COLUMNS = ["total_sso", "total_idocs", "only_sso", "only_idocs", "in_both", "sso_no_iwu", "idocs_no_iwu"]
+
+# Nombre maximum de concessions par appel à l'API batch
+BATCH_MAX_SAPS = 2000
+
+
+# ============================
+# CALCUL
+# ============================
+def fetch_users(conn, source, sap_list):
+    """
+    Charge les utilisateurs (avec leurs IWU_ID) de plusieurs concessions.
+
+    Lecture get_users de la couche d'accès (utils/repository.py), sur la
+    connexion de l'appelant.
+
+    Args:
+        conn: Connexion DB-API
+        source (str): "SSO" ou "IDOCS"
+        sap_list (list): Codes sap_princ
+
+    Returns:
+        pd.DataFrame: Colonnes id_cree, nom, prenom, sap_princ, iwu_id
+    """
+    return repository.get_users(source, list(sap_list), conn=conn)
+
+
+def aggregate_iwu(df):
+    """
+    Regroupe les IWU_ID par utilisateur et par concession ("id1;id2" ou "NONE").
+
+    Args:
+        df (pd.DataFrame): Colonnes sap_princ, id_cree, nom, prenom, iwu_id
+
+    Returns:
+        pd.DataFrame: Une ligne par (sap_princ, id_cree, nom, prenom)
+    """
+    return df.groupby(
+        ["sap_princ", "id_cree", "nom", "prenom"],
+        dropna=False
+    )["iwu_id"].apply(
+        lambda x: ";".join(sorted({str(v) for v in x if pd.notna(v) and v and v != "NONE"})) or "NONE"
+    ).reset_index()
+
+
+def compare_users(df_sso, df_idocs):
+    """
+    Agrège les IWU_ID et calcule le statut "both" par concession.
+
+    Un utilisateur est "both" si son identifiant normalisé existe dans l'autre
+    source pour la même concession.
+
+    Args:
+        df_sso (pd.DataFrame): Résultat de fetch_users("SSO", ...)
+        df_idocs (pd.DataFrame): Résultat de fetch_users("IDOCS", ...)
+
+    Returns:
+        tuple: (df_sso, df_idocs) avec les colonnes id_norm et status
+    """
+    df_sso = aggregate_iwu(df_sso)
+    df_idocs = aggregate_iwu(df_idocs)
+
+    df_sso["id_norm"] = normalize_ids(df_sso["id_cree"])
+    df_idocs["id_norm"] = normalize_ids(df_idocs["id_cree"])
+
+    sso_keys = pd.MultiIndex.from_frame(df_sso[["sap_princ", "id_norm"]])
+    idocs_keys = pd.MultiIndex.from_frame(df_idocs[["sap_princ", "id_norm"]])
+
+    df_sso["status"] = ["both" if x else "" for x in sso_keys.isin(idocs_keys)]
+    df_idocs["status"] = ["both" if x else "" for x in idocs_keys.isin(sso_keys)]
+
+    return df_sso, df_idocs
+
+
+def compute_dealer_stats(df_sso, df_idocs):
+    """
+    Statistiques de croisement d'une concession.
+
+    Args:
+        df_sso (pd.DataFrame): Utilisateurs SSO comparés (id_norm, iwu_id)
+        df_idocs (pd.DataFrame): Utilisateurs IDOCS comparés (id_norm, iwu_id)
+
+    Returns:
+        dict: total_sso, total_idocs, only_sso, only_idocs, in_both, sso_no_iwu, idocs_no_iwu
+    """
+    all_sso_ids = set(df_sso["id_norm"])
+    all_idocs_ids = set(df_idocs["id_norm"])
+
+    return {
+        "total_sso": len(all_sso_ids),
+        "total_idocs": len(all_idocs_ids),
+        "only_sso": len(all_sso_ids - all_idocs_ids),
+        "only_idocs": len(all_idocs_ids - all_sso_ids),
+        "in_both": len(all_sso_ids & all_idocs_ids),
+        "sso_no_iwu": df_sso[df_sso["iwu_id"] == "NONE"]["id_norm"].nunique(),
+        "idocs_no_iwu": df_idocs[df_idocs["iwu_id"] == "NONE"]["id_norm"].nunique()
+    }
+
+
+def compute_comparison(conn, sap_list):
+    """Calcule la comparaison en direct depuis les tables sources (lectures SSO et IDOCS en parallèle)."""
+    df_sso, df_idocs = fetch_parallel(
+        conn,
+        partial(fetch_users, source="SSO", sap_list=sap_list),
+        partial(fetch_users, source="IDOCS", sap_list=sap_list)
+    )
+    return compare_users(df_sso, df_idocs)
+
+
+def compute_batch_stats(df_sso, df_idocs, sap_list):
+    """
+    Statistiques de croisement de plusieurs concessions en un seul passage.
+
+    Mêmes valeurs que compute_dealer_stats appliqué à chaque concession.
+
+    Args:
+        df_sso (pd.DataFrame): Utilisateurs SSO comparés (sap_princ, id_norm, iwu_id)
+        df_idocs (pd.DataFrame): Utilisateurs IDOCS comparés (sap_princ, id_norm, iwu_id)
+        sap_list (list): Concessions à retourner (0 partout si aucun utilisateur)
+
+    Returns:
+        pd.DataFrame: Une ligne par sap_princ, colonnes de compute_dealer_stats
+    """
+    keys = ["sap_princ", "id_norm"]
+    sso_ids = df_sso[keys].drop_duplicates()
+    idocs_ids = df_idocs[keys].drop_duplicates()
+    both_ids = sso_ids.merge(idocs_ids, on=keys)
+
+    def count(df):
+        return df.groupby("sap_princ").size()
+
+    stats = pd.DataFrame({
+        "total_sso": count(sso_ids),
+        "total_idocs": count(idocs_ids),
+        "in_both": count(both_ids),
+        "sso_no_iwu": count(df_sso.loc[df_sso["iwu_id"] == "NONE", keys].drop_duplicates()),
+        "idocs_no_iwu": count(df_idocs.loc[df_idocs["iwu_id"] == "NONE", keys].drop_duplicates()),
+    }).reindex(list(sap_list)).fillna(0).astype(int)
+
+    stats["only_sso"] = stats["total_sso"] - stats["in_both"]
+    stats["only_idocs"] = stats["total_idocs"] - stats["in_both"]
+    stats.index.name = "sap_princ"
+    return stats[BATCH_STATS_COLUMNS].reset_index()
+
+
+def compare_dealers(conn, sap_list):
+    """
+    Comparaison de plusieurs concessions : une requête IN (...) par source.
+
+    Args:
+        conn: Connexion DB-API
+        sap_list (list): Codes sap_princ (doublons ignorés)
+
+    Returns:
+        tuple: (stats, df_sso, df_idocs) ; stats selon compute_batch_stats
+    """
+    sap_list = list(dict.fromkeys(sap_list))
+    df_sso, df_idocs = compute_comparison(conn, sap_list)
+    return compute_batch_stats(df_sso, df_idocs, sap_list), df_sso, df_idocs
+
+
+def batch_user_rows(df_sso, df_idocs):
+    """Détail utilisateurs d'une comparaison batch, les deux sources empilées."""
+    columns = ["sap_princ", "source", "id_cree", "nom", "prenom", "iwu_id", "status"]
+    df = pd.concat([df_sso.assign(source="SSO"), df_idocs.assign(source="IDOCS")], ignore_index=True)
+    return df[columns].sort_values(["sap_princ", "source"], kind="stable", ignore_index=True)
+
+
+def parse_sap_list(values):
+    """
+    Liste de codes SAP depuis des valeurs séparées par virgules, espaces ou retours à la ligne.
+
+    Args:
+        values (list): Chaînes brutes (paramètres d'URL, lignes de fichier, ...)
+
+    Returns:
+        list: Codes sap_princ uniques dans l'ordre d'apparition
+    """
+    codes = []
+    for value in values:
+        codes.extend(str(value).replace(",", " ").split())
+    return list(dict.fromkeys(codes))
+
+
+# ============================
+# LECTURE (routes)
+# ============================
+def get_comparison(conn, sap_princ):
+    """
+    Retourne la comparaison d'une concession, depuis la table matérialisée
+    (lecture par clé primaire), sinon calculée en direct.
+
+    La table est tenue à jour par refresh_store (backup_and_clean.py après
+    chaque import, scripts/build_comparison.py) : aucune empreinte des
+    tables sources n'est recalculée à la lecture.
+
+    Args:
+        conn: Connexion DB-API
+        sap_princ (str): Code SAP principal
+
+    Returns:
+        tuple: (df_sso, df_idocs) avec id_cree, nom, prenom, iwu_id, id_norm, status
+    """
+    try:
+        df = read_query(conn, "comparison.stored", [sap_princ])
+    except pd.errors.DatabaseError:
+        # scripts/build_comparison.py n'a jamais été lancé
+        conn.rollback()
+        df = None
+
+    if df is not None and len(df) > 0:
+        columns = ["id_cree", "nom", "prenom", "iwu_id", "id_norm", "status"]
+        df_sso = df.loc[df["source"] == "SSO", columns].reset_index(drop=True)
+        df_idocs = df.loc[df["source"] == "IDOCS", columns].reset_index(drop=True)
+        return df_sso, df_idocs
+
+    # Table absente ou concession non matérialisée (aucun utilisateur au dernier rafraîchissement)
+    df_sso, df_idocs = compute_comparison(conn, [sap_princ])
+    return df_sso.drop(columns="sap_princ"), df_idocs.drop(columns="sap_princ")
+
+
+# ============================
+# MATERIALISATION (batch)
+# ============================
+def ensure_store(conn):
+    """Crée les tables user_comparison et user_comparison_state si besoin."""
+    with conn.cursor() as cursor:
+        for ddl in STORE_SCHEMA:
+            cursor.execute(ddl)
+    conn.commit()
+
+
+def source_checksums(conn):
+    """
+    Empreinte (nombre de lignes + somme CRC32) des utilisateurs par concession et source.
+
+    Returns:
+        pd.DataFrame: Colonnes sap_princ, source, nb_rows, checksum
+    """
+    frames = []
+    for source, (user_table, detail_table) in SOURCE_TABLES.items():
+        df = read_query(conn, "comparison.checksums", user_table=user_table, detail_table=detail_table)
+        df["source"] = source
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df["nb_rows"] = df["nb_rows"].astype("int64")
+    df["checksum"] = df["checksum"].astype("int64")
+    return df[["sap_princ", "source", "nb_rows", "checksum"]]
+
+
+def changed_saps(conn, current):
+    """
+    Concessions dont l'empreinte a changé depuis le dernier rafraîchissement
+    (y compris les concessions apparues ou disparues).
+
+    Args:
+        conn: Connexion DB-API
+        current (pd.DataFrame): Résultat de source_checksums()
+
+    Returns:
+        list: Codes sap_princ à recalculer
+    """
+    previous = pd.read_sql(
+        "SELECT sap_princ, source, nb_rows, checksum FROM user_comparison_state", conn
+    )
+    merged = current.merge(
+        previous, on=["sap_princ", "source"], how="outer",
+        suffixes=("", "_prev"), indicator=True
+    )
+    changed = (
+        (merged["_merge"] != "both")
+        | (merged["nb_rows"] != merged["nb_rows_prev"])
+        | (merged["checksum"] != merged["checksum_prev"])
+    )
+    return sorted(merged.loc[changed, "sap_princ"].unique().tolist())
+
+
+def refresh_store(conn, full=False, batch_size=REFRESH_BATCH, log=print):
+    """
+    Met à jour la table matérialisée.
+
+    En mode incrémental, seules les concessions dont l'empreinte source a
+    changé sont recalculées (suppression puis réinsertion de leurs lignes).
+
+    Args:
+        conn: Connexion DB-API
+        full (bool): Recalculer toutes les concessions
+        batch_size (int): Concessions par transaction
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        int: Nombre de concessions recalculées
+    """
+    ensure_store(conn)
+    current = source_checksums(conn)
+
+    if full:
+        saps = sorted(current["sap_princ"].unique().tolist())
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM user_comparison")
+            cursor.execute("DELETE FROM user_comparison_state")
+        conn.commit()
+    else:
+        saps = changed_saps(conn, current)
+
+    log(f"{len(saps)} concession(s) à recalculer")
+
+    for start in range(0, len(saps), batch_size):
+        batch = saps[start:start + batch_size]
+        df_sso, df_idocs = compute_comparison(conn, batch)
+        rows = _store_rows(df_sso, "SSO") + _store_rows(df_idocs, "IDOCS")
+        state = current[current["sap_princ"].isin(batch)]
+
+        placeholders = ','.join(['%s'] * len(batch))
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM user_comparison WHERE sap_princ IN ({placeholders})", batch)
+            cursor.execute(f"DELETE FROM user_comparison_state WHERE sap_princ IN ({placeholders})", batch)
+            if rows:
+                cursor.executemany(
+                    f"INSERT INTO user_comparison ({', '.join(STORE_COLUMNS)}) "
+                    f"VALUES ({', '.join(['%s'] * len(STORE_COLUMNS))})",
+                    rows
+                )
+            if len(state) > 0:
+                cursor.executemany(
+                    "INSERT INTO user_comparison_state (sap_princ, source, nb_rows, checksum, refreshed_at) "
+                    "VALUES (%s, %s, %s, %s, NOW())",
+                    [(r.sap_princ, r.source, int(r.nb_rows), int(r.checksum)) for r in state.itertuples()]
+                )
+        conn.commit()
+        log(f"  {min(start + batch_size, len(saps))}/{len(saps)} concessions, {len(rows)} lignes")
+
+    return len(saps)
+
+
+def _store_rows(df, source):
+    df = df.assign(source=source, position=df.groupby("sap_princ").cumcount())
+    df = df[STORE_COLUMNS].astype(object).where(df[STORE_COLUMNS].notna(), None)
+    return [tuple(row) for row in df.itertuples(index=False)]
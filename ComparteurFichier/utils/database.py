@@ -1,7 +1,16 @@
 """
 Gestion de la connexion à la base de données MySQL
+
+Les connexions sont réutilisées via un pool borné : get_conn() emprunte une
+connexion (vérifiée par ping) et close() la rend au pool au lieu de fermer
+la socket. L'API reste la même pour les routes.
 """
 
+import collections
+import os
+import threading
+import time
+
 import pymysql
 
 # Configuration de la base de données
@@ -11,19 +20,263 @@ DB_NAME = "preanalyse-dv"
 DB_USER = "preanalyse-dv"
 DB_PASS = "TuMnWosbYJvRGVWbb5graFfi"
 
+# Configuration du pool
+POOL_MAX_SIZE = 10        # Connexions ouvertes au maximum
+POOL_MAX_IDLE = 300       # Secondes avant fermeture d'une connexion inutilisée
+POOL_TIMEOUT = 10         # Secondes d'attente max quand le pool est plein
 
-def get_conn():
+# Mode hors ligne : dossier d'un snapshot Arrow (voir utils/snapshot.py)
+SNAPSHOT_DIR = os.environ.get("DEALERVIEW_SNAPSHOT")
+
+
+class PoolExhaustedError(Exception):
+    """Aucune connexion disponible dans le délai imparti."""
+
+
+def open_connection(**options):
     """
-    Crée et retourne une connexion à la base de données MySQL.
-    
+    Ouvre une connexion directe, hors pool.
+
+    Args:
+        **options: Options pymysql supplémentaires (ex: local_infile=True)
+
     Returns:
-        pymysql.Connection: Connexion à la base de données
+        pymysql.Connection: Connexion à fermer par l'appelant
     """
     return pymysql.connect(
         host=DB_HOST,
         port=DB_PORT,
         database=DB_NAME,
         user=DB_USER,
-        password=DB_PASS
+        password=DB_PASS,
+        **options
     )
 
+
+class PooledConnection:
+    """
+    Connexion empruntée au pool.
+
+    Délègue tout à la connexion DB-API sous-jacente ; close() (ou la sortie
+    du bloc with) rend la connexion au pool.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError("Connexion déjà rendue au pool")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Filet de sécurité si une route oublie close() (exception en cours de route)
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool de connexions DB-API borné et thread-safe.
+
+    - ping à l'emprunt : une connexion coupée est remplacée
+    - éviction des connexions inactives depuis plus de max_idle secondes
+    - compteurs exposés par stats() (créations, attentes, timeouts...)
+
+    Args:
+        connect (callable): Fabrique de connexions (pymysql.connect ou un faux driver)
+        max_size (int): Nombre maximum de connexions ouvertes
+        max_idle (float): Durée d'inactivité avant fermeture (secondes)
+        timeout (float): Attente maximum quand toutes les connexions sont prises
+    """
+
+    def __init__(self, connect, max_size=POOL_MAX_SIZE, max_idle=POOL_MAX_IDLE, timeout=POOL_TIMEOUT):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = collections.deque()  # (connexion, instant de retour au pool)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._metrics = collections.Counter()
+
+    def acquire(self, wait=True):
+        """
+        Emprunte une connexion.
+
+        Args:
+            wait (bool): Attendre qu'une connexion se libère (jusqu'à timeout).
+                Avec False, retourne None immédiatement si le pool est plein.
+
+        Returns:
+            PooledConnection | None: Connexion à rendre avec close()
+
+        Raises:
+            PoolExhaustedError: Si aucune connexion ne se libère avant timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            waited = False
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    raw, _ = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    raw = None
+                    break
+                if not wait:
+                    self._metrics["busy"] += 1
+                    return None
+                if not waited:
+                    self._metrics["exhausted"] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    self._metrics["timeouts"] += 1
+                    raise PoolExhaustedError(
+                        f"Pool MySQL saturé ({self.max_size} connexions) après {self.timeout}s"
+                    )
+            self._metrics["borrowed"] += 1
+
+        if raw is not None and not self._is_alive(raw):
+            self._metrics["broken"] += 1
+            self._close_quietly(raw)
+            raw = None
+
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self._metrics["created"] += 1
+        else:
+            self._metrics["reused"] += 1
+
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """Rend une connexion au pool (transaction en cours annulée)."""
+        try:
+            # Termine la transaction implicite pour ne pas garder un snapshot figé
+            raw.rollback()
+        except Exception:
+            self._metrics["broken"] += 1
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def clear(self):
+        """Ferme toutes les connexions inactives."""
+        with self._cond:
+            while self._idle:
+                raw, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(raw)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Retourne l'état du pool et ses compteurs."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                **{key: self._metrics[key] for key in
+                   ("borrowed", "created", "reused", "broken", "evicted", "busy", "exhausted", "timeouts")},
+            }
+
+    def _evict_idle(self):
+        # Les plus anciennes sont à gauche (on réemprunte à droite)
+        limit = time.monotonic() - self.max_idle
+        while self._idle and self._idle[0][1] < limit:
+            raw, _ = self._idle.popleft()
+            self._size -= 1
+            self._metrics["evicted"] += 1
+            self._close_quietly(raw)
+
+    def _discard(self, raw):
+        self._close_quietly(raw)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_alive(raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+# Pool partagé par toute l'application
+if SNAPSHOT_DIR:
+    from .snapshot import offline_connector
+    pool = ConnectionPool(offline_connector(SNAPSHOT_DIR))
+else:
+    pool = ConnectionPool(open_connection)
+
+
+def get_conn():
+    """
+    Emprunte une connexion MySQL au pool partagé.
+
+    Utilisable directement (conn.close() rend la connexion) ou en
+    context manager : ``with get_conn() as conn: ...``
+
+    Returns:
+        PooledConnection: Connexion à la base de données
+    """
+    return pool.acquire()
+
+
+def iter_chunks(conn, sql, params=None, chunk_rows=10000):
+    """
+    Lit le résultat d'une requête par blocs, sans le charger entièrement.
+
+    Curseur non bufferisé (SSCursor) : les lignes arrivent du serveur au fur
+    et à mesure des fetchmany. La connexion ne peut pas exécuter d'autre
+    requête tant que le résultat n'est pas entièrement lu.
+
+    Args:
+        conn: Connexion (PooledConnection ou pymysql)
+        sql (str): Requête SELECT
+        params (list): Paramètres de la requête
+        chunk_rows (int): Nombre de lignes par bloc
+
+    Yields:
+        list: Tuples des lignes du bloc
+    """
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
@@ -0,0 +1,275 @@
+"""
+Rapport global des IWU_ID partagés par plusieurs identités
+
+Une identité est un id_cree normalisé (normalize_id) : "Jean.Dupont" en SSO
+et "JEAN.DUPONT" en IDOCS ne sont pas des doublons.
+
+Le calcul ne garde jamais tous les IWU_ID en mémoire : une passe SQL ne
+retient que les IWU rattachés à plus d'un id_cree (GROUP BY ... HAVING),
+puis leurs lignes sont lues triées par iwu_id, par blocs (voir
+database.iter_chunks), et chaque groupe est émis dès que l'iwu_id change.
+La mémoire dépend de la taille du plus gros groupe, pas du nombre de lignes
+ni du nombre d'IWU_ID.
+
+Le rapport est matérialisé dans la table iwu_duplicates par
+backup_and_clean.py après chaque import et par
+scripts/duplicate_iwu_report.py --store : /duplicates et /duplicates.csv
+lisent cette table, sans calcul pendant la requête.
+"""
+
+import csv
+import io
+from itertools import groupby
+
+import pandas as pd
+
+from . import database
+from .database import iter_chunks
+from .parsers import normalize_ids
+from .queries import fetch_records, query_sql
+
+# Lignes lues par bloc
+DUPLICATE_CHUNK_ROWS = 10000
+
+# Identités écrites par INSERT lors de la construction
+DUPLICATE_INSERT_BATCH = 5000
+
+# Groupes d'IWU affichés par page sur /duplicates
+DUPLICATES_PAGE_SIZE = 50
+
+DUPLICATE_CSV_COLUMNS = ["iwu_id", "nb_identites", "id_norm", "id_cree", "nom", "prenom", "source"]
+
+REPORT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS iwu_duplicates (
+        group_no INT NOT NULL,
+        position INT NOT NULL,
+        iwu_id VARCHAR(255),
+        nb_identites INT,
+        id_norm VARCHAR(255),
+        id_cree VARCHAR(255),
+        nom VARCHAR(255),
+        prenom VARCHAR(255),
+        source VARCHAR(20),
+        PRIMARY KEY (group_no, position)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS iwu_duplicates_state (
+        id TINYINT NOT NULL PRIMARY KEY,
+        nb_groups INT NOT NULL,
+        built_at DATETIME NOT NULL
+    )
+    """,
+]
+
+REPORT_COLUMNS = ["group_no", "position", "iwu_id", "nb_identites", "id_norm", "id_cree", "nom", "prenom", "source"]
+
+
+def _add_source(sources, source):
+    return sources if source in sources.split(" + ") else f"{sources} + {source}"
+
+
+def _iter_rows(conn, chunk_rows, log):
+    # Lignes (iwu_id, id_cree, nom, prenom, source, id_norm) triées par iwu_id
+    read = 0
+    for rows in iter_chunks(conn, query_sql("duplicates.iwu_rows"), chunk_rows=chunk_rows):
+        id_norms = normalize_ids(pd.Series([row[1] for row in rows], dtype=object))
+        for row, id_norm in zip(rows, id_norms):
+            yield row + (id_norm,)
+        read += len(rows)
+        if log:
+            log(f"  {read} lignes lues")
+
+
+def iter_duplicate_iwu(conn, chunk_rows=DUPLICATE_CHUNK_ROWS, log=None):
+    """
+    Détecte les IWU_ID rattachés à plus d'une identité normalisée.
+
+    La connexion est occupée (curseur non bufferisé) jusqu'à la fin de
+    l'itération.
+
+    Args:
+        conn: Connexion DB-API
+        chunk_rows (int): Lignes lues par bloc
+        log (callable): Fonction d'affichage de la progression (optionnelle)
+
+    Yields:
+        dict: Groupe {iwu_id, nb_identites, identites}, par iwu_id croissant,
+              identites étant une liste de dicts id_norm, id_cree, nom, prenom, source
+    """
+    for iwu_id, rows in groupby(_iter_rows(conn, chunk_rows, log), key=lambda row: row[0]):
+        identities = {}
+        for _, id_cree, nom, prenom, source, id_norm in rows:
+            identity = identities.get(id_norm)
+            if identity is None:
+                identities[id_norm] = {
+                    "id_norm": id_norm, "id_cree": id_cree, "nom": nom, "prenom": prenom, "source": source
+                }
+            else:
+                identity["source"] = _add_source(identity["source"], source)
+        if len(identities) > 1:
+            yield {
+                "iwu_id": iwu_id,
+                "nb_identites": len(identities),
+                "identites": [identities[id_norm] for id_norm in sorted(identities)],
+            }
+
+
+# ============================
+# RAPPORT MATERIALISE (iwu_duplicates)
+# ============================
+def ensure_report(conn):
+    """Crée les tables iwu_duplicates et iwu_duplicates_state si besoin."""
+    with conn.cursor() as cursor:
+        for ddl in REPORT_SCHEMA:
+            cursor.execute(ddl)
+    conn.commit()
+
+
+def build_duplicate_report(conn, chunk_rows=DUPLICATE_CHUNK_ROWS, batch_size=DUPLICATE_INSERT_BATCH, log=print):
+    """
+    Reconstruit la table iwu_duplicates, en une transaction (les lecteurs
+    voient l'ancien rapport jusqu'au commit).
+
+    Les tables sources sont lues sur une seconde connexion du pool pendant
+    que conn écrit le rapport, par lots de batch_size identités.
+
+    Args:
+        conn: Connexion DB-API (écriture)
+        chunk_rows (int): Lignes lues par bloc
+        batch_size (int): Identités par INSERT
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        int: Nombre d'IWU_ID en doublon
+    """
+    ensure_report(conn)
+    sql = (
+        f"INSERT INTO iwu_duplicates ({', '.join(REPORT_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(REPORT_COLUMNS))})"
+    )
+
+    group_no = 0
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM iwu_duplicates")
+        cursor.execute("DELETE FROM iwu_duplicates_state")
+        batch = []
+        with database.get_conn() as reader:
+            for group in iter_duplicate_iwu(reader, chunk_rows=chunk_rows, log=log):
+                group_no += 1
+                for position, identity in enumerate(group["identites"]):
+                    batch.append((
+                        group_no, position, group["iwu_id"], group["nb_identites"], identity["id_norm"],
+                        identity["id_cree"], identity["nom"], identity["prenom"], identity["source"]
+                    ))
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+        cursor.execute(
+            "INSERT INTO iwu_duplicates_state (id, nb_groups, built_at) VALUES (1, %s, NOW())", [group_no]
+        )
+    conn.commit()
+    return group_no
+
+
+def duplicate_report_state(conn):
+    """
+    Etat du rapport matérialisé.
+
+    Args:
+        conn: Connexion DB-API
+
+    Returns:
+        Record | None: nb_groups et built_at, None si le rapport n'a jamais été construit
+    """
+    try:
+        rows = fetch_records(conn, "duplicates.state")
+    except pd.errors.DatabaseError:
+        # Tables non créées : build_duplicate_report n'a jamais été lancé
+        conn.rollback()
+        return None
+    return rows[0] if rows else None
+
+
+def _groups(rows):
+    # Enregistrements triés par group_no, position -> groupes du rapport
+    for _, identities in groupby(rows, key=lambda row: row.group_no):
+        identities = list(identities)
+        yield {
+            "iwu_id": identities[0].iwu_id,
+            "nb_identites": identities[0].nb_identites,
+            "identites": [
+                {"id_norm": row.id_norm, "id_cree": row.id_cree, "nom": row.nom,
+                 "prenom": row.prenom, "source": row.source}
+                for row in identities
+            ],
+        }
+
+
+def read_duplicate_page(conn, page, page_size=DUPLICATES_PAGE_SIZE):
+    """
+    Groupes d'une page du rapport matérialisé.
+
+    Args:
+        conn: Connexion DB-API
+        page (int): Numéro de page (à partir de 1)
+        page_size (int): Groupes par page
+
+    Returns:
+        list: Groupes {iwu_id, nb_identites, identites}, par iwu_id croissant
+    """
+    start = (page - 1) * page_size
+    return list(_groups(fetch_records(conn, "duplicates.page", [start, start + page_size])))
+
+
+def iter_stored_groups(conn, batch_groups=DUPLICATES_PAGE_SIZE * 20):
+    """
+    Tous les groupes du rapport matérialisé, lus par lots de groupes.
+
+    Args:
+        conn: Connexion DB-API
+        batch_groups (int): Groupes lus par requête
+
+    Yields:
+        dict: Groupe {iwu_id, nb_identites, identites}, par iwu_id croissant
+    """
+    start = 0
+    while True:
+        rows = fetch_records(conn, "duplicates.page", [start, start + batch_groups])
+        if not rows:
+            return
+        yield from _groups(rows)
+        start += batch_groups
+
+
+def iter_duplicate_csv(duplicates):
+    """
+    Export CSV du rapport (une ligne par identité), produit ligne par ligne.
+
+    Args:
+        duplicates (iterable): Groupes (iter_duplicate_iwu ou iter_stored_groups)
+
+    Yields:
+        str: En-tête puis lignes CSV
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(DUPLICATE_CSV_COLUMNS)
+    yield flush()
+    for group in duplicates:
+        for identity in group["identites"]:
+            writer.writerow([
+                group["iwu_id"], group["nb_identites"], identity["id_norm"],
+                identity["id_cree"], identity["nom"], identity["prenom"], identity["source"]
+            ])
+        yield flush()
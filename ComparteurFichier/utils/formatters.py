@@ -42,6 +42,77 @@ def format_iwu_column(iwu_str):
         return badge_html.strip()
 
 
+# Nombre de lignes <tr> regroupées par morceau lors du rendu en flux
+HTML_CHUNK_ROWS = 500
+
+
+def iter_table_html(df, sap=None, return_url=None, chunk_rows=HTML_CHUNK_ROWS):
+    """
+    Génère le tableau HTML d'un DataFrame par morceaux (générateur).
+
+    Travaille directement sur les colonnes (pas de iterrows) et produit
+    exactement le même HTML que df_to_html, découpé en morceaux de
+    chunk_rows lignes pour pouvoir streamer la réponse Flask.
+
+    Args:
+        df (pd.DataFrame): DataFrame contenant les colonnes id_cree, nom, prenom, iwu_id, status
+        sap (str, optional): Code SAP dealer pour les liens
+        return_url (str, optional): URL de retour (utilisé pour /dealers)
+        chunk_rows (int): Nombre de lignes par morceau
+
+    Yields:
+        str: Morceaux successifs du tableau HTML
+    """
+    display_cols = ["Nom Prénom", "iwu_id"]
+    table_class = "table table-bordered" if return_url else "table table-bordered table-striped"
+
+    yield (
+        f"<table class='{table_class}'>"
+        + "<tr>" + "".join(f"<th>{c}</th>" for c in display_cols) + "</tr>"
+    )
+
+    n = len(df)
+    columns = [df["status"], df["id_cree"], df["nom"], df["prenom"], df["iwu_id"]]
+    # Colonnes optionnelles : même valeur par défaut que row.get() auparavant
+    columns.append(df["sap_dealer"] if "sap_dealer" in df.columns else [sap] * n)
+    columns.append(df["dealer_match"] if "dealer_match" in df.columns else [True] * n)
+
+    # Les IWU_ID se répètent peu mais le formatage est pur : mémorisation locale
+    iwu_html = {}
+
+    chunk = []
+    for css, id_cree, nom, prenom, iwu_id, dealer_code, dealer_match in zip(*columns):
+        iwu_val = iwu_html.get(iwu_id)
+        if iwu_val is None:
+            iwu_val = iwu_html[iwu_id] = format_iwu_column(iwu_id)
+        nom_prenom = f"{nom} {prenom}"
+
+        if return_url:  # Context: /dealers
+            onclick = f"openUser('{id_cree}', '{dealer_code}', '{return_url}')"
+            # Ajouter data-nom, data-prenom, data-iwu pour la recherche
+            nom_safe = str(nom).replace("'", "")
+            prenom_safe = str(prenom).replace("'", "")
+            iwu_safe = str(iwu_id).replace("'", "")
+            data_attr = f' data-dealer="{dealer_code}" data-dealer-match="{str(dealer_match).lower()}" data-nom="{nom_safe}" data-prenom="{prenom_safe}" data-iwu="{iwu_safe}"'
+        else:  # Context: /compare
+            onclick = f"openUser('{id_cree}', '{sap}')"
+            data_attr = ""
+
+        chunk.append(
+            f'<tr class="{css}"{data_attr}>'
+            f'<td onclick="{onclick}">{nom_prenom}</td>'
+            f'<td onclick="{onclick}">{iwu_val}</td>'
+            '</tr>'
+        )
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk)
+            chunk = []
+
+    if chunk:
+        yield "".join(chunk)
+    yield "</table>"
+
+
 def df_to_html(df, sap=None, return_url=None):
     """
     Convertit un DataFrame en tableau HTML formaté pour affichage.
@@ -58,38 +129,4 @@ def df_to_html(df, sap=None, return_url=None):
     Returns:
         str: Tableau HTML complet
     """
-    rows = []
-    display_cols = ["Nom Prénom", "iwu_id"]
-
-    header = "<tr>" + "".join(f"<th>{c}</th>" for c in display_cols) + "</tr>"
-    rows.append(header)
-
-    for _, row in df.iterrows():
-        css = row["status"]
-        iwu_val = format_iwu_column(row["iwu_id"])
-        nom_prenom = f"{row['nom']} {row['prenom']}"
-        
-        # Vérifier si les dealers correspondent
-        dealer_match = row.get("dealer_match", True)
-        
-        # Déterminer le dealer code et construire l'onclick
-        if return_url:  # Context: /dealers
-            dealer_code = row.get("sap_dealer", sap)
-            onclick = f"openUser('{row['id_cree']}', '{dealer_code}', '{return_url}')"
-            # Ajouter data-nom, data-prenom, data-iwu pour la recherche
-            nom_safe = str(row['nom']).replace("'", "")
-            prenom_safe = str(row['prenom']).replace("'", "")
-            iwu_safe = str(row['iwu_id']).replace("'", "")
-            data_attr = f' data-dealer="{dealer_code}" data-dealer-match="{str(dealer_match).lower()}" data-nom="{nom_safe}" data-prenom="{prenom_safe}" data-iwu="{iwu_safe}"'
-        else:  # Context: /compare
-            onclick = f"openUser('{row['id_cree']}', '{sap}')"
-            data_attr = ""
-        
-        cells = ""
-        cells += f'<td onclick="{onclick}">{nom_prenom}</td>'
-        cells += f'<td onclick="{onclick}">{iwu_val}</td>'
-        
-        rows.append(f'<tr class="{css}"{data_attr}>{cells}</tr>')
-
-    table_class = "table table-bordered" if return_url else "table table-bordered table-striped"
-    return f"<table class='{table_class}'>" + "".join(rows) + "</table>"
+    return "".join(iter_table_html(df, sap=sap, return_url=return_url))
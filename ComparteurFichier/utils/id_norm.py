@@ -0,0 +1,236 @@
+"""
+Colonne id_norm persistée dans les tables utilisateurs (migration)
+
+id_norm contient normalize_id(id_cree) (lettres sans accents, en
+majuscules), calculé en Python : la même normalisation que les pages de
+comparaison, impossible à reproduire exactement en SQL. La colonne est
+indexée, ce qui évite les parcours complets de table des anciens filtres
+LOWER(REPLACE(id_cree, ' ', '')) = %s.
+
+Le remplissage ne traite que les lignes où id_norm est NULL :
+backup_and_clean.py complète les nouvelles lignes après chaque import
+(refresh_id_norm). Entre l'import et ce remplissage, les lectures par
+identifiant (user_index.id_match) acceptent aussi les lignes où id_norm est
+NULL : elles ne manquent aucune ligne.
+"""
+
+import time
+
+import pandas as pd
+
+from .parsers import normalize_ids
+from .queries import query_sql
+from .tables import SOURCE_TABLES, index_name
+from .user_index import id_match
+
+# Index ajoutés par table (filtre par concession, recherche par identifiant, doublons IWU)
+ID_NORM_INDEXES = {
+    "sso": [["sap_princ"], ["id_norm"], ["id_cree"]],
+    "idocs_user": [["sap_princ"], ["id_norm"], ["id_cree"]],
+    "sso_user_detail": [["id_norm"], ["id_cree"], ["iwu_id"]],
+    "idocs_user_detail": [["id_norm"], ["id_cree"], ["iwu_id"]],
+}
+
+# Index créés par une version précédente de la migration, supprimés s'ils existent :
+# aucune requête ne filtre sur (sap_princ, id_norm)
+OBSOLETE_INDEXES = {
+    "sso": [["sap_princ", "id_norm"]],
+    "idocs_user": [["sap_princ", "id_norm"]],
+}
+
+# Identifiants distincts mis à jour par transaction
+ID_NORM_BATCH_SIZE = 2000
+
+
+def has_id_norm(conn, table):
+    """Indique si la table possède déjà la colonne id_norm."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = 'id_norm'
+        """, [table])
+        return cursor.fetchone()[0] > 0
+
+
+def add_id_norm_column(conn, table):
+    """
+    Ajoute la colonne id_norm (NULL) si elle est absente.
+
+    Returns:
+        bool: True si la colonne a été ajoutée
+    """
+    if has_id_norm(conn, table):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN id_norm VARCHAR(255) NULL")
+    return True
+
+
+def backfill_id_norm(conn, table, batch_size=ID_NORM_BATCH_SIZE, log=print):
+    """
+    Remplit id_norm pour les lignes où elle est NULL, par lots commités.
+
+    Les id_cree distincts à traiter sont lus une fois et normalisés en
+    Python (normalize_ids) ; chaque lot est écrit par un seul UPDATE joint
+    à une table dérivée (id_cree, id_norm).
+
+    Args:
+        conn: Connexion DB-API
+        table (str): Table utilisateurs
+        batch_size (int): Identifiants distincts par transaction
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        int: Nombre de lignes mises à jour
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT id_cree FROM {table} WHERE id_norm IS NULL AND id_cree IS NOT NULL")
+        ids = pd.Series([row[0] for row in cursor.fetchall()], dtype=object)
+    pairs = list(zip(ids, normalize_ids(ids)))
+
+    total = 0
+    with conn.cursor() as cursor:
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            started = time.perf_counter()
+            values = " UNION ALL ".join(["SELECT %s AS id_cree, %s AS id_norm"] * len(batch))
+            cursor.execute(
+                f"UPDATE {table} t JOIN ({values}) v ON t.id_cree = v.id_cree "
+                f"SET t.id_norm = v.id_norm WHERE t.id_norm IS NULL",
+                [value for pair in batch for value in pair]
+            )
+            conn.commit()
+            total += cursor.rowcount
+            log(f"  {table} lot {start // batch_size + 1}: {start + len(batch)}/{len(pairs)} identifiants, "
+                f"{cursor.rowcount} lignes ({time.perf_counter() - started:.2f}s)")
+
+        # Lignes sans identifiant : normalize_id(None) == ""
+        cursor.execute(f"UPDATE {table} SET id_norm = '' WHERE id_norm IS NULL AND id_cree IS NULL")
+        conn.commit()
+        total += cursor.rowcount
+    return total
+
+
+def refresh_id_norm(conn, batch_size=ID_NORM_BATCH_SIZE, log=print):
+    """
+    Remplit id_norm pour les lignes importées depuis le dernier remplissage.
+
+    Les tables sans colonne id_norm (migration non appliquée) sont ignorées.
+
+    Returns:
+        dict: Table -> lignes remplies
+    """
+    results = {}
+    for table in ID_NORM_INDEXES:
+        if has_id_norm(conn, table):
+            results[table] = backfill_id_norm(conn, table, batch_size, log)
+    return results
+
+
+def create_id_norm_indexes(conn, log=print):
+    """
+    Crée les index de ID_NORM_INDEXES absents (noms : tables.index_name) et
+    supprime ceux de OBSOLETE_INDEXES.
+
+    Returns:
+        list: Noms des index créés
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        existing = {row[0] for row in cursor.fetchall()}
+
+    created = []
+    with conn.cursor() as cursor:
+        for table, definitions in ID_NORM_INDEXES.items():
+            for columns in definitions:
+                name = index_name(table, columns)
+                if name in existing:
+                    continue
+                started = time.perf_counter()
+                cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+                created.append(name)
+                log(f"  index {name} cree ({time.perf_counter() - started:.2f}s)")
+        for table, definitions in OBSOLETE_INDEXES.items():
+            for columns in definitions:
+                name = index_name(table, columns)
+                if name in existing:
+                    cursor.execute(f"DROP INDEX {name} ON {table}")
+                    log(f"  index {name} supprime (inutilise)")
+    return created
+
+
+def migrate_id_norm(conn, batch_size=ID_NORM_BATCH_SIZE, log=print):
+    """
+    Ajoute, remplit et indexe id_norm dans les quatre tables utilisateurs.
+
+    Returns:
+        dict: Table -> lignes remplies
+    """
+    results = {}
+    for table in ID_NORM_INDEXES:
+        if add_id_norm_column(conn, table):
+            log(f"[OK] {table}: colonne id_norm ajoutee")
+        results[table] = backfill_id_norm(conn, table, batch_size, log)
+        log(f"[OK] {table}: {results[table]} lignes remplies")
+    create_id_norm_indexes(conn, log)
+    return results
+
+
+# ============================
+# VERIFICATION (EXPLAIN)
+# ============================
+def check_queries(id_cree="x", sap_princ="x", iwu_id="x"):
+    """
+    Requêtes des routes à vérifier, avec des paramètres d'exemple.
+
+    Returns:
+        list: Tuples (libellé, sql, params)
+    """
+    match, match_params = id_match(id_cree)
+    queries = []
+    for source, (user_table, detail_table) in SOURCE_TABLES.items():
+        queries += [
+            (f"compare_user {source} concessions",
+             query_sql("user_live.dealers", table=user_table, match=match), match_params),
+            (f"compare_user {source} détail",
+             query_sql("user_live.detail", table=detail_table, match=match),
+             match_params),
+            (f"compare_user {source} doublons IWU",
+             query_sql("user_live.duplicates", table=detail_table, placeholders="%s", match=match),
+             [iwu_id] + match_params),
+        ]
+    for source, (user_table, detail_table) in SOURCE_TABLES.items():
+        queries.append((
+            f"dealers/compare {source} utilisateurs de la concession",
+            query_sql("comparison.users", user_table=user_table, detail_table=detail_table, placeholders="%s"),
+            [sap_princ]
+        ))
+    return queries
+
+
+def explain_check(conn, id_cree="x", sap_princ="x", iwu_id="x"):
+    """
+    Vérifie par EXPLAIN que les requêtes des routes utilisent un index.
+
+    Returns:
+        list: Dicts query, table, type, key, rows, ok (une ligne par table du plan)
+    """
+    report = []
+    with conn.cursor() as cursor:
+        for label, sql, params in check_queries(id_cree, sap_princ, iwu_id):
+            cursor.execute("EXPLAIN " + sql, params)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                plan = dict(zip(columns, row))
+                report.append({
+                    "query": label,
+                    "table": plan.get("table"),
+                    "type": plan.get("type"),
+                    "key": plan.get("key"),
+                    "rows": plan.get("rows"),
+                    "ok": plan.get("key") is not None and plan.get("type") != "ALL",
+                })
+    return report
@@ -0,0 +1,223 @@
+"""
+Index des noms de concessions (table con_nom)
+
+La colonne con_nom.sap_nom regroupe les noms des deux systèmes dans une
+seule chaîne : "IDOCS: SPL SECLIN; WELCOME: SPL HAUT DE FRANCE". Elle est
+découpée une seule fois, à la construction de l'index (chargé dans le cache
+mémoire, voir utils/cache.py) ; les routes lisent ensuite des tuples déjà
+prêts par un accès dictionnaire sur sap_princ.
+
+write_con_nom() met à jour con_nom pour les seules concessions recalculées
+(régénération incrémentale, voir scripts/generate_names_final.py).
+"""
+
+import pandas as pd
+
+# Concessions par requête DELETE / INSERT lors de la mise à jour de con_nom
+CON_NOM_BATCH = 1000
+
+
+class ConcessionNames:
+    """
+    Noms d'une concession, découpés par source.
+
+    Attributes:
+        sap_princ (str): Code SAP principal
+        raw (str | None): Chaîne sap_nom d'origine
+        welcome (tuple): Noms WELCOME (ordre de la chaîne)
+        idocs (tuple): Noms IDOCS (ordre de la chaîne)
+        common (tuple): Noms présents dans les deux sources (triés)
+        labels (tuple): Noms distincts préfixés par leur source
+                        ("W + I: ", "W: ", "I: "), pour /compare_user
+    """
+
+    __slots__ = ("sap_princ", "raw", "welcome", "idocs", "common", "labels")
+
+    def __init__(self, sap_princ, raw, welcome=(), idocs=()):
+        self.sap_princ = sap_princ
+        self.raw = raw
+        self.welcome = welcome
+        self.idocs = idocs
+
+        welcome_set = set(welcome)
+        idocs_set = set(idocs)
+        self.common = tuple(sorted(welcome_set & idocs_set))
+        self.labels = (
+            tuple(f"W + I: {name}" for name in self.common)
+            + tuple(f"W: {name}" for name in sorted(welcome_set - idocs_set))
+            + tuple(f"I: {name}" for name in sorted(idocs_set - welcome_set))
+        )
+
+    def names(self, source):
+        """
+        Noms d'une source.
+
+        Args:
+            source (str): "WELCOME" ou "IDOCS"
+
+        Returns:
+            tuple: Noms de la source (vide si aucun)
+        """
+        return self.welcome if source == "WELCOME" else self.idocs
+
+    def __repr__(self):
+        return f"ConcessionNames({self.sap_princ!r}, welcome={self.welcome!r}, idocs={self.idocs!r})"
+
+
+def parse_concession_names(sap_princ, sap_nom):
+    """
+    Découpe une chaîne sap_nom en noms WELCOME et IDOCS.
+
+    Les préfixes sont insensibles à la casse et aux espaces ; les entrées
+    sans préfixe connu ou sans nom sont ignorées.
+
+    Args:
+        sap_princ (str): Code SAP principal
+        sap_nom (str): Chaîne "IDOCS: X; WELCOME: Y"
+
+    Returns:
+        ConcessionNames: Noms découpés
+    """
+    if sap_nom is None or (isinstance(sap_nom, float) and sap_nom != sap_nom):
+        return ConcessionNames(sap_princ, None)
+
+    welcome = []
+    idocs = []
+    for part in str(sap_nom).split(';'):
+        prefix, sep, content = part.partition(':')
+        content = content.strip()
+        if not sep or not content:
+            continue
+        prefix = prefix.strip().upper()
+        if prefix == "WELCOME":
+            welcome.append(content)
+        elif prefix == "IDOCS":
+            idocs.append(content)
+    return ConcessionNames(sap_princ, sap_nom, tuple(welcome), tuple(idocs))
+
+
+class ConcessionNameIndex:
+    """
+    sap_princ -> ConcessionNames, construit une fois depuis con_nom.
+
+    En cas de doublon sur sap_princ, la première ligne est retenue (comme
+    les anciennes lectures iloc[0]). Une concession absente renvoie un
+    enregistrement vide.
+    """
+
+    __slots__ = ("_records", "_names")
+
+    def __init__(self, records):
+        self._records = records
+        # sap_princ -> noms non vides, par source (lus par Series.map dans names_series)
+        self._names = {
+            source: {sap_princ: record.names(source) for sap_princ, record in records.items() if record.names(source)}
+            for source in ("WELCOME", "IDOCS")
+        }
+
+    @classmethod
+    def build(cls, df_con_nom):
+        """
+        Construit l'index depuis la table con_nom.
+
+        Args:
+            df_con_nom (pd.DataFrame): Colonnes sap_princ, sap_nom
+
+        Returns:
+            ConcessionNameIndex: Index prêt à l'emploi
+        """
+        df = df_con_nom[df_con_nom["sap_princ"].notna()].drop_duplicates("sap_princ")
+        return cls({
+            sap_princ: parse_concession_names(sap_princ, sap_nom)
+            for sap_princ, sap_nom in zip(df["sap_princ"], df["sap_nom"])
+        })
+
+    def get(self, sap_princ):
+        """
+        Noms d'une concession.
+
+        Args:
+            sap_princ (str): Code SAP principal
+
+        Returns:
+            ConcessionNames: Enregistrement (vide si la concession est inconnue)
+        """
+        record = self._records.get(sap_princ)
+        if record is None:
+            return ConcessionNames(sap_princ, None)
+        return record
+
+    def raw(self, sap_princ):
+        """Chaîne sap_nom brute d'une concession, None si absente."""
+        record = self._records.get(sap_princ)
+        return record.raw if record is not None else None
+
+    def names_series(self, sap_princs, source):
+        """
+        Noms d'une source pour une colonne de sap_princ (None si aucun nom).
+
+        Args:
+            sap_princs (pd.Series): Codes SAP principaux
+            source (str): "WELCOME" ou "IDOCS"
+
+        Returns:
+            pd.Series: Tuples de noms, même index que sap_princs
+        """
+        values = sap_princs.map(self._names["WELCOME" if source == "WELCOME" else "IDOCS"]).astype(object)
+        return values.where(values.notna(), None)
+
+    def __contains__(self, sap_princ):
+        return sap_princ in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+
+# ============================
+# ECRITURE (régénération des noms)
+# ============================
+def write_con_nom(conn, rows, removed=(), replace=False, batch_size=CON_NOM_BATCH):
+    """
+    Remplace dans con_nom les lignes de quelques concessions, en une transaction.
+
+    Les lignes existantes des concessions de rows et de removed sont
+    supprimées, puis celles de rows insérées (upsert sans clé unique
+    requise sur sap_princ). Avec replace=True, rows est la table complète :
+    toutes les lignes existantes sont supprimées, y compris celles des
+    concessions disparues des fichiers sources.
+
+    Args:
+        conn: Connexion DB-API
+        rows (pd.DataFrame): Colonnes sap_princ, sap_nom des concessions recalculées
+        removed (list): sap_princ disparus des fichiers sources
+        replace (bool): Remplacer tout le contenu de con_nom par rows
+        batch_size (int): Concessions par requête
+
+    Returns:
+        dict: Nombre de concessions écrites ("upserted") et supprimées ("deleted")
+    """
+    values = list(zip(rows["sap_princ"], rows["sap_nom"]))
+    saps = [sap_princ for sap_princ, _ in values] + list(removed)
+    try:
+        with conn.cursor() as cursor:
+            if replace:
+                cursor.execute("SELECT DISTINCT sap_princ FROM con_nom")
+                removed = sorted({row[0] for row in cursor.fetchall()} - set(rows["sap_princ"]), key=str)
+                cursor.execute("DELETE FROM con_nom")
+            else:
+                for start in range(0, len(saps), batch_size):
+                    chunk = saps[start:start + batch_size]
+                    cursor.execute(
+                        f"DELETE FROM con_nom WHERE sap_princ IN ({', '.join(['%s'] * len(chunk))})",
+                        chunk
+                    )
+            for start in range(0, len(values), batch_size):
+                cursor.executemany(
+                    "INSERT INTO con_nom (sap_princ, sap_nom) VALUES (%s, %s)",
+                    values[start:start + batch_size]
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"upserted": len(values), "deleted": len(removed)}
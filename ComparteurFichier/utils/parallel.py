@@ -0,0 +1,90 @@
+"""
+Lectures SQL indépendantes exécutées en parallèle (WELCOME / IDOCS)
+
+Les requêtes des deux sources ne dépendent pas l'une de l'autre : au lieu de
+les enchaîner sur une seule connexion (latence = somme des allers-retours),
+fetch_parallel lance chaque tâche sur sa propre connexion du pool, dans un
+pool de threads partagé. La première tâche s'exécute dans le thread appelant
+avec la connexion déjà empruntée : une page n'emprunte qu'une connexion de
+plus par tâche supplémentaire.
+
+Les connexions supplémentaires sont réservées sans attente, dans le thread
+appelant, avant de lancer les threads : une page qui tient déjà une
+connexion n'attend jamais qu'une autre page en rende une (pas
+d'interblocage quand le pool est plein). Les tâches sans connexion libre
+s'exécutent sur la connexion de l'appelant, l'une après l'autre.
+
+Les threads attendent le réseau (pymysql relâche le GIL pendant les I/O) :
+un pool de threads suffit, sans pilote MySQL asynchrone.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import database
+
+# Threads de lecture partagés par toute l'application (0 : lectures séquentielles)
+FETCH_WORKERS = int(os.environ.get("DEALERVIEW_FETCH_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch") if FETCH_WORKERS > 0 else None
+_worker = threading.local()
+
+
+def _run_reserved(task, conn):
+    # Thread du pool : connexion réservée par l'appelant, rendue au pool après la tâche
+    _worker.active = True
+    try:
+        with conn:
+            return task(conn)
+    finally:
+        _worker.active = False
+
+
+def _reserve(count):
+    # Connexions libres tout de suite (jamais d'attente : l'appelant en tient déjà une)
+    reserved = []
+    while len(reserved) < count:
+        conn = database.pool.acquire(wait=False)
+        if conn is None:
+            break
+        reserved.append(conn)
+    return reserved
+
+
+def fetch_parallel(conn, *tasks):
+    """
+    Exécute des lectures indépendantes en parallèle.
+
+    Chaque tâche est une fonction recevant une connexion. La première utilise
+    conn dans le thread appelant, les suivantes une connexion du pool chacune,
+    réservée sans attente. Les tâches pour lesquelles le pool n'a plus de
+    connexion libre, ainsi que toutes les tâches sans pool de threads
+    (FETCH_WORKERS = 0) ou depuis un thread du pool (appel imbriqué), sont
+    exécutées l'une après l'autre sur conn.
+
+    Args:
+        conn: Connexion DB-API déjà empruntée par l'appelant
+        *tasks (callable): Fonctions conn -> résultat
+
+    Returns:
+        list: Résultats dans l'ordre des tâches
+
+    Raises:
+        Exception: La première erreur rencontrée, après la fin de toutes les tâches
+    """
+    if _executor is None or len(tasks) < 2 or getattr(_worker, "active", False):
+        return [task(conn) for task in tasks]
+
+    reserved = _reserve(len(tasks) - 1)
+    pooled = tasks[1:1 + len(reserved)]
+    local = tasks[:1] + tasks[1 + len(reserved):]
+
+    futures = [_executor.submit(_run_reserved, task, extra) for task, extra in zip(pooled, reserved)]
+    try:
+        local_results = [task(conn) for task in local]
+    finally:
+        # Attendre les autres tâches même en cas d'erreur (connexions rendues au pool)
+        for future in futures:
+            future.exception()
+    return local_results[:1] + [future.result() for future in futures] + local_results[1:]
@@ -4,62 +4,77 @@ Fonctions de parsing et normalisation de données
 
 import unicodedata
 import re
+import string
+from functools import lru_cache
 import pandas as pd
 
+# Taille du cache LRU de normalize_id (identifiants distincts mémorisés)
+NORMALIZE_CACHE_SIZE = 100_000
+
+_NON_LETTERS = re.compile(r'[^A-Za-z]')
+
 
 def normalize_id(s):
     """
     Normalise un identifiant en retirant les accents et caractères spéciaux.
     
+    Les résultats sont mémorisés (cache LRU borné) : un même id_cree revient
+    sur chaque page et n'est normalisé qu'une fois.
+    
     Args:
         s: Chaîne à normaliser
         
     Returns:
         str: Chaîne normalisée en majuscules, sans accents ni caractères spéciaux
     """
-    if s is None:
+    # Valeurs manquantes (None, NaN, pd.NA, NaT) : "" comme dans normalize_ids
+    if s is None or s is pd.NA or s is pd.NaT or (isinstance(s, float) and s != s):
         return ""
-    s = str(s)
+    return _normalize_text(str(s))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_text(s):
     s = ''.join(c for c in unicodedata.normalize('NFD', s)
                 if unicodedata.category(c) != 'Mn')
-    s = re.sub(r'[^A-Za-z]', '', s)
+    s = _NON_LETTERS.sub('', s)
     return s.upper()
 
 
-def parse_multiple_names(sap_nom_string, source="WELCOME"):
+# Table de suppression (bytes.translate) : tout l'ASCII sauf les lettres et le séparateur
+_SEPARATOR = "\x00"
+_DELETE_NON_LETTERS = bytes(
+    b for b in range(128) if chr(b) not in string.ascii_letters and chr(b) != _SEPARATOR
+)
+
+
+def normalize_ids(values):
     """
-    Parse une chaîne de noms provenant de con_nom et filtre par source.
-    
-    Format attendu: "IDOCS: SPL SECLIN; WELCOME: SPL HAUT DE FRANCE; WELCOME: SPL LITTORAL"
+    Version vectorisée de normalize_id pour toute une colonne.
+
+    Les identifiants sont concaténés puis traités en une seule passe C :
+    décomposition NFD, suppression du non-ASCII (accents), puis des
+    caractères non alphabétiques via une table précalculée. Le résultat
+    est identique à values.apply(normalize_id).
     
     Args:
-        sap_nom_string (str): Chaîne contenant les noms avec leurs sources
-        source (str): Source à filtrer ("WELCOME" ou "IDOCS")
-    
-    Returns:
-        list: Liste de noms filtrés pour la source demandée
+        values (pd.Series): Identifiants à normaliser
         
-    Example:
-        >>> parse_multiple_names("WELCOME: ABC; IDOCS: XYZ", "WELCOME")
-        ['ABC']
+    Returns:
+        pd.Series: Identifiants normalisés (même index)
     """
-    if not sap_nom_string or pd.isna(sap_nom_string):
-        return []
-    
-    names = [n.strip() for n in str(sap_nom_string).split(';')]
-    clean_names = []
-    
-    for name in names:
-        if ':' in name:
-            prefix, content = name.split(':', 1)
-            prefix = prefix.strip().upper()
-            content = content.strip()
-            
-            if source == "WELCOME" and prefix == "WELCOME":
-                if content:
-                    clean_names.append(content)
-            elif source == "IDOCS" and prefix == "IDOCS":
-                if content:
-                    clean_names.append(content)
-    
-    return clean_names
+    text = values.astype(object).where(values.notna(), "").astype(str).tolist()
+
+    folded = (
+        unicodedata.normalize('NFD', _SEPARATOR.join(text))
+        .encode('ascii', 'ignore')
+        .translate(None, _DELETE_NON_LETTERS)
+        .upper()
+        .decode('ascii')
+        .split(_SEPARATOR)
+    )
+    if len(folded) != len(text):
+        # Un identifiant contient le séparateur : repli sur la version scalaire
+        folded = [normalize_id(s) for s in text]
+
+    return pd.Series(folded, index=values.index, dtype=object)
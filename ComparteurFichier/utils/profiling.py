@@ -0,0 +1,291 @@
+"""
+Instrumentation des requêtes Flask : phases, Server-Timing, cProfile, /metrics
+
+Chaque requête mesure des phases exclusives (une phase imbriquée suspend
+la phase englobante) :
+- db : requêtes SQL (utils/queries.read_query)
+- transform : calculs pandas et normalisation (blocs `with phase(...)` des routes)
+- html : génération des tableaux HTML (timed_iter autour de iter_table_html)
+- template : rendu Jinja (signaux Flask, y compris les pages streamées)
+
+Les durées sont envoyées dans l'en-tête Server-Timing (visible dans l'onglet
+réseau du navigateur). Pour une page streamée, l'en-tête part avant le
+corps : il ne contient que les phases terminées à ce moment, les durées
+complètes vont dans les histogrammes de /metrics (format texte Prometheus).
+
+Profil cProfile à la demande : DEALERVIEW_PROFILE=1 puis ?profile=1 sur
+l'URL, le fichier .prof est écrit dans DEALERVIEW_PROFILE_DIR.
+"""
+
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+
+# Profil cProfile autorisé (?profile=1) et dossier des fichiers .prof
+PROFILE_ENABLED = os.environ.get("DEALERVIEW_PROFILE") == "1"
+PROFILE_DIR = os.environ.get("DEALERVIEW_PROFILE_DIR", "profiles")
+
+# Bornes des histogrammes de latence, en secondes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimer:
+    """
+    Durées des phases d'une requête.
+
+    Les phases forment une pile : start() suspend la phase en cours, stop()
+    la reprend. Une seconde n'est donc comptée que dans une seule phase.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self._stack = []
+
+    def start(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self._add(*self._stack[-1], now)
+        self._stack.append([name, now])
+
+    def stop(self):
+        now = time.perf_counter()
+        name, started = self._stack.pop()
+        self._add(name, started, now)
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def finish(self):
+        """Ferme les phases encore ouvertes et retourne la durée totale (secondes)."""
+        while self._stack:
+            self.stop()
+        return time.perf_counter() - self.started
+
+    def header(self):
+        """Valeur de l'en-tête Server-Timing (phases terminées + total écoulé)."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def _add(self, name, started, now):
+        self.phases[name] = self.phases.get(name, 0.0) + now - started
+
+
+def current_timer():
+    """Timer de la requête en cours (None hors requête, ex: scripts)."""
+    return g.get("request_timer") if has_request_context() else None
+
+
+@contextmanager
+def phase(name):
+    """
+    Compte le bloc dans la phase name de la requête en cours.
+
+    Sans requête en cours (scripts, cache chargé hors requête), ne mesure rien.
+    """
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    timer.start(name)
+    try:
+        yield
+    finally:
+        timer.stop()
+
+
+def timed_iter(iterable, name):
+    """
+    Compte la production de chaque élément d'un générateur dans la phase name.
+
+    Args:
+        iterable: Générateur consommé pendant le rendu (ex: iter_table_html)
+        name (str): Phase (ex: "html")
+
+    Yields:
+        Les éléments de iterable, sans modification
+    """
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+# ============================
+# METRIQUES (format Prometheus)
+# ============================
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Histogramme Prometheus thread-safe (buckets cumulés, _sum, _count) par jeu de labels."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series['count']}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+request_latency = Histogram(
+    "dealerview_request_duration_seconds", "Durée des requêtes HTTP (jusqu'à la fin du corps)",
+    ["route", "method", "status"]
+)
+phase_latency = Histogram(
+    "dealerview_request_phase_seconds", "Durée des phases db, transform, html et template par requête",
+    ["route", "phase"]
+)
+
+
+def render_metrics(query_stats=None):
+    """
+    Métriques au format texte Prometheus.
+
+    Args:
+        query_stats (QueryStats): Statistiques des requêtes SQL nommées (optionnel)
+
+    Returns:
+        str: Corps de la réponse /metrics
+    """
+    lines = request_latency.render() + phase_latency.render()
+    if query_stats is not None:
+        stats = query_stats.stats()
+        for metric, key, help_text, scale in [
+            ("dealerview_db_queries_total", "count", "Exécutions par requête SQL nommée", 1),
+            ("dealerview_db_query_errors_total", "errors", "Erreurs par requête SQL nommée", 1),
+            ("dealerview_db_query_seconds_total", "total_ms", "Durée cumulée par requête SQL nommée", 0.001),
+        ]:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [
+                f"{metric}{_labels(['query'], [name])} {entry[key] * scale:g}"
+                for name, entry in sorted(stats.items())
+            ]
+    return "\n".join(lines) + "\n"
+
+
+# ============================
+# BRANCHEMENT SUR L'APPLICATION
+# ============================
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "<inconnue>"
+
+
+def _start_profile():
+    if not (PROFILE_ENABLED and request.args.get("profile") == "1"):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Un autre profil est déjà actif (requête concurrente)
+        return None
+    return profiler
+
+
+def _dump_profile(profiler, endpoint, logger):
+    profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{endpoint}_{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() % 10**9}.prof")
+    profiler.dump_stats(path)
+    logger.info("Profil écrit : %s", path)
+
+
+def _record(timer, route, method, status):
+    total = timer.finish()
+    request_latency.observe((route, method, str(status)), total)
+    for name, seconds in timer.phases.items():
+        phase_latency.observe((route, name), seconds)
+
+
+def instrument_app(app):
+    """
+    Active les timers de phases, Server-Timing, les métriques et le profil à la demande.
+
+    Args:
+        app (Flask): Application à instrumenter
+    """
+    @app.before_request
+    def start_request_timer():
+        g.request_timer = RequestTimer()
+        g.request_profiler = _start_profile()
+
+    @app.after_request
+    def finish_request_timer(response):
+        timer = g.request_timer
+        profiler = g.pop("request_profiler", None)
+        response.headers["Server-Timing"] = timer.header()
+        route, method, status, endpoint = _route(), request.method, response.status_code, request.endpoint
+
+        # Après l'envoi du corps (pages streamées comprises)
+        def on_close():
+            _record(timer, route, method, status)
+            if profiler is not None:
+                _dump_profile(profiler, endpoint, app.logger)
+
+        response.call_on_close(on_close)
+        g.request_recorded = True
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exc):
+        # Exception non gérée : after_request n'est pas appelé
+        if exc is not None and not g.get("request_recorded") and "request_timer" in g:
+            _record(g.request_timer, _route(), request.method, 500)
+            profiler = g.pop("request_profiler", None)
+            if profiler is not None:
+                profiler.disable()
+
+    def start_template(sender, template, context, **extra):
+        timer = current_timer()
+        if timer is not None:
+            timer.start("template")
+
+    def stop_template(sender, template, context, **extra):
+        timer = current_timer()
+        if timer is not None:
+            timer.stop()
+
+    before_render_template.connect(start_template, app, weak=False)
+    template_rendered.connect(stop_template, app, weak=False)
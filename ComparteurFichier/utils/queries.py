@@ -0,0 +1,341 @@
+"""
+Requêtes SQL des routes, nommées et paramétrées
+
+Toutes les requêtes exécutées pendant le rendu d'une page sont déclarées
+ici (QUERIES) : les valeurs passent toujours en paramètres (%s), seuls les
+noms de tables et le nombre de %s des listes IN sont substitués dans le
+texte. read_query mesure la durée de chaque exécution par nom de requête
+(query_stats, exposé sur /db/queries et /metrics) et la compte dans la
+phase "db" de la requête HTTP (utils/profiling.py) : les requêtes lentes se
+repèrent et se règlent à un seul endroit.
+
+Deux modes de lecture : read_query (DataFrame) pour les résultats traités en
+colonnes (groupby, merge, isin...), fetch_records (tuples nommés) pour les
+petites lectures consommées ligne à ligne, sans le coût de construction
+d'un DataFrame.
+
+Les requêtes de maintenance (construction des index, rafraîchissement de
+user_comparison, migrations) restent dans leurs modules.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import pandas as pd
+
+from .profiling import phase
+
+QUERIES = {
+    # ============================
+    # Tables de référence (utils/cache.py)
+    # ============================
+    "reference.con_nom": "SELECT sap_princ, sap_nom FROM con_nom WHERE sap_princ IS NOT NULL",
+    "reference.all_saps": "SELECT DISTINCT sap_princ FROM con_nom ORDER BY sap_princ",
+
+    # Comptes par concession + totaux globaux, un seul aller-retour (utils/stats.py)
+    "stats.dealer_counts": """
+        SELECT 'WELCOME' AS source, sap_princ, COUNT(DISTINCT id_cree) AS nb_users
+        FROM sso
+        WHERE sap_princ IS NOT NULL
+        GROUP BY sap_princ
+        UNION ALL
+        SELECT 'IDOCS' AS source, sap_princ, COUNT(DISTINCT id_cree) AS nb_users
+        FROM idocs_user
+        WHERE sap_princ IS NOT NULL
+        GROUP BY sap_princ
+        UNION ALL
+        SELECT 'WELCOME_TOTAL' AS source, NULL AS sap_princ, COUNT(DISTINCT id_cree) AS nb_users
+        FROM sso
+        WHERE sap_princ IS NOT NULL
+        UNION ALL
+        SELECT 'IDOCS_TOTAL' AS source, NULL AS sap_princ, COUNT(DISTINCT id_cree) AS nb_users
+        FROM idocs_user
+        WHERE sap_princ IS NOT NULL
+    """,
+
+    # Index de recherche (utils/search.py)
+    "search.user_details": """
+        SELECT id_cree, nom, prenom, iwu_id, 'SSO' AS source
+        FROM sso_user_detail
+        UNION ALL
+        SELECT id_cree, nom, prenom, iwu_id, 'IDOCS' AS source
+        FROM idocs_user_detail
+    """,
+    # Utilisateurs rattachés à un IWU_ID (utils/repository.py)
+    "search.by_iwu": """
+        SELECT 'SSO' AS source, id_cree, nom, prenom, iwu_id
+        FROM sso_user_detail
+        WHERE iwu_id = %s
+        UNION ALL
+        SELECT 'IDOCS' AS source, id_cree, nom, prenom, iwu_id
+        FROM idocs_user_detail
+        WHERE iwu_id = %s
+    """,
+
+    # ============================
+    # /dealers et /compare
+    # ============================
+    # Sous-concessions : idocs_con.sap_dealer = principal, sap_princ = sous-concession
+    "dealers.sub_names": """
+        SELECT DISTINCT sap_princ, sap_nom
+        FROM idocs_con
+        WHERE sap_dealer = %s
+    """,
+    "comparison.stored": """
+        SELECT source, id_cree, nom, prenom, iwu_id, id_norm, status
+        FROM user_comparison
+        WHERE sap_princ = %s
+        ORDER BY source, position
+    """,
+    # Empreinte des utilisateurs par concession, comparée à user_comparison_state (refresh_store)
+    "comparison.checksums": """
+        SELECT s.sap_princ, COUNT(*) AS nb_rows,
+               SUM(CRC32(CONCAT_WS('|', IFNULL(s.id_cree, ''), IFNULL(s.nom, ''),
+                                   IFNULL(s.prenom, ''), IFNULL(d.iwu_id, '')))) AS checksum
+        FROM {user_table} s
+        LEFT JOIN {detail_table} d ON s.id_cree = d.id_cree
+        WHERE s.sap_princ IS NOT NULL
+        GROUP BY s.sap_princ
+    """,
+    # Utilisateurs de concessions avec leurs IWU_ID (index sap_princ et id_cree)
+    "comparison.users": """
+        SELECT s.id_cree, s.nom, s.prenom, s.sap_princ,
+               d.iwu_id
+        FROM {user_table} s
+        LEFT JOIN {detail_table} d ON s.id_cree = d.id_cree
+        WHERE s.sap_princ IN ({placeholders})
+    """,
+
+    # ============================
+    # /compare_user (utils/user_index.py)
+    # ============================
+    # Lignes de l'utilisateur + lignes partageant un de ses IWU_ID
+    "user_index.rows": """
+        SELECT 1 AS is_user, source, position, id_cree, nom, prenom, iwu_id, marque, typeprofil
+        FROM user_iwu_index
+        WHERE {match}
+        UNION ALL
+        SELECT DISTINCT 0 AS is_user, d.source, d.position, d.id_cree, d.nom, d.prenom,
+               d.iwu_id, d.marque, d.typeprofil
+        FROM user_iwu_index u
+        JOIN user_iwu_index d ON d.iwu_id = u.iwu_id
+        WHERE {user_match}
+          AND u.iwu_id <> '' AND u.iwu_id <> 'NONE'
+          AND NOT {other_match}
+        ORDER BY is_user DESC, source DESC, position
+    """,
+    # Dernière construction de l'index (ligne absente : index à reconstruire)
+    "user_index.state": "SELECT built_at, optional_columns FROM user_index_state WHERE id = 1",
+    "user_index.dealers": """
+        SELECT source, id_cree, sap_princ
+        FROM user_dealer_index
+        WHERE {match}
+        ORDER BY source DESC, position
+    """,
+    # Lecture directe des tables sources ({match} : condition sur l'identifiant, voir id_match)
+    "user_live.detail": "SELECT * FROM {table} WHERE {match}",
+    "user_live.dealers": "SELECT DISTINCT id_cree, sap_princ FROM {table} WHERE {match}",
+    "user_live.duplicates": """
+        SELECT DISTINCT id_cree, nom, prenom, iwu_id
+        FROM {table}
+        WHERE iwu_id IN ({placeholders})
+        AND NOT {match}
+    """,
+
+    # ============================
+    # /user (utils/users.py)
+    # ============================
+    # Une branche par table, lue dans l'ordre de tri et limitée avant l'UNION
+    "users.page_branch": """
+        SELECT * FROM (
+            SELECT DISTINCT id_cree, nom, prenom
+            FROM {table}
+            {where}
+            ORDER BY nom, id_cree, prenom
+            LIMIT %s
+        ) {table}_page""",
+    "users.page": """
+        SELECT id_cree, nom, prenom FROM ({branches}
+        ) u
+        ORDER BY nom, id_cree, prenom
+        LIMIT %s
+    """,
+
+    # ============================
+    # /duplicates (utils/duplicates.py)
+    # ============================
+    # Lignes des IWU_ID rattachés à plus d'un id_cree, triées par iwu_id (lecture par blocs)
+    "duplicates.iwu_rows": """
+        SELECT r.iwu_id, r.id_cree, r.nom, r.prenom, r.source
+        FROM (
+            SELECT iwu_id, id_cree, nom, prenom, 'SSO' AS source FROM sso_user_detail
+            UNION ALL
+            SELECT iwu_id, id_cree, nom, prenom, 'IDOCS' AS source FROM idocs_user_detail
+        ) r
+        JOIN (
+            SELECT iwu_id
+            FROM (
+                SELECT iwu_id, id_cree FROM sso_user_detail
+                UNION ALL
+                SELECT iwu_id, id_cree FROM idocs_user_detail
+            ) c
+            WHERE iwu_id IS NOT NULL AND iwu_id <> '' AND iwu_id <> 'NONE'
+            GROUP BY iwu_id
+            HAVING COUNT(DISTINCT id_cree) > 1
+        ) d ON d.iwu_id = r.iwu_id
+        ORDER BY r.iwu_id, r.source DESC, r.id_cree
+    """,
+    "duplicates.state": "SELECT nb_groups, built_at FROM iwu_duplicates_state WHERE id = 1",
+    # Groupes group_no dans ]%s, %s] du rapport matérialisé
+    "duplicates.page": """
+        SELECT group_no, iwu_id, nb_identites, id_norm, id_cree, nom, prenom, source
+        FROM iwu_duplicates
+        WHERE group_no > %s AND group_no <= %s
+        ORDER BY group_no, position
+    """,
+}
+
+
+def placeholders(count):
+    """Liste de count marqueurs %s pour une clause IN."""
+    return ','.join(['%s'] * count)
+
+
+def query_sql(name, **parts):
+    """
+    Texte SQL d'une requête nommée.
+
+    Args:
+        name (str): Clé de QUERIES
+        **parts: Fragments substitués dans le texte (tables, placeholders...)
+
+    Returns:
+        str: Requête SQL (valeurs en paramètres %s)
+    """
+    sql = QUERIES[name]
+    return sql.format(**parts) if parts else sql
+
+
+class QueryStats:
+    """
+    Durées d'exécution par requête nommée (thread-safe).
+
+    Pour chaque nom : nombre d'exécutions, erreurs, durée totale, moyenne,
+    maximale et dernière (en millisecondes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, name, seconds, error=False):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["last"] = seconds
+
+    def stats(self):
+        """Statistiques par nom de requête (durées en millisecondes)."""
+        with self._lock:
+            return {
+                name: {
+                    "count": entry["count"],
+                    "errors": entry["errors"],
+                    "total_ms": round(entry["total"] * 1000, 3),
+                    "avg_ms": round(entry["total"] * 1000 / entry["count"], 3),
+                    "max_ms": round(entry["max"] * 1000, 3),
+                    "last_ms": round(entry["last"] * 1000, 3),
+                }
+                for name, entry in self._entries.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Instance partagée par toute l'application
+query_stats = QueryStats()
+
+
+class _Timed:
+    """Mesure une exécution : phase "db" de la requête HTTP + query_stats."""
+
+    def __init__(self, name):
+        self.name = name
+        self._phase = phase("db")
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._phase.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._phase.__exit__(exc_type, exc, tb)
+        query_stats.record(self.name, time.perf_counter() - self.started, error=exc_type is not None)
+
+
+def read_query(conn, name, params=None, **parts):
+    """
+    Exécute une requête nommée et enregistre sa durée dans query_stats.
+
+    Args:
+        conn: Connexion DB-API
+        name (str): Clé de QUERIES
+        params (list): Valeurs des %s
+        **parts: Fragments substitués dans le texte (voir query_sql)
+
+    Returns:
+        pd.DataFrame: Résultat de la requête
+    """
+    sql = query_sql(name, **parts)
+    with _Timed(name):
+        return pd.read_sql(sql, conn, params=params)
+
+
+@lru_cache(maxsize=None)
+def record_type(columns):
+    """
+    Type d'enregistrement (tuple nommé, sans __dict__) pour un jeu de colonnes.
+
+    Args:
+        columns (tuple): Noms des colonnes
+
+    Returns:
+        type: namedtuple "Record" mis en cache par jeu de colonnes
+    """
+    return namedtuple("Record", columns, rename=True)
+
+
+def fetch_records(conn, name, params=None, **parts):
+    """
+    Exécute une requête nommée et retourne ses lignes en tuples nommés.
+
+    Pour les petits résultats lus ligne à ligne (row.nom, row.iwu_id...).
+    Les valeurs sont celles du driver (NULL -> None). Les erreurs SQL sont
+    levées en pd.errors.DatabaseError, comme pour read_query.
+
+    Args:
+        conn: Connexion DB-API
+        name (str): Clé de QUERIES
+        params (list): Valeurs des %s
+        **parts: Fragments substitués dans le texte (voir query_sql)
+
+    Returns:
+        list: Enregistrements (record_type des colonnes du résultat)
+    """
+    sql = query_sql(name, **parts)
+    with _Timed(name):
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(sql, params)
+            except Exception as exc:
+                raise pd.errors.DatabaseError(f"Execution failed on sql '{sql}': {exc}") from exc
+            record = record_type(tuple(column[0] for column in cursor.description))
+            return [record._make(row) for row in cursor.fetchall()]
@@ -0,0 +1,314 @@
+"""
+Couche d'accès aux données multi-backends (MySQL, PostgreSQL, SQLite)
+
+Une même interface (get_users, get_dealer_names, find_by_iwu) sur les
+requêtes nommées de utils/queries.py et les tables de utils/tables.py ;
+chaque backend ne fournit que la connexion, le style de paramètres et la
+syntaxe EXPLAIN. L'application passe par l'instance partagée repository
+(MySQLRepository) pour les lectures de l'interface : con_nom (utils/cache.py)
+et utilisateurs des concessions (utils/comparison.fetch_users). Les autres
+lectures des routes (index utilisateurs, doublons, pagination /api/users,
+comparaison matérialisée, comptes) restent des requêtes nommées propres à
+MySQL, exécutées par read_query / fetch_records. SQLiteRepository crée son schéma et ses index : base
+embarquée pour les scripts, les essais et les mesures locales (chargeable
+depuis un snapshot Arrow, voir utils/snapshot.py).
+
+Usage:
+    repo = get_repository()                 # DEALERVIEW_BACKEND, MySQL par défaut
+    df = repo.get_users("SSO", ["10001", "10002"])
+    print(repo.explain("find_by_iwu", "IWU123"))
+"""
+
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from .queries import placeholders, query_sql, read_query
+from .tables import INDEXES, SOURCE_TABLES, TABLE_COLUMNS, index_name
+
+# Backend par défaut de get_repository() : mysql, postgres ou sqlite
+REPOSITORY_BACKEND = os.environ.get("DEALERVIEW_BACKEND", "mysql")
+
+
+class Repository:
+    """
+    Interface commune des backends.
+
+    Les sous-classes définissent placeholder, explain_prefix et connect().
+    Chaque méthode de l'interface exécute une requête nommée de
+    utils/queries.py (mêmes textes SQL que les routes), décrite par une
+    méthode _<nom>_query qui retourne (nom, params, fragments) : explain()
+    en affiche le plan.
+    """
+
+    name = None
+    placeholder = "%s"
+    explain_prefix = "EXPLAIN "
+
+    def connect(self):
+        """Retourne une connexion DB-API (fermée par l'appelant)."""
+        raise NotImplementedError
+
+    # ----------------------------
+    # Interface
+    # ----------------------------
+    def get_users(self, source, sap_princ, conn=None):
+        """
+        Utilisateurs d'une ou plusieurs concessions avec leurs IWU_ID.
+
+        Args:
+            source (str): "SSO" ou "IDOCS"
+            sap_princ (str | list): Code(s) SAP principal
+            conn: Connexion déjà ouverte, laissée ouverte (défaut: connect())
+
+        Returns:
+            pd.DataFrame: Colonnes id_cree, nom, prenom, sap_princ, iwu_id
+        """
+        return self._query(*self._get_users_query(source, sap_princ), conn=conn)
+
+    def get_dealer_names(self, conn=None):
+        """
+        Noms des concessions (table con_nom, sap_princ renseigné).
+
+        Returns:
+            pd.DataFrame: Colonnes sap_princ, sap_nom
+        """
+        return self._query(*self._get_dealer_names_query(), conn=conn)
+
+    def find_by_iwu(self, iwu_id, conn=None):
+        """
+        Utilisateurs rattachés à un IWU_ID, toutes sources.
+
+        Returns:
+            pd.DataFrame: Colonnes source, id_cree, nom, prenom, iwu_id
+        """
+        return self._query(*self._find_by_iwu_query(iwu_id), conn=conn)
+
+    def explain(self, query, *args):
+        """
+        Plan d'exécution d'une requête de l'interface sur ce backend.
+
+        Args:
+            query (str): "get_users", "get_dealer_names" ou "find_by_iwu"
+            *args: Arguments de la méthode correspondante
+
+        Returns:
+            pd.DataFrame: Sortie brute de EXPLAIN
+        """
+        name, params, parts = getattr(self, f"_{query}_query")(*args)
+        return self._execute(self.explain_prefix + query_sql(name, **parts), params)
+
+    def create_indexes(self):
+        """Crée les index de INDEXES absents."""
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                for table, definitions in INDEXES.items():
+                    for columns in definitions:
+                        cursor.execute(self._create_index_sql(table, columns))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ----------------------------
+    # Requêtes nommées (utils/queries.py)
+    # ----------------------------
+    def _get_users_query(self, source, sap_princ):
+        user_table, detail_table = SOURCE_TABLES[source]
+        saps = [sap_princ] if isinstance(sap_princ, str) else list(sap_princ)
+        parts = {"user_table": user_table, "detail_table": detail_table, "placeholders": placeholders(len(saps))}
+        return "comparison.users", saps, parts
+
+    def _get_dealer_names_query(self):
+        return "reference.con_nom", [], {}
+
+    def _find_by_iwu_query(self, iwu_id):
+        return "search.by_iwu", [iwu_id] * len(SOURCE_TABLES), {}
+
+    def _create_index_sql(self, table, columns):
+        return f"CREATE INDEX IF NOT EXISTS {index_name(table, columns)} ON {table} ({', '.join(columns)})"
+
+    def _query(self, name, params, parts, conn=None):
+        return self._execute(query_sql(name, **parts), params, conn)
+
+    def _execute(self, sql, params, conn=None):
+        owned = conn is None
+        if owned:
+            conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.replace("%s", self.placeholder), params)
+                columns = [column[0] for column in cursor.description]
+                return pd.DataFrame(list(cursor.fetchall()), columns=columns)
+        finally:
+            if owned:
+                conn.close()
+
+
+class MySQLRepository(Repository):
+    """
+    Backend de l'application : connexions empruntées au pool de utils/database.py
+    (MySQL, ou snapshot hors ligne si DEALERVIEW_SNAPSHOT est défini).
+
+    Les requêtes passent par read_query : durées dans query_stats (/db/queries)
+    et dans la phase "db" de la requête HTTP.
+    """
+
+    name = "mysql"
+
+    def connect(self):
+        from .database import get_conn
+        return get_conn()
+
+    def _query(self, name, params, parts, conn=None):
+        if conn is not None:
+            return read_query(conn, name, params, **parts)
+        with self.connect() as conn:
+            return read_query(conn, name, params, **parts)
+
+    def create_indexes(self):
+        # MySQL n'a pas CREATE INDEX IF NOT EXISTS : on consulte information_schema
+        existing = set(self._execute("""
+            SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """, [])["INDEX_NAME"])
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                for table, definitions in INDEXES.items():
+                    for columns in definitions:
+                        if index_name(table, columns) not in existing:
+                            cursor.execute(
+                                f"CREATE INDEX {index_name(table, columns)} ON {table} ({', '.join(columns)})"
+                            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class PostgresRepository(Repository):
+    """
+    Backend PostgreSQL (psycopg2, dépendance optionnelle).
+
+    Args:
+        **params: Paramètres de psycopg2.connect (host, dbname, user, password...)
+    """
+
+    name = "postgres"
+
+    def __init__(self, **params):
+        self.params = params
+
+    def connect(self):
+        import psycopg2
+        return psycopg2.connect(**self.params)
+
+
+class SQLiteRepository(Repository):
+    """
+    Backend SQLite embarqué (fichier ou mémoire), schéma et index créés à l'ouverture.
+
+    Une seule connexion partagée, protégée par un verrou.
+
+    Args:
+        path (str): Fichier SQLite ou ":memory:"
+    """
+
+    name = "sqlite"
+    placeholder = "?"
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, path=":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        for table, columns in TABLE_COLUMNS.items():
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{c} TEXT' for c in columns)})")
+        self.create_indexes()
+
+    def connect(self):
+        return _LockedConnection(self._db, self._lock)
+
+    def load_frames(self, frames):
+        """
+        Remplace le contenu de tables par des DataFrames.
+
+        Args:
+            frames (dict): Table -> pd.DataFrame (colonnes de TABLE_COLUMNS)
+        """
+        with self._lock:
+            for table, df in frames.items():
+                self._db.execute(f"DELETE FROM {table}")
+                columns = list(df.columns)
+                rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+                self._db.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    rows
+                )
+            self._db.commit()
+
+    def load_snapshot(self, snapshot_dir):
+        """Charge toutes les tables d'un snapshot Arrow (voir utils/snapshot.py)."""
+        from .snapshot import read_manifest, read_frame
+        tables = [entry["table"] for entry in read_manifest(snapshot_dir)["tables"]]
+        self.load_frames({table: read_frame(snapshot_dir, table) for table in tables})
+
+
+class _LockedConnection:
+    """Connexion SQLite partagée : verrou pris jusqu'à close()."""
+
+    def __init__(self, db, lock):
+        self._db = db
+        self._lock = lock
+        lock.acquire()
+
+    def cursor(self):
+        return _ClosingCursor(self._db.cursor())
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._lock.release()
+
+
+class _ClosingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+
+# Accès aux données de l'application (pool de utils/database.py)
+repository = MySQLRepository()
+
+REPOSITORIES = {
+    "mysql": MySQLRepository,
+    "postgres": PostgresRepository,
+    "sqlite": SQLiteRepository,
+}
+
+
+def get_repository(backend=None, **params):
+    """
+    Instancie un backend.
+
+    Args:
+        backend (str): "mysql", "postgres" ou "sqlite" (défaut: DEALERVIEW_BACKEND)
+        **params: Paramètres du constructeur (connexion PostgreSQL, chemin SQLite)
+
+    Returns:
+        Repository: Backend prêt à l'emploi
+    """
+    backend = backend or REPOSITORY_BACKEND
+    if backend not in REPOSITORIES:
+        raise ValueError(f"Backend inconnu : {backend} ({', '.join(REPOSITORIES)})")
+    return REPOSITORIES[backend](**params)
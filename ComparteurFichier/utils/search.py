@@ -0,0 +1,159 @@
+"""
+Index de recherche utilisateurs en mémoire (nom, prénom, IWU ID)
+
+Construit à partir de sso_user_detail et idocs_user_detail, l'index associe
+chaque trigramme (texte sans accents, en minuscules) aux utilisateurs qui
+le contiennent. Une recherche intersecte les listes des trigrammes du terme
+puis vérifie la sous-chaîne : quelques millisecondes au lieu d'un
+LIKE '%terme%' sur deux tables.
+"""
+
+import unicodedata
+from array import array
+
+from .queries import read_query
+
+# Nombre maximum de résultats retournés
+SEARCH_LIMIT = 100
+
+# Ordre d'affichage des sources ("SSO + IDOCS")
+SOURCE_ORDER = ["SSO", "IDOCS"]
+
+
+def fold_text(s):
+    """
+    Texte de recherche : sans accents et en minuscules.
+
+    Args:
+        s: Valeur à normaliser (None accepté)
+
+    Returns:
+        str: Texte normalisé ("" si vide)
+    """
+    if s is None or (isinstance(s, float) and s != s):
+        return ""
+    s = unicodedata.normalize('NFD', str(s))
+    return ''.join(c for c in s if unicodedata.category(c) != 'Mn').casefold()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class UserSearchIndex:
+    """
+    Index trigrammes des utilisateurs, un document par id_cree (sources fusionnées).
+
+    Args:
+        df (pd.DataFrame): Colonnes id_cree, nom, prenom, iwu_id, source
+    """
+
+    def __init__(self, df):
+        self.ids = []
+        self.noms = []
+        self.prenoms = []
+        self.iwu_ids = []
+        self.sources = []
+        self.fields = []
+
+        position = {}
+        for id_cree, nom, prenom, iwu_id, source in zip(
+            df["id_cree"], df["nom"], df["prenom"], df["iwu_id"], df["source"]
+        ):
+            doc = position.get(id_cree)
+            if doc is None:
+                doc = position[id_cree] = len(self.ids)
+                self.ids.append(id_cree)
+                self.noms.append(nom)
+                self.prenoms.append(prenom)
+                self.iwu_ids.append([])
+                self.sources.append(set())
+                self.fields.append([fold_text(nom), fold_text(prenom)])
+            # IWU absent : NULL (None ou NaN selon le type de colonne), vide ou "NONE"
+            if fold_text(iwu_id) and iwu_id != "NONE" and iwu_id not in self.iwu_ids[doc]:
+                self.iwu_ids[doc].append(iwu_id)
+                self.fields[doc].append(fold_text(iwu_id))
+            self.sources[doc].add(source)
+
+        postings = {}
+        for doc, fields in enumerate(self.fields):
+            grams = set()
+            for field in fields:
+                grams |= _trigrams(field)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc)
+        self.postings = {gram: array('I', docs) for gram, docs in postings.items()}
+
+    @classmethod
+    def build(cls, conn):
+        """Construit l'index depuis les tables de détail utilisateurs."""
+        return cls(read_query(conn, "search.user_details"))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, term):
+        grams = _trigrams(term)
+        if not grams:
+            # Terme trop court pour les trigrammes : parcours complet
+            return range(len(self.ids))
+        lists = []
+        for gram in grams:
+            docs = self.postings.get(gram)
+            if docs is None:
+                return []
+            lists.append(docs)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for docs in lists[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, term, limit=SEARCH_LIMIT):
+        """
+        Recherche un terme dans les noms, prénoms et IWU ID.
+
+        Classement : champ identique, puis début de champ, puis sous-chaîne ;
+        à score égal, tri par nom puis prénom.
+
+        Args:
+            term (str): Terme recherché (accents et casse ignorés)
+            limit (int): Nombre maximum de résultats
+
+        Returns:
+            list: Dicts id_cree, nom, prenom, iwu_id, source
+        """
+        term = fold_text(term).strip()
+        if not term:
+            return []
+
+        scored = []
+        for doc in self._candidates(term):
+            fields = self.fields[doc]
+            score = 0
+            matched = None
+            for i, field in enumerate(fields):
+                if term in field:
+                    field_score = 3 if field == term else 2 if field.startswith(term) else 1
+                    if field_score > score:
+                        score = field_score
+                        matched = i
+            if score:
+                scored.append((-score, fold_text(self.noms[doc]), fold_text(self.prenoms[doc]), doc, matched))
+
+        scored.sort()
+        results = []
+        for _, _, _, doc, matched in scored[:limit]:
+            iwu_ids = self.iwu_ids[doc]
+            # IWU affiché : celui qui correspond à la recherche, sinon le premier
+            iwu_id = iwu_ids[matched - 2] if matched >= 2 else (iwu_ids[0] if iwu_ids else "")
+            results.append({
+                "id_cree": self.ids[doc],
+                "nom": self.noms[doc],
+                "prenom": self.prenoms[doc],
+                "iwu_id": iwu_id,
+                "source": " + ".join(s for s in SOURCE_ORDER if s in self.sources[doc])
+            })
+        return results
@@ -0,0 +1,287 @@
+"""
+Snapshots colonnes (Arrow IPC) des tables DealerView et mode hors ligne
+
+Export : chaque table est lue en streaming puis écrite dans un fichier
+Arrow IPC (<table>.arrow), colonnes texte encodées en dictionnaire (les
+sap_princ, noms et profils se répètent beaucoup). Les fichiers se lisent
+par memory-map, sans copie : pratique pour l'analyse (pandas, DuckDB...)
+et comme jeu de données local reproductible.
+
+Hors ligne : avec DEALERVIEW_SNAPSHOT=<dossier>, get_conn() renvoie des
+connexions SQLite en mémoire chargées depuis le snapshot (indexées, avec
+les fonctions MySQL utilisées par l'application). L'application tourne
+alors sans la base distante, en lecture seule (collation binaire : les
+comparaisons de texte sont sensibles à la casse, contrairement à MySQL).
+
+pyarrow est optionnel : il n'est importé que par ces fonctions.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import pymysql
+
+from .tables import IMPORTED_TABLES, INDEXES, index_name
+
+# Lignes lues par fetchmany lors de l'export
+SNAPSHOT_CHUNK_ROWS = 50000
+
+SNAPSHOT_MANIFEST = "snapshot.json"
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise RuntimeError("Snapshots indisponibles : pip install pyarrow")
+    return pyarrow
+
+
+# ============================
+# EXPORT
+# ============================
+def export_table(conn, table, snapshot_dir, chunk_rows=SNAPSHOT_CHUNK_ROWS):
+    """
+    Exporte une table en Arrow IPC, colonnes texte encodées en dictionnaire.
+
+    Args:
+        conn: Connexion DB-API
+        table (str): Nom de la table
+        snapshot_dir (str): Dossier du snapshot
+        chunk_rows (int): Lignes lues par bloc
+
+    Returns:
+        dict: table, file, rows, columns, bytes, sha256, seconds
+    """
+    pa = _pyarrow()
+    start = time.perf_counter()
+
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(f"SELECT * FROM {table}")
+        names = [column[0] for column in cursor.description]
+        chunks = [[] for _ in names]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            for i, values in enumerate(zip(*rows)):
+                chunks[i].append(pa.array(values))
+
+    arrays = []
+    for parts in chunks:
+        # Type de la colonne : premier bloc non entièrement NULL (texte par défaut)
+        typed = [a.type for a in parts if not pa.types.is_null(a.type)]
+        column_type = typed[0] if typed else pa.string()
+        column = pa.chunked_array(
+            [pa.nulls(len(a), column_type) if pa.types.is_null(a.type) else a for a in parts],
+            type=column_type
+        ).combine_chunks()
+        # Un dictionnaire par colonne texte pour tout le fichier
+        if pa.types.is_string(column_type) or pa.types.is_large_string(column_type):
+            column = column.dictionary_encode()
+        arrays.append(column)
+    data = pa.table(arrays, names=names)
+
+    filename = f"{table}.arrow"
+    path = os.path.join(snapshot_dir, filename)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, data.schema) as writer:
+        writer.write_table(data)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return {
+        "table": table,
+        "file": filename,
+        "rows": data.num_rows,
+        "columns": names,
+        "bytes": os.path.getsize(path),
+        "sha256": digest.hexdigest(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def export_snapshot(conn, snapshot_dir, tables=IMPORTED_TABLES, chunk_rows=SNAPSHOT_CHUNK_ROWS, log=print):
+    """
+    Exporte les tables dans un dossier de snapshot et écrit snapshot.json.
+
+    Returns:
+        dict: Contenu du manifest (created_at, tables)
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    entries = []
+    for table in tables:
+        entry = export_table(conn, table, snapshot_dir, chunk_rows)
+        log(f"[OK] {table}: {entry['rows']} lignes, {entry['bytes']} octets ({entry['seconds']}s)")
+        entries.append(entry)
+
+    manifest = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "tables": entries,
+    }
+    with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+# ============================
+# LECTURE
+# ============================
+def read_manifest(snapshot_dir):
+    """Retourne le contenu de snapshot.json."""
+    with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_table(snapshot_dir, table):
+    """
+    Ouvre une table du snapshot par memory-map (sans copie).
+
+    Returns:
+        pyarrow.Table: Colonnes texte en dictionnaire (to_pandas() -> category)
+    """
+    pa = _pyarrow()
+    source = pa.memory_map(os.path.join(snapshot_dir, f"{table}.arrow"), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def read_frame(snapshot_dir, table):
+    """Table du snapshot en DataFrame (colonnes texte en str, comme pd.read_sql)."""
+    data = read_table(snapshot_dir, table)
+    pa = _pyarrow()
+    # Décodage des dictionnaires : mêmes types qu'une lecture MySQL
+    arrays = [
+        col.cast(col.type.value_type) if pa.types.is_dictionary(col.type) else col
+        for col in data.columns
+    ]
+    return pa.table(arrays, names=data.column_names).to_pandas()
+
+
+# ============================
+# MODE HORS LIGNE (SQLite)
+# ============================
+def _register_mysql_functions(db):
+    db.create_function("CRC32", 1, lambda s: zlib.crc32(str(s).encode("utf-8")) if s is not None else None)
+    db.create_function("CONCAT_WS", -1, lambda sep, *a: sep.join(str(x) for x in a if x is not None))
+    db.create_function("NOW", 0, lambda: datetime.datetime.now().isoformat(sep=" ", timespec="seconds"))
+
+
+class OfflineConnection:
+    """
+    Connexion SQLite présentée comme une connexion pymysql.
+
+    Traduit les paramètres %s en ? et ignore les classes de curseur
+    (SSCursor) : toutes les lectures sont en mémoire.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def cursor(self, cursor_class=None):
+        return OfflineCursor(self._db.cursor())
+
+    def ping(self, reconnect=False):
+        self._db.execute("SELECT 1")
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+
+class OfflineCursor:
+    """Curseur SQLite acceptant les paramètres au format pymysql (%s)."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(sql.replace("%s", "?"), params or ())
+        return self._cursor.rowcount
+
+    def executemany(self, sql, seq):
+        self._cursor.executemany(sql.replace("%s", "?"), seq)
+        return self._cursor.rowcount
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+
+def load_offline_db(snapshot_dir, uri):
+    """
+    Charge un snapshot dans une base SQLite et crée les index.
+
+    Args:
+        snapshot_dir (str): Dossier du snapshot
+        uri (str): URI SQLite (ex: "file:dealerview?mode=memory&cache=shared")
+
+    Returns:
+        sqlite3.Connection: Connexion à garder ouverte (la base mémoire vit avec elle)
+    """
+    db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    for entry in read_manifest(snapshot_dir)["tables"]:
+        table = entry["table"]
+        read_frame(snapshot_dir, table).to_sql(table, db, index=False, if_exists="replace")
+        for columns in INDEXES.get(table, []):
+            db.execute(f"CREATE INDEX {index_name(table, columns)} ON {table} ({', '.join(columns)})")
+    db.commit()
+    return db
+
+
+def connect_offline(uri):
+    """
+    Ouvre une connexion hors ligne sur une base SQLite (fonctions MySQL enregistrées).
+
+    Args:
+        uri (str): URI SQLite (ex: base mémoire partagée de load_offline_db)
+
+    Returns:
+        OfflineConnection: Connexion au format pymysql
+    """
+    db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    _register_mysql_functions(db)
+    return OfflineConnection(db)
+
+
+def offline_connector(snapshot_dir):
+    """
+    Fabrique de connexions hors ligne pour le pool (database.ConnectionPool).
+
+    Le snapshot est chargé une seule fois, au premier appel, dans une base
+    SQLite mémoire partagée ; chaque connexion du pool s'y rattache.
+
+    Returns:
+        callable: Fonction sans argument retournant une OfflineConnection
+    """
+    uri = f"file:dealerview_{abs(hash(os.path.abspath(snapshot_dir)))}?mode=memory&cache=shared"
+    state = {}
+    lock = threading.Lock()
+
+    def connect():
+        with lock:
+            if "keeper" not in state:
+                state["keeper"] = load_offline_db(snapshot_dir, uri)
+        return connect_offline(uri)
+
+    return connect
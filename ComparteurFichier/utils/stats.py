@@ -0,0 +1,72 @@
+"""
+Statistiques du tableau de bord calculées côté base de données
+
+Les comptages COUNT(DISTINCT ...) sont faits par MySQL en une seule requête :
+seules quelques lignes agrégées transitent sur le réseau au lieu de tous les
+couples (sap_princ, id_cree).
+"""
+
+import pandas as pd
+
+from .queries import read_query
+
+
+def load_dealer_counts(conn):
+    """
+    Charge les comptes d'utilisateurs par concession et les statistiques globales.
+
+    Args:
+        conn: Connexion DB-API
+
+    Returns:
+        dict: {
+            "welcome": pd.Series nb utilisateurs WELCOME indexée par sap_princ,
+            "idocs": pd.Series nb utilisateurs IDOCS indexée par sap_princ,
+            "stats": dict des statistiques de la page d'accueil
+        }
+    """
+    df = read_query(conn, "stats.dealer_counts")
+    return build_dealer_counts(df)
+
+
+def build_dealer_counts(df):
+    """
+    Construit les comptes et les statistiques à partir du résultat de la requête stats.dealer_counts.
+
+    Args:
+        df (pd.DataFrame): Colonnes source, sap_princ, nb_users
+
+    Returns:
+        dict: Voir load_dealer_counts
+    """
+    def counts_for(source):
+        rows = df[df["source"] == source]
+        return pd.Series(
+            rows["nb_users"].astype(int).to_numpy(),
+            index=rows["sap_princ"].to_numpy(),
+            name="nb_users"
+        )
+
+    def total_for(source):
+        rows = df.loc[df["source"] == source, "nb_users"]
+        return int(rows.iloc[0]) if len(rows) > 0 else 0
+
+    welcome = counts_for("WELCOME")
+    idocs = counts_for("IDOCS")
+
+    total_concessions_welcome = len(welcome)
+    total_concessions_idocs = len(idocs)
+    total_concessions_both = len(set(welcome.index) & set(idocs.index))
+
+    stats = {
+        'total_users_welcome': total_for("WELCOME_TOTAL"),
+        'total_users_idocs': total_for("IDOCS_TOTAL"),
+        'total_concessions_welcome': total_concessions_welcome,
+        'total_concessions_idocs': total_concessions_idocs,
+        'total_concessions_both': total_concessions_both,
+        'only_welcome': total_concessions_welcome - total_concessions_both,
+        'only_idocs': total_concessions_idocs - total_concessions_both,
+        'both': total_concessions_both
+    }
+
+    return {"welcome": welcome, "idocs": idocs, "stats": stats}
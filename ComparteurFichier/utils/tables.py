@@ -0,0 +1,53 @@
+"""
+Tables importées : noms, colonnes et index, partagés par tous les modules
+
+Comparaison, index utilisateurs, backup, nettoyage, snapshots et couche
+d'accès (utils/repository.py) lisent leurs listes de tables ici : une
+table ou une colonne ajoutée à l'import n'est déclarée qu'une fois.
+"""
+
+# Tables utilisateurs par source : (table de rattachement, table de détail)
+SOURCE_TABLES = {
+    "SSO": ("sso", "sso_user_detail"),
+    "IDOCS": ("idocs_user", "idocs_user_detail"),
+}
+
+# Colonnes des tables de détail lues avec id_cree (fiche /compare_user)
+DETAIL_COLUMNS = {
+    "SSO": ["nom", "prenom", "iwu_id"],
+    "IDOCS": ["nom", "prenom", "iwu_id"],
+}
+
+# Colonnes de détail absentes de certains exports : affichées seulement si la table les contient
+OPTIONAL_DETAIL_COLUMNS = {
+    "SSO": [],
+    "IDOCS": ["marque", "typeprofil"],
+}
+
+# Colonnes (texte) des tables importées
+TABLE_COLUMNS = {
+    "sso": ["id_cree", "nom", "prenom", "sap_princ"],
+    "idocs_user": ["id_cree", "nom", "prenom", "sap_princ"],
+    "sso_user_detail": ["id_cree", "nom", "prenom", "iwu_id"],
+    "idocs_user_detail": ["id_cree", "nom", "prenom", "iwu_id", "marque", "typeprofil"],
+    "con_nom": ["sap_princ", "sap_nom"],
+    "idocs_con": ["sap_dealer", "sap_princ", "sap_nom"],
+}
+
+# Tables sauvegardées, nettoyées et exportées en snapshot
+IMPORTED_TABLES = list(TABLE_COLUMNS)
+
+# Index utiles aux requêtes de l'application (mêmes définitions pour tous les backends)
+INDEXES = {
+    "sso": [["sap_princ"], ["id_cree"]],
+    "idocs_user": [["sap_princ"], ["id_cree"]],
+    "sso_user_detail": [["id_cree"], ["iwu_id"], ["nom", "id_cree", "prenom"]],
+    "idocs_user_detail": [["id_cree"], ["iwu_id"], ["nom", "id_cree", "prenom"]],
+    "con_nom": [["sap_princ"]],
+    "idocs_con": [["sap_dealer"]],
+}
+
+
+def index_name(table, columns):
+    """Nom d'index stable : idx_<table>_<colonnes>."""
+    return f"idx_{table}_{'_'.join(columns)}"
@@ -0,0 +1,385 @@
+"""
+Index inversé utilisateurs / IWU_ID (tables user_iwu_index et user_dealer_index)
+
+Construit par scripts/build_user_index.py à partir des tables de détail
+(sso_user_detail, idocs_user_detail) et des tables de rattachement (sso,
+idocs_user). Chaque ligne porte id_cree et la clé id_key
+(LOWER(REPLACE(id_cree, ' ', ''))), indexés, ainsi que l'iwu_id indexé :
+/compare_user résout l'utilisateur (même condition que la lecture directe,
+voir index_match), ses concessions et les doublons IWU en deux requêtes
+indexées.
+
+L'index est reconstruit par backup_and_clean.py après chaque import, qui
+l'invalide au préalable (ligne de user_index_state supprimée) : sans cette
+ligne, la lecture passe par les tables sources.
+
+Sans index (ou utilisateur absent), la lecture directe des tables sources
+passe par la colonne indexée id_norm (voir id_match, utils/id_norm.py et
+scripts/migrate_id_norm.py), ou parcourt les tables si la migration n'a
+pas été appliquée.
+"""
+
+from functools import partial
+
+import pandas as pd
+
+from .parallel import fetch_parallel
+from .parsers import normalize_id, normalize_ids
+from .queries import fetch_records, placeholders, record_type
+from .tables import DETAIL_COLUMNS, OPTIONAL_DETAIL_COLUMNS, SOURCE_TABLES
+
+# Nombre de lignes par INSERT lors de la construction
+INDEX_INSERT_BATCH = 5000
+
+INDEX_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS user_iwu_index (
+        source VARCHAR(10) NOT NULL,
+        position INT NOT NULL,
+        id_cree VARCHAR(255),
+        id_key VARCHAR(255),
+        id_norm VARCHAR(255),
+        nom VARCHAR(255),
+        prenom VARCHAR(255),
+        iwu_id VARCHAR(255),
+        marque VARCHAR(255),
+        typeprofil VARCHAR(255),
+        PRIMARY KEY (source, position),
+        INDEX idx_user_iwu_id (id_cree),
+        INDEX idx_user_iwu_key (id_key),
+        INDEX idx_user_iwu_norm (id_norm),
+        INDEX idx_user_iwu_iwu (iwu_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_dealer_index (
+        source VARCHAR(10) NOT NULL,
+        position INT NOT NULL,
+        id_cree VARCHAR(255),
+        id_key VARCHAR(255),
+        id_norm VARCHAR(255),
+        sap_princ VARCHAR(50),
+        PRIMARY KEY (source, position),
+        INDEX idx_user_dealer_id (id_cree),
+        INDEX idx_user_dealer_key (id_key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_index_state (
+        id TINYINT NOT NULL PRIMARY KEY,
+        built_at DATETIME NOT NULL,
+        optional_columns VARCHAR(255) NOT NULL
+    )
+    """,
+]
+
+IWU_INDEX_COLUMNS = ["source", "position", "id_cree", "id_key", "id_norm",
+                     "nom", "prenom", "iwu_id", "marque", "typeprofil"]
+DEALER_INDEX_COLUMNS = ["source", "position", "id_cree", "id_key", "id_norm", "sap_princ"]
+
+
+def id_key(id_cree):
+    """Clé de recherche d'un identifiant : LOWER(REPLACE(id_cree, ' ', '')), None si absent."""
+    if id_cree is None or (isinstance(id_cree, float) and id_cree != id_cree):
+        return None
+    return str(id_cree).replace(" ", "").lower()
+
+
+def index_match(id_cree, alias=None):
+    """
+    Condition SQL désignant un utilisateur dans l'index.
+
+    Même condition que la lecture directe (id_match) : id_cree identique,
+    ou identifiant sans espaces égal à normalize_id, la colonne id_key
+    contenant déjà LOWER(REPLACE(id_cree, ' ', '')).
+
+    Args:
+        id_cree (str): Identifiant demandé
+        alias (str, optional): Alias de la table d'index dans la requête
+
+    Returns:
+        tuple: (condition SQL, paramètres)
+    """
+    prefix = f"{alias}." if alias else ""
+    return f"({prefix}id_cree = %s OR {prefix}id_key = %s)", [id_cree, normalize_id(id_cree)]
+
+
+def detail_columns(source, available):
+    """
+    Colonnes de détail d'une source : DETAIL_COLUMNS et colonnes optionnelles présentes.
+
+    Args:
+        source (str): "SSO" ou "IDOCS"
+        available (iterable): Colonnes de la table de détail
+
+    Returns:
+        tuple: id_cree puis les colonnes affichées
+    """
+    available = set(available)
+    optional = [c for c in OPTIONAL_DETAIL_COLUMNS[source] if c in available]
+    return ("id_cree", *DETAIL_COLUMNS[source], *optional)
+
+
+def id_match(id_cree, indexed=True):
+    """
+    Condition SQL désignant un utilisateur dans une table source.
+
+    La condition historique (id_cree identique, ou identifiant sans espaces
+    égal à normalize_id) est conservée telle quelle. En mode indexé, elle
+    est précédée de (id_norm = normalize_id(id_cree) OR id_norm IS NULL) :
+    une ligne remplie qui vérifie la condition historique a ce même id_norm,
+    et les lignes importées depuis le dernier remplissage (id_norm NULL)
+    restent trouvées. Le résultat est celui de la condition historique,
+    lu par l'index de la colonne id_norm (accès ref_or_null).
+
+    Args:
+        id_cree (str): Identifiant demandé
+        indexed (bool): Utiliser la colonne id_norm (scripts/migrate_id_norm.py)
+
+    Returns:
+        tuple: (condition SQL, paramètres)
+    """
+    id_norm = normalize_id(id_cree)
+    condition = "(id_cree = %s OR LOWER(REPLACE(id_cree, ' ', '')) = %s)"
+    if indexed:
+        return f"((id_norm = %s OR id_norm IS NULL) AND {condition})", [id_norm, id_cree, id_norm]
+    return condition, [id_cree, id_norm]
+
+
+# ============================
+# CONSTRUCTION (batch)
+# ============================
+def ensure_index(conn):
+    """Crée les tables user_iwu_index et user_dealer_index si besoin."""
+    with conn.cursor() as cursor:
+        for ddl in INDEX_SCHEMA:
+            cursor.execute(ddl)
+    conn.commit()
+
+
+def invalidate_user_index(conn):
+    """
+    Marque l'index comme périmé (tables sources en cours de modification).
+
+    Les lectures passent par les tables sources jusqu'à la prochaine
+    construction (build_user_index). Sans index créé, ne fait rien.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM user_index_state")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+
+
+def _table_columns(conn, table):
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+        return [column[0] for column in cursor.description]
+
+
+def _with_keys(df, source):
+    df = df.copy()
+    df.insert(0, "source", source)
+    df.insert(1, "position", range(len(df)))
+    df["id_key"] = [id_key(v) for v in df["id_cree"]]
+    df["id_norm"] = normalize_ids(df["id_cree"])
+    return df
+
+
+def _insert_rows(cursor, table, columns, df):
+    df = df.reindex(columns=columns)
+    df = df.astype(object).where(df.notna(), None)
+    rows = [tuple(row) for row in df.itertuples(index=False)]
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    for start in range(0, len(rows), INDEX_INSERT_BATCH):
+        cursor.executemany(sql, rows[start:start + INDEX_INSERT_BATCH])
+    return len(rows)
+
+
+def build_user_index(conn, log=print):
+    """
+    Reconstruit l'index à partir des tables sources, en une transaction
+    (les lecteurs voient l'ancien contenu jusqu'au commit).
+
+    Args:
+        conn: Connexion DB-API
+        log (callable): Fonction d'affichage de la progression
+
+    Returns:
+        dict: Nombre de lignes écrites par table
+    """
+    ensure_index(conn)
+
+    iwu_frames = []
+    dealer_frames = []
+    optional = []
+    for source, (user_table, detail_table) in SOURCE_TABLES.items():
+        # Colonnes optionnelles absentes de l'export : NULL dans l'index, non affichées
+        columns = detail_columns(source, _table_columns(conn, detail_table))
+        optional += columns[1 + len(DETAIL_COLUMNS[source]):]
+        detail = pd.read_sql(f"SELECT {', '.join(columns)} FROM {detail_table}", conn)
+        dealers = pd.read_sql(f"SELECT DISTINCT id_cree, sap_princ FROM {user_table}", conn)
+        iwu_frames.append(_with_keys(detail, source))
+        dealer_frames.append(_with_keys(dealers, source))
+        log(f"  {source}: {len(detail)} lignes de détail, {len(dealers)} rattachements")
+
+    counts = {}
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM user_iwu_index")
+        cursor.execute("DELETE FROM user_dealer_index")
+        cursor.execute("DELETE FROM user_index_state")
+        cursor.execute(
+            "INSERT INTO user_index_state (id, built_at, optional_columns) VALUES (1, NOW(), %s)",
+            [",".join(optional)]
+        )
+        counts["user_iwu_index"] = _insert_rows(
+            cursor, "user_iwu_index", IWU_INDEX_COLUMNS, pd.concat(iwu_frames, ignore_index=True)
+        )
+        counts["user_dealer_index"] = _insert_rows(
+            cursor, "user_dealer_index", DEALER_INDEX_COLUMNS, pd.concat(dealer_frames, ignore_index=True)
+        )
+    conn.commit()
+    return counts
+
+
+# ============================
+# LECTURE (route /compare_user)
+# ============================
+def lookup_user(conn, id_cree):
+    """
+    Détails, concessions et doublons IWU d'un utilisateur.
+
+    Lit l'index (deux requêtes) ; si l'index n'existe pas, a été invalidé
+    par un import (invalidate_user_index) ou ne connaît pas l'utilisateur,
+    interroge directement les tables sources.
+
+    Args:
+        conn: Connexion DB-API
+        id_cree (str): Identifiant demandé
+
+    Returns:
+        dict: "SSO" / "IDOCS" (enregistrements id_cree + colonnes de detail_columns),
+              "dealers" (enregistrements source, id_cree, sap_princ),
+              "duplicates" (liste de dicts id_cree, nom, prenom, iwu_id, source)
+    """
+    try:
+        result = _lookup_index(conn, id_cree)
+    except pd.errors.DatabaseError:
+        # Index non créé : build_user_index n'a jamais été lancé
+        conn.rollback()
+        result = None
+
+    if result is None:
+        try:
+            result = _lookup_live(conn, id_cree, indexed=True)
+        except pd.errors.DatabaseError:
+            # Colonne id_norm absente : scripts/migrate_id_norm.py n'a pas été lancé
+            conn.rollback()
+            result = _lookup_live(conn, id_cree, indexed=False)
+
+    id_norm = normalize_id(id_cree)
+    result["dealers"] = [row for row in result["dealers"] if normalize_id(row.id_cree) == id_norm]
+    return result
+
+
+def _lookup_index(conn, id_cree):
+    match, params = index_match(id_cree)
+    user_match, _ = index_match(id_cree, "u")
+    other_match, _ = index_match(id_cree, "d")
+
+    # Lignes de l'utilisateur + lignes partageant un de ses IWU_ID, concessions
+    # de rattachement et état de l'index : lectures indépendantes, en parallèle
+    rows, dealers, state = fetch_parallel(
+        conn,
+        partial(fetch_records, name="user_index.rows", params=params * 3,
+                match=match, user_match=user_match, other_match=other_match),
+        partial(fetch_records, name="user_index.dealers", params=params, match=match),
+        partial(fetch_records, name="user_index.state")
+    )
+
+    if not state:
+        # Index invalidé par un import, pas encore reconstruit : lecture directe des tables sources
+        return None
+
+    user_rows = [row for row in rows if row.is_user == 1]
+    if not user_rows and not dealers:
+        # Utilisateur absent de l'index (créé depuis la dernière construction)
+        return None
+
+    optional = state[0].optional_columns.split(",")
+    return {
+        "SSO": _detail_records([row for row in user_rows if row.source == "SSO"], "SSO", optional),
+        "IDOCS": _detail_records([row for row in user_rows if row.source == "IDOCS"], "IDOCS", optional),
+        "dealers": dealers,
+        "duplicates": _duplicates(
+            (row.id_cree, row.nom, row.prenom, row.iwu_id, row.source) for row in rows if row.is_user == 0
+        ),
+    }
+
+
+def _detail_records(rows, source, available):
+    # Même type d'enregistrement pour l'index et la lecture directe (colonnes de detail_columns)
+    columns = detail_columns(source, available)
+    record = record_type(columns)
+    return [record._make(getattr(row, c) for c in columns) for row in rows]
+
+
+def _duplicates(rows):
+    """Un doublon par id_cree (SSO d'abord, puis IDOCS), depuis des tuples (id_cree, nom, prenom, iwu_id, source)."""
+    duplicates = {}
+    for id_cree, nom, prenom, iwu_id, source in rows:
+        if id_cree not in duplicates:
+            duplicates[id_cree] = {"id_cree": id_cree, "nom": nom, "prenom": prenom, "iwu_id": iwu_id, "source": source}
+    return list(duplicates.values())
+
+
+def _live_source(conn, source, match, match_params):
+    user_table, detail_table = SOURCE_TABLES[source]
+    rows = fetch_records(conn, "user_live.detail", match_params, table=detail_table, match=match)
+    detail = _detail_records(rows, source, rows[0]._fields if rows else ())
+    dealer = record_type(("source", "id_cree", "sap_princ"))
+    dealers = [
+        dealer(source, row.id_cree, row.sap_princ)
+        for row in fetch_records(conn, "user_live.dealers", match_params, table=user_table, match=match)
+    ]
+    return detail, dealers
+
+
+def _live_duplicates(conn, source, iwu_list, match, match_params):
+    return [
+        (row.id_cree, row.nom, row.prenom, row.iwu_id, source)
+        for row in fetch_records(
+            conn, "user_live.duplicates", iwu_list + match_params,
+            table=SOURCE_TABLES[source][1], placeholders=placeholders(len(iwu_list)), match=match
+        )
+    ]
+
+
+def _lookup_live(conn, id_cree, indexed):
+    match, match_params = id_match(id_cree, indexed)
+    # Une tâche par source (détail + concessions), sur des connexions distinctes
+    results = fetch_parallel(conn, *[
+        partial(_live_source, source=source, match=match, match_params=match_params)
+        for source in SOURCE_TABLES
+    ])
+    details = {source: detail for source, (detail, _) in zip(SOURCE_TABLES, results)}
+
+    iwu_list = list(dict.fromkeys(
+        row.iwu_id for rows in details.values() for row in rows
+        if isinstance(row.iwu_id, str) and row.iwu_id and row.iwu_id != "NONE"
+    ))
+    duplicates = []
+    if iwu_list:
+        duplicates = fetch_parallel(conn, *[
+            partial(_live_duplicates, source=source, iwu_list=iwu_list, match=match, match_params=match_params)
+            for source in SOURCE_TABLES
+        ])
+
+    return {
+        "SSO": details["SSO"],
+        "IDOCS": details["IDOCS"],
+        "dealers": [row for _, dealers in results for row in dealers],
+        "duplicates": _duplicates(row for rows in duplicates for row in rows),
+    }
@@ -0,0 +1,133 @@
+"""
+Liste paginée des utilisateurs (WELCOME + IDOCS)
+
+Pagination par curseur (keyset) sur (nom, id_cree, prenom) : chaque page
+lit au plus `limit` lignes par table via l'ordre de l'index, quelle que
+soit la position dans la liste (pas d'OFFSET). Les valeurs NULL, triées en
+premier par MySQL comme par SQLite, sont conservées dans le curseur : les
+utilisateurs sans nom ou sans prénom apparaissent une fois, à leur place.
+"""
+
+import base64
+import json
+
+from .queries import fetch_records, query_sql
+
+# Taille de page par défaut et maximum autorisé via ?limit=
+USER_PAGE_SIZE = 100
+USER_PAGE_SIZE_MAX = 500
+
+USER_TABLES = ["idocs_user_detail", "sso_user_detail"]
+
+# Colonnes de tri (ordre de l'index) et caractère d'échappement des filtres LIKE
+KEY_COLUMNS = ["nom", "id_cree", "prenom"]
+LIKE_ESCAPE = "!"
+
+
+def encode_cursor(row):
+    """Encode la clé (nom, id_cree, prenom) d'une ligne en curseur opaque pour l'URL (NULL conservés)."""
+    key = [row[column] for column in KEY_COLUMNS]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Décode un curseur produit par encode_cursor.
+
+    Returns:
+        list | None: [nom, id_cree, prenom] (None pour NULL), None si le curseur est absent ou invalide
+    """
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(key, list) or len(key) != len(KEY_COLUMNS):
+        return None
+    return [None if k is None else str(k) for k in key]
+
+
+def after_key(key):
+    """
+    Condition SQL "ligne située après key" dans l'ordre (nom, id_cree, prenom), NULL en premier.
+
+    Équivalent de (nom, id_cree, prenom) > (%s, %s, %s) quand une valeur
+    de la clé est NULL : une colonne NULL dans la clé est suivie de toutes
+    les valeurs non NULL de cette colonne.
+
+    Args:
+        key (list): [nom, id_cree, prenom] (decode_cursor)
+
+    Returns:
+        tuple: (condition SQL, paramètres)
+    """
+    condition, params = None, []
+    # Construite de la dernière colonne à la première : gt OR (eq AND (suite))
+    for column, value in reversed(list(zip(KEY_COLUMNS, key))):
+        if value is None:
+            greater, equal, values = f"{column} IS NOT NULL", f"{column} IS NULL", []
+        else:
+            greater, equal, values = f"{column} > %s", f"{column} = %s", [value]
+        if condition is None:
+            condition, params = greater, values
+        else:
+            condition, params = f"{greater} OR ({equal} AND ({condition}))", values + values + params
+    return f"({condition})", params
+
+
+def like_prefix(prefix):
+    """Motif LIKE 'prefix%' (%, _ et caractère d'échappement protégés, voir LIKE_ESCAPE)."""
+    for char in (LIKE_ESCAPE, "%", "_"):
+        prefix = prefix.replace(char, LIKE_ESCAPE + char)
+    return prefix + "%"
+
+
+def page_size(value):
+    """Borne la taille de page demandée entre 1 et USER_PAGE_SIZE_MAX."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return USER_PAGE_SIZE
+    return max(1, min(size, USER_PAGE_SIZE_MAX))
+
+
+def list_users(conn, prefix="", cursor=None, limit=USER_PAGE_SIZE):
+    """
+    Retourne une page d'utilisateurs triés par nom.
+
+    Les utilisateurs sans nom (NULL) sont en tête de liste.
+
+    Args:
+        conn: Connexion DB-API
+        prefix (str): Début du nom (filtre LIKE 'prefix%')
+        cursor (str): Curseur de la page précédente (next_cursor)
+        limit (int): Nombre d'utilisateurs par page
+
+    Returns:
+        tuple: (liste de dicts id_cree/nom/prenom, next_cursor ou None)
+    """
+    conditions = []
+    params = []
+    if prefix:
+        conditions.append(f"nom LIKE %s ESCAPE '{LIKE_ESCAPE}'")
+        params.append(like_prefix(prefix))
+    key = decode_cursor(cursor)
+    if key is not None:
+        condition, key_params = after_key(key)
+        conditions.append(condition)
+        params.extend(key_params)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # Chaque table est lue dans l'ordre de tri et limitée avant l'UNION
+    branches = [query_sql("users.page_branch", table=table, where=where) for table in USER_TABLES]
+    branch_params = params + [limit + 1]
+    rows = fetch_records(conn, "users.page", branch_params * len(USER_TABLES) + [limit + 1],
+                         branches=" UNION ".join(branches))
+
+    users = [row._asdict() for row in rows]
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1])
+    return users, next_cursor